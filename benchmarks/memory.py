@@ -0,0 +1,104 @@
+"""
+Measures the memory used per cached observation by the different WeatherData storages.
+
+Usage: python -m benchmarks.memory [--count 200000]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass
+
+from open_weather_sdk import FrozenWeatherData, WeatherData, WeatherTable
+
+PAYLOAD = json.dumps({
+    "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04n"}],
+    "main": {"temp": 12.13, "feels_like": 11.67, "pressure": 1006, "humidity": 87},
+    "visibility": 10000,
+    "wind": {"speed": 4.63, "deg": 250},
+    "dt": 1710525000,
+    "sys": {"country": "GB", "sunrise": 1710483236, "sunset": 1710525891},
+    "timezone": 0,
+    "name": "London",
+})
+
+
+@dataclass
+class DictWeatherData:
+    """
+    WeatherData as it was before: a regular dataclass with a __dict__ and a string object per record.
+    """
+    lat: float
+    lon: float
+    weather_main: str
+    weather_description: str
+    temperature: float
+    temperature_feels_like: float
+    visibility: int
+    wind_speed: float
+    datetime: int
+    sunrise: int
+    sunset: int
+    timezone: int
+    name: str
+
+
+def make_dict_record(data: dict, index: int) -> DictWeatherData:
+    return DictWeatherData(
+        lat=index / 1000, lon=-index / 1000,
+        weather_main=data["weather"][0]["main"],
+        weather_description=data["weather"][0]["description"],
+        temperature=data["main"]["temp"], temperature_feels_like=data["main"]["feels_like"],
+        visibility=data["visibility"], wind_speed=data["wind"]["speed"], datetime=data["dt"],
+        sunrise=data["sys"]["sunrise"], sunset=data["sys"]["sunset"], timezone=data["timezone"],
+        name=f"City {index}",
+    )
+
+
+def measure(build, count: int) -> float:
+    """
+    Builds count records and returns the traced memory per record.
+
+    :param build: A function taking the count and returning the storage.
+    :param count: The number of records.
+    :return: The number of bytes per record.
+    """
+    gc.collect()
+    tracemalloc.start()
+    storage = build(count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del storage
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200_000)
+    count = parser.parse_args().count
+
+    builds = {
+        "dataclass with __dict__ (before)":
+            lambda n: [make_dict_record(json.loads(PAYLOAD), i) for i in range(n)],
+        "slotted WeatherData":
+            lambda n: [WeatherData.from_response(json.loads(PAYLOAD), i / 1000, -i / 1000, f"City {i}")
+                       for i in range(n)],
+        "slotted WeatherData from_bytes":
+            lambda n: [WeatherData.from_bytes(PAYLOAD.encode(), i / 1000, -i / 1000, f"City {i}") for i in range(n)],
+        "from_bytes with keep_raw":
+            lambda n: [WeatherData.from_bytes(PAYLOAD.encode(), i / 1000, -i / 1000, f"City {i}", keep_raw=True)
+                       for i in range(n)],
+        "slotted FrozenWeatherData":
+            lambda n: [FrozenWeatherData.from_response(json.loads(PAYLOAD), i / 1000, -i / 1000, f"City {i}")
+                       for i in range(n)],
+        "WeatherTable":
+            lambda n: WeatherTable(WeatherData.from_response(json.loads(PAYLOAD), i / 1000, -i / 1000, f"City {i}")
+                                   for i in range(n)),
+    }
+    print(f"{'storage':<36}{'bytes/entry':>12}")
+    for name, build in builds.items():
+        print(f"{name:<36}{measure(build, count):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+A local stand-in for the OpenWeatherMap API serving /data/2.5/weather, /geo/1.0/direct and the area endpoints
+/data/2.5/find and /data/2.5/box/city.
+
+Responses are generated from the request, so any city name or coordinates work without network access.
+Latency, server errors and 429 responses can be injected to exercise timeouts, retries and rate limiting.
+
+Usage: python -m benchmarks.mock_server [--port 8080] [--latency 0.05] [--error-rate 0.01] [--rate-limit-rate 0.01]
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Serves the requests of MockServer over keep-alive connections.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body are written separately, avoid delayed ACK stalls
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        status, headers, payload = self.server.respond(url.path, params)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+    A threaded HTTP server imitating the weather and geocoding endpoints.
+
+    Geocoding derives stable coordinates from the city name, except for the unknown cities which are not found.
+    Weather responses are derived from the coordinates. The area endpoints return stations placed on a grid of
+    station_spacing degrees. Every request is delayed by the latency, then answered
+    with 429 with the rate_limit_rate probability or with 500 with the error_rate probability.
+    """
+    daemon_threads = True
+
+    def __init__(self, address: tuple = ("127.0.0.1", 0), latency: float = 0, jitter: float = 0,
+                 error_rate: float = 0, rate_limit_rate: float = 0, retry_after: int = 1,
+                 unknown_cities: tuple = ("Atlantis",), station_spacing: float = 0.05, seed: int = None):
+        """
+        Binds the server without starting it.
+
+        :param address: The host and port to listen on (a free port by default).
+        :param latency: The delay in seconds before every response.
+        :param jitter: The maximum random delay in seconds added to the latency.
+        :param error_rate: The fraction of requests answered with 500.
+        :param rate_limit_rate: The fraction of requests answered with 429.
+        :param retry_after: The Retry-After value of 429 responses in whole seconds, as sent by the API.
+        :param unknown_cities: City names for which geocoding returns no results.
+        :param station_spacing: The distance in degrees between the stations returned by the area endpoints.
+        :param seed: Seed of the random generator, for reproducible error injection.
+        """
+        super().__init__(address, MockHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.unknown_cities = set(unknown_cities)
+        self.station_spacing = station_spacing
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__stats = dict.fromkeys(("requests", "weather", "geocoding", "find", "box", "errors", "rate_limited"), 0)
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL to pass as base_url to the SDK.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        """
+        Starts serving in a daemon thread.
+
+        :return: The server itself.
+        """
+        self.__thread = threading.Thread(target=self.serve_forever, name="mock-server", daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops serving and closes the listening socket.
+        """
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def get_stats(self) -> dict:
+        """
+        Returns request counters.
+
+        :return: A dictionary with the number of requests in total, to each endpoint, and answered with
+                 injected errors and 429 responses.
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def reset_stats(self) -> None:
+        """
+        Resets the request counters.
+        """
+        with self.__lock:
+            for name in self.__stats:
+                self.__stats[name] = 0
+
+    def __count(self, name: str) -> None:
+        with self.__lock:
+            self.__stats[name] += 1
+
+    def __draw(self) -> float:
+        with self.__lock:
+            return self.__random.random()
+
+    def respond(self, path: str, params: dict) -> (int, dict, object):
+        """
+        Builds the response to a request.
+
+        :param path: The path of the request.
+        :param params: The query parameters of the request.
+        :return: A tuple containing the status code, extra headers and the JSON payload.
+        """
+        self.__count("requests")
+        delay = self.latency + (self.__draw() * self.jitter if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if self.rate_limit_rate and self.__draw() < self.rate_limit_rate:
+            self.__count("rate_limited")
+            return 429, {"Retry-After": str(self.retry_after)}, {"cod": 429, "message": "Too many requests"}
+        if self.error_rate and self.__draw() < self.error_rate:
+            self.__count("errors")
+            return 500, {}, {"cod": 500, "message": "Internal error"}
+        if not params.get("appid"):
+            return 401, {}, {"cod": 401, "message": "Invalid API key."}
+
+        if path == "/geo/1.0/direct":
+            self.__count("geocoding")
+            return 200, {}, self.geocode(params.get("q", ""))
+        if path == "/data/2.5/weather":
+            self.__count("weather")
+            try:
+                lat, lon = float(params["lat"]), float(params["lon"])
+            except (KeyError, ValueError):
+                return 400, {}, {"cod": "400", "message": "wrong latitude or longitude"}
+            return 200, {}, self.weather(lat, lon)
+        if path == "/data/2.5/find":
+            self.__count("find")
+            try:
+                lat, lon, count = float(params["lat"]), float(params["lon"]), int(params.get("cnt", 10))
+            except (KeyError, ValueError):
+                return 400, {}, {"cod": "400", "message": "wrong latitude or longitude"}
+            stations = self.find(lat, lon, min(count, 50))
+            return 200, {}, {"message": "accurate", "cod": "200", "count": len(stations), "list": stations}
+        if path == "/data/2.5/box/city":
+            self.__count("box")
+            try:
+                left, bottom, right, top = (float(value) for value in params["bbox"].split(",")[:4])
+            except (KeyError, ValueError):
+                return 400, {}, {"cod": "400", "message": "wrong bbox"}
+            stations = self.box(left, bottom, right, top)
+            return 200, {}, {"cod": 200, "calctime": 0, "cnt": len(stations), "list": stations}
+        return 404, {}, {"cod": "404", "message": "Internal error: 404"}
+
+    def geocode(self, name: str) -> list:
+        """
+        Builds a /geo/1.0/direct payload with coordinates derived from the name.
+
+        :param name: The city name.
+        :return: A list with one location, or an empty list for unknown cities.
+        """
+        if name in self.unknown_cities:
+            return []
+        code = zlib.crc32(name.encode())
+        lat = round((code % 17_000) / 100 - 85, 4)
+        lon = round((code // 17_000 % 36_000) / 100 - 180, 4)
+        return [{"name": name, "lat": lat, "lon": lon, "country": "XX"}]
+
+    def weather(self, lat: float, lon: float) -> dict:
+        """
+        Builds a /data/2.5/weather payload for the coordinates.
+
+        :param lat: Latitude.
+        :param lon: Longitude.
+        :return: The weather payload with the current time as the observation time.
+        """
+        now = int(time.time())
+        temperature = round(30 - abs(lat) / 2 + (lon % 7) / 2, 2)
+        return {
+            "coord": {"lon": lon, "lat": lat},
+            "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+            "base": "stations",
+            "main": {"temp": temperature, "feels_like": round(temperature - 1.5, 2), "pressure": 1012,
+                     "humidity": 70},
+            "visibility": 10000,
+            "wind": {"speed": round(abs(lon) % 12, 2), "deg": 250},
+            "clouds": {"all": 75},
+            "dt": now,
+            "sys": {"country": "XX", "sunrise": now - 6 * 3600, "sunset": now + 6 * 3600},
+            "timezone": 0,
+            "id": 0,
+            "name": "Mock",
+            "cod": 200,
+        }
+
+
+    def find(self, lat: float, lon: float, count: int) -> list:
+        """
+        Builds the station entries of a /data/2.5/find payload.
+
+        :param lat: Latitude of the center.
+        :param lon: Longitude of the center.
+        :param count: The number of stations.
+        :return: The count stations nearest to the center, nearest first.
+        """
+        spacing = self.station_spacing
+        side = math.isqrt(count) + 3
+        row, column = round(lat / spacing), round(lon / spacing)
+        grid = [((row + i) * spacing, (column + j) * spacing)
+                for i in range(-side // 2, side // 2 + 1) for j in range(-side // 2, side // 2 + 1)]
+        grid.sort(key=lambda point: (point[0] - lat) ** 2 + ((point[1] - lon) * math.cos(math.radians(lat))) ** 2)
+        stations = list()
+        for station_lat, station_lon in grid[:count]:
+            station = self.weather(round(station_lat, 4), round(station_lon, 4))
+            del station["visibility"], station["timezone"], station["base"], station["cod"]
+            station["sys"] = {"country": "XX"}
+            station["name"] = f"Station {station_lat:.2f},{station_lon:.2f}"
+            stations.append(station)
+        return stations
+
+    def box(self, left: float, bottom: float, right: float, top: float, limit: int = 1000) -> list:
+        """
+        Builds the station entries of a /data/2.5/box/city payload.
+
+        :param left: The western longitude of the box.
+        :param bottom: The southern latitude of the box.
+        :param right: The eastern longitude of the box.
+        :param top: The northern latitude of the box.
+        :param limit: The maximum number of stations.
+        :return: The stations inside the box.
+        """
+        spacing = self.station_spacing
+        stations = list()
+        for row in range(math.ceil(bottom / spacing), math.floor(top / spacing) + 1):
+            for column in range(math.ceil(left / spacing), math.floor(right / spacing) + 1):
+                if len(stations) == limit:
+                    return stations
+                station_lat, station_lon = round(row * spacing, 4), round(column * spacing, 4)
+                weather = self.weather(station_lat, station_lon)
+                stations.append({
+                    "id": len(stations),
+                    "dt": weather["dt"],
+                    "name": f"Station {station_lat:.2f},{station_lon:.2f}",
+                    "coord": {"Lon": station_lon, "Lat": station_lat},
+                    "main": weather["main"],
+                    "wind": weather["wind"],
+                    "clouds": {"today": 75},
+                    "weather": weather["weather"],
+                })
+        return stations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--jitter", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    server = MockServer((args.host, args.port), args.latency, args.jitter, args.error_rate, args.rate_limit_rate,
+                        args.retry_after)
+    print(f"Serving on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
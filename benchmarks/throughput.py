@@ -0,0 +1,151 @@
+"""
+Measures throughput, latency percentiles and API calls of the SDK against the local mock server.
+
+Every combination of path and workload runs on a fresh SDK instance:
+  paths:     sync (get_weatherdata on a thread pool), batch (get_weatherdata_many in chunks),
+             polling (sync lookups, a pause for the data to go stale, and the same lookups again)
+  workloads: cold (empty cache), warm (all locations cached), mixed (80% cached, 20% new)
+No network access is needed.
+
+Usage: python -m benchmarks.throughput [--locations 200] [--latency 0.02] [--concurrency 10]
+"""
+import argparse
+import itertools
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_server import MockServer
+from open_weather_sdk.session import SessionConfig
+from open_weather_sdk.sdk import OpenWeatherSDK
+
+PATHS = ("sync", "batch", "polling")
+WORKLOADS = ("cold", "warm", "mixed")
+
+api_keys = (f"benchmark-{index}" for index in itertools.count())  # A fresh singleton per run
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile.
+
+    :param values: The measured values.
+    :param fraction: The percentile as a fraction (0.99 for p99).
+    :return: The percentile, or 0 for no values.
+    """
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def timed(function, *args) -> (float, bool):
+    """
+    Calls the function and measures it.
+
+    :param function: The function to call.
+    :return: A tuple containing the latency in seconds and whether the call failed.
+    """
+    start = time.perf_counter()
+    try:
+        function(*args)
+        failed = False
+    except Exception:
+        failed = True
+    return time.perf_counter() - start, failed
+
+
+def run_sync(sdk: OpenWeatherSDK, cities: list, concurrency: int) -> list:
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda city: timed(sdk.get_weatherdata, city), cities))
+
+
+def run_batch(sdk: OpenWeatherSDK, cities: list, concurrency: int, batch_size: int) -> list:
+    results = list()
+    for start in range(0, len(cities), batch_size):
+        chunk = cities[start:start + batch_size]
+        begin = time.perf_counter()
+        items = sdk.get_weatherdata_many(chunk, max_workers=concurrency)
+        latency = time.perf_counter() - begin
+        results.extend((latency, isinstance(item, Exception)) for item in items)
+    return results
+
+
+def run(server: MockServer, path: str, workload: str, args) -> dict:
+    """
+    Runs one path with one workload.
+
+    :param server: The running mock server.
+    :param path: One of PATHS.
+    :param workload: One of WORKLOADS.
+    :param args: The parsed command line arguments.
+    :return: A dictionary with the results.
+    """
+    cities = [f"City {index}" for index in range(args.locations)]
+    config = SessionConfig(pool_maxsize=args.concurrency)
+    sdk = OpenWeatherSDK(next(api_keys), base_url=server.url, session_config=config,
+                         cache_capacity=2 * args.locations, polling=path == "polling")
+    sdk.set_update_time(args.update_time if path == "polling" else 3600)
+
+    # Prefill the cache without measuring it
+
+    cached = {"cold": [], "warm": cities, "mixed": cities[:len(cities) * 4 // 5]}[workload]
+    if cached:
+        sdk.get_weatherdata_many(cached, max_workers=args.concurrency)
+    lookups = list(cities)
+    random.Random(0).shuffle(lookups)
+    server.reset_stats()
+
+    start = time.perf_counter()
+    if path == "batch":
+        results = run_batch(sdk, lookups, args.concurrency, args.batch_size)
+    else:
+        results = run_sync(sdk, lookups, args.concurrency)
+    if path == "polling":  # The refresher keeps the data fresh while the lookups pause
+        time.sleep(args.update_time * 1.5)
+        results += run_sync(sdk, lookups, args.concurrency)
+    elapsed = time.perf_counter() - start - (args.update_time * 1.5 if path == "polling" else 0)
+    sdk.close()
+
+    latencies = [latency for latency, _ in results]
+    return {
+        "path": path,
+        "workload": workload,
+        "lookups": len(results),
+        "throughput": len(results) / elapsed,
+        "p50": percentile(latencies, 0.5) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "api_calls": server.get_stats()["requests"],
+        "errors": sum(failed for _, failed in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--update-time", type=float, default=1, help="refresh interval of the polling path")
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    parser.add_argument("--paths", default=",".join(PATHS))
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    args = parser.parse_args()
+
+    server = MockServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        rate_limit_rate=args.rate_limit_rate, retry_after=0, seed=0)
+    print(f"{'path':<9}{'workload':<10}{'lookups':>9}{'lookups/s':>12}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'API calls':>11}{'errors':>8}")
+    with server:
+        for path in args.paths.split(","):
+            for workload in args.workloads.split(","):
+                result = run(server, path, workload, args)
+                print(f"{result['path']:<9}{result['workload']:<10}{result['lookups']:>9}"
+                      f"{result['throughput']:>12.0f}{result['p50']:>9.2f}{result['p99']:>9.2f}"
+                      f"{result['api_calls']:>11}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
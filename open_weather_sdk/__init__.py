@@ -1,6 +1,40 @@
 import json
+import sys
+from array import array
+from operator import attrgetter
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, fields, make_dataclass
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard json module is used without it
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps_json(data) -> bytes:
+    """
+    Serializes data to compact UTF-8 JSON with orjson when it is installed, or with the json module otherwise.
+
+    :param data: The data to serialize.
+    :return: The JSON document as bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads_json(data: bytes):
+    """
+    Parses UTF-8 JSON with orjson when it is installed, or with the json module otherwise.
+
+    :param data: The JSON document as bytes.
+    :return: The decoded data.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def get_time_difference(time1: datetime, time2: datetime) -> float:
@@ -14,10 +48,234 @@ def get_time_difference(time1: datetime, time2: datetime) -> float:
     return abs((time2 - time1).total_seconds())
 
 
-@dataclass
-class WeatherData:
+class WeatherRecord:
+    """
+    Methods shared by WeatherData and FrozenWeatherData.
+
+    The serialized JSON is memoized on the record together with the field values it was encoded from, so cache
+    hits do not encode the same data again and assigning a field of a WeatherData instance encodes it anew.
+    Checking the values costs far less than encoding and nothing is added to the construction of records.
+
+    Records created with from_bytes also hold the extra fields (humidity, pressure and wind gust), which are taken
+    from the decoded response at parse time. The body of the response itself is only kept on request.
     """
-    Contains weather data.
+    __slots__ = ("__json", "__json_bytes", "__raw", "__humidity", "__pressure", "__wind_gust")
+
+    @classmethod
+    def from_response(cls, data: dict, lat: float, lon: float, name: str) -> "WeatherRecord":
+        """
+        Creates an instance from a decoded /data/2.5/weather response.
+        Condition strings are interned, so records with the same condition share one string.
+
+        :param data: The decoded JSON body of the response.
+        :param lat: Latitude of the requested location.
+        :param lon: Longitude of the requested location.
+        :param name: Name of the requested location.
+        :return: An instance of the class the method is called on.
+        """
+        return cls(
+            lat=lat,
+            lon=lon,
+            weather_main=sys.intern(data["weather"][0]["main"]),
+            weather_description=sys.intern(data["weather"][0]["description"]),
+            temperature=data["main"]["temp"],
+            temperature_feels_like=data["main"]["feels_like"],
+            visibility=data["visibility"],
+            wind_speed=data["wind"]["speed"],
+            datetime=data["dt"],
+            sunrise=data["sys"]["sunrise"],
+            sunset=data["sys"]["sunset"],
+            timezone=data["timezone"],
+            name=name
+        )
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, lat: float, lon: float, name: str, keep_raw: bool = False) -> "WeatherRecord":
+        """
+        Creates an instance from the raw body of a /data/2.5/weather response.
+        The body is decoded with orjson when it is installed, and only the fields of the record and the extra
+        fields are kept from the decoded data. Without orjson the body is decoded by the json module like
+        response.json() would, so there is no CPU gain.
+
+        :param raw: The body of the response.
+        :param lat: Latitude of the requested location.
+        :param lon: Longitude of the requested location.
+        :param name: Name of the requested location.
+        :param keep_raw: Whether to keep the body by reference for get_raw and get_payload. It is usually larger
+                         than the record itself.
+        :return: An instance of the class the method is called on.
+        """
+        data = loads_json(raw)
+        record = cls.from_response(data, lat, lon, name)
+        main, wind = data.get("main", {}), data.get("wind", {})
+        record.set_extras(main.get("humidity"), main.get("pressure"), wind.get("gust"))
+        if keep_raw:
+            object.__setattr__(record, "_WeatherRecord__raw", raw)
+        return record
+
+    @classmethod
+    def from_station(cls, data: dict, lat: float, lon: float, name: str) -> "WeatherRecord":
+        """
+        Creates an instance from a station of a /data/2.5/find or /data/2.5/box/city response.
+        These responses may omit visibility, sunrise, sunset and timezone, which are 0 then.
+
+        :param data: The decoded station entry.
+        :param lat: Latitude of the requested location.
+        :param lon: Longitude of the requested location.
+        :param name: Name of the requested location.
+        :return: An instance of the class the method is called on.
+        """
+        sun = data.get("sys", {})
+        return cls(
+            lat=lat,
+            lon=lon,
+            weather_main=sys.intern(data["weather"][0]["main"]),
+            weather_description=sys.intern(data["weather"][0]["description"]),
+            temperature=data["main"]["temp"],
+            temperature_feels_like=data["main"]["feels_like"],
+            visibility=data.get("visibility", 0),
+            wind_speed=data["wind"]["speed"],
+            datetime=data["dt"],
+            sunrise=sun.get("sunrise", 0),
+            sunset=sun.get("sunset", 0),
+            timezone=data.get("timezone", 0),
+            name=name
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Converts the instance into the nested dictionary returned by to_json.
+
+        :return: A dictionary representing the weather data.
+        """
+        return {
+            "weather": {
+                "main": self.weather_main,
+                "description": self.weather_description
+            },
+            "temperature": {
+                "temp": self.temperature,
+                "feels_like": self.temperature_feels_like
+            },
+            "visibility": self.visibility,
+            "wind": {
+                "speed": self.wind_speed
+            },
+            "datetime": self.datetime,
+            "sys": {
+                "sunrise": self.sunrise,
+                "sunset": self.sunset
+            },
+            "timezone": self.timezone,
+            "name": self.name
+        }
+
+    def __memoized(self, slot: str, encode):
+        """
+        Returns a memoized serialization, encoding it again if a field changed since it was memoized.
+
+        :param slot: The name of the slot holding the (field values, result) tuple.
+        :param encode: A function serializing the dictionary returned by to_dict.
+        :return: The serialization.
+        """
+        values = _field_values(self)
+        memo = getattr(self, slot, None)
+        if memo is None or memo[0] != values:
+            memo = (values, encode(self.to_dict()))
+            object.__setattr__(self, slot, memo)
+        return memo[1]
+
+    def to_json_bytes(self) -> bytes:
+        """
+        Converts the instance into compact UTF-8 encoded JSON, with orjson when it is installed. The result is
+        memoized. The document has the same content as to_json but may differ in whitespace, escaping of non-ASCII
+        characters and float formatting.
+
+        :return: JSON bytes representing the weather data.
+        """
+        return self.__memoized("_WeatherRecord__json_bytes", dumps_json)
+
+    def to_json(self) -> json:
+        """
+        Converts the instance into a JSON string formatted by json.dumps with its default settings, as it always
+        was. The result is memoized. See to_json_bytes for the compact encoding.
+
+        :return: A JSON string representing the weather data.
+        """
+        return self.__memoized("_WeatherRecord__json", json.dumps)
+
+    def get_raw(self):
+        """
+        Returns the body of the response the instance was created from.
+
+        :return: The body as bytes, or None if the instance was not created with from_bytes and keep_raw.
+        """
+        return getattr(self, "_WeatherRecord__raw", None)
+
+    def get_payload(self):
+        """
+        Returns the complete decoded response. The body is decoded on every call, the decoded tree is not kept
+        on the record.
+
+        :return: The decoded response, or None if the instance was not created with from_bytes and keep_raw.
+        """
+        raw = self.get_raw()
+        return None if raw is None else loads_json(raw)
+
+    def get_extras(self) -> tuple:
+        """
+        Returns the extra fields, e.g. to store them next to the field values.
+
+        :return: A tuple containing the humidity, the pressure and the wind gust.
+        """
+        return self.humidity, self.pressure, self.wind_gust
+
+    def set_extras(self, humidity, pressure, wind_gust) -> None:
+        """
+        Sets the extra fields, also on frozen instances since they are not compared or hashed.
+
+        :param humidity: Relative humidity in percent, or None.
+        :param pressure: Atmospheric pressure at sea level in hPa, or None.
+        :param wind_gust: Wind gust in meters per second, or None.
+        """
+        object.__setattr__(self, "_WeatherRecord__humidity", humidity)
+        object.__setattr__(self, "_WeatherRecord__pressure", pressure)
+        object.__setattr__(self, "_WeatherRecord__wind_gust", wind_gust)
+
+    @property
+    def humidity(self):
+        """
+        Relative humidity in percent, or None if it is not known.
+        """
+        return getattr(self, "_WeatherRecord__humidity", None)
+
+    @property
+    def pressure(self):
+        """
+        Atmospheric pressure at sea level in hPa, or None if it is not known.
+        """
+        return getattr(self, "_WeatherRecord__pressure", None)
+
+    @property
+    def wind_gust(self):
+        """
+        Wind gust in meters per second, or None if it is not known or reported.
+        """
+        return getattr(self, "_WeatherRecord__wind_gust", None)
+
+    def get_datetime(self) -> datetime:
+        """
+        Converts the Unix timestamp (self.datetime) to a datetime object.
+
+        :return: A datetime object representing the date and time of the weather data.
+        """
+        return datetime.utcfromtimestamp(self.datetime)
+
+
+@dataclass(slots=True)
+class WeatherData(WeatherRecord):
+    """
+    Contains weather data. Instances have no __dict__, see FrozenWeatherData for an immutable variant.
 
     :argument lat: float - Latitude of the location.
     :argument lon: float - Longitude of the location.
@@ -47,40 +305,128 @@ class WeatherData:
     timezone: int
     name: str
 
-    def to_json(self) -> json:
+
+_field_values = attrgetter(*(field.name for field in fields(WeatherData)))  # The values the JSON is encoded from
+
+FrozenWeatherData = make_dataclass(
+    "FrozenWeatherData",
+    [(field.name, field.type) for field in fields(WeatherData)],
+    bases=(WeatherRecord,),
+    frozen=True,
+    slots=True,
+    namespace={
+        "__doc__": "Contains weather data like WeatherData, but the instances are immutable and hashable.",
+        "__module__": __name__,
+    },
+)
+
+
+class WeatherTable:
+    """
+    A columnar container of many weather observations.
+
+    Numeric fields are stored in typed arrays and condition strings as indexes into a shared table of distinct
+    strings, which takes a fraction of the memory of the same number of WeatherData instances.
+    """
+    __numeric_columns = (
+        ("lat", "d"),
+        ("lon", "d"),
+        ("temperature", "d"),
+        ("temperature_feels_like", "d"),
+        ("visibility", "q"),
+        ("wind_speed", "d"),
+        ("datetime", "q"),
+        ("sunrise", "q"),
+        ("sunset", "q"),
+        ("timezone", "i"),
+    )
+    __string_columns = ("weather_main", "weather_description")
+
+    def __init__(self, records=()):
         """
-        Converts the WeatherData instance into a JSON string.
+        Initializes the table.
 
-        :return: A JSON string representing the weather data.
+        :param records: Optional iterable of WeatherData instances to append.
         """
-        data_dict = {
-            "weather": {
-                "main": self.weather_main,
-                "description": self.weather_description
-            },
-            "temperature": {
-                "temp": self.temperature,
-                "feels_like": self.temperature_feels_like
-            },
-            "visibility": self.visibility,
-            "wind": {
-                "speed": self.wind_speed
-            },
-            "datetime": self.datetime,
-            "sys": {
-                "sunrise": self.sunrise,
-                "sunset": self.sunset
-            },
-            "timezone": self.timezone,
-            "name": self.name
-        }
+        self.__columns = {name: array(typecode) for name, typecode in self.__numeric_columns}
+        for name in self.__string_columns:
+            self.__columns[name] = array("I")
+        self.__strings = list()  # Distinct condition strings
+        self.__string_codes = dict()  # string -> index in self.__strings
+        self.__names = list()
+        for record in records:
+            self.append(record)
 
-        return json.dumps(data_dict)
+    def __encode(self, value: str) -> int:
+        code = self.__string_codes.get(value)
+        if code is None:
+            code = self.__string_codes[value] = len(self.__strings)
+            self.__strings.append(value)
+        return code
 
-    def get_datetime(self) -> datetime:
+    def __cast(self, name: str, value):
+        return value if self.__columns[name].typecode == "d" else int(value)
+
+    def append(self, record: WeatherRecord) -> int:
         """
-        Converts the Unix timestamp (self.datetime) to a datetime object.
+        Appends an observation.
 
-        :return: A datetime object representing the date and time of the weather data.
+        :param record: The observation.
+        :return: The row index of the observation.
         """
-        return datetime.utcfromtimestamp(self.datetime)
+        for name, _ in self.__numeric_columns:
+            self.__columns[name].append(self.__cast(name, getattr(record, name)))
+        for name in self.__string_columns:
+            self.__columns[name].append(self.__encode(getattr(record, name)))
+        self.__names.append(record.name)
+        return len(self.__names) - 1
+
+    def set(self, index: int, record: WeatherRecord) -> None:
+        """
+        Replaces the observation in a row, e.g. after a refresh.
+
+        :param index: The row index.
+        :param record: The new observation.
+        """
+        for name, _ in self.__numeric_columns:
+            self.__columns[name][index] = self.__cast(name, getattr(record, name))
+        for name in self.__string_columns:
+            self.__columns[name][index] = self.__encode(getattr(record, name))
+        self.__names[index] = record.name
+
+    def column(self, name: str):
+        """
+        Returns a column. Numeric columns are typed arrays, condition and name columns are lists of strings.
+
+        :param name: The name of a WeatherData field.
+        :return: The values of the field for all rows.
+        """
+        if name == "name":
+            return self.__names
+        if name in self.__string_columns:
+            return [self.__strings[code] for code in self.__columns[name]]
+        return self.__columns[name]
+
+    def nbytes(self) -> int:
+        """
+        Returns the approximate memory used by the table.
+
+        :return: The size in bytes of the arrays, the string table and the names.
+        """
+        size = sum(column.buffer_info()[1] * column.itemsize for column in self.__columns.values())
+        size += sys.getsizeof(self.__strings) + sum(sys.getsizeof(value) for value in self.__strings)
+        size += sys.getsizeof(self.__names) + sum(sys.getsizeof(value) for value in self.__names)
+        return size
+
+    def __getitem__(self, index: int) -> WeatherData:
+        values = {name: self.__columns[name][index] for name, _ in self.__numeric_columns}
+        for name in self.__string_columns:
+            values[name] = self.__strings[self.__columns[name][index]]
+        return WeatherData(name=self.__names[index], **values)
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
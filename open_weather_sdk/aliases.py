@@ -0,0 +1,124 @@
+import threading
+
+from open_weather_sdk.geocache import normalize_city_name
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a location query such as "London, GB" so that equivalent spellings are equal.
+
+    :param query: A city name, optionally qualified with a state and a country code separated by commas.
+    :return: The comma-separated parts with collapsed whitespace in case-folded form.
+    """
+    return ",".join(normalize_city_name(part) for part in query.split(","))
+
+
+class AliasIndex:
+    """
+    Maps location queries onto canonical location IDs, so equivalent queries share one cache entry.
+
+    A location ID is made of the coordinates rounded to the precision, so lookups by nearby coordinates share it as
+    well. Names are added with their variants qualified by state and country code when they are geocoded.
+    """
+
+    def __init__(self, precision: int = 3):
+        """
+        Initializes an empty index.
+
+        :param precision: The number of decimals of the coordinates of location IDs (3 is about 100 meters).
+        """
+        self.__precision = precision
+        self.__aliases = dict()  # Normalized query -> location ID
+        self.__locations = dict()  # Location ID -> (lat, lon, name)
+        self.__lock = threading.Lock()
+
+    def location_id(self, lat: float, lon: float) -> str:
+        """
+        Returns the location ID of coordinates.
+
+        :param lat: Latitude in degrees.
+        :param lon: Longitude in degrees.
+        :return: The rounded coordinates as "lat,lon".
+        """
+        # Adding 0.0 turns the -0.0 of small negative values into 0.0
+        lat = round(lat, self.__precision) + 0.0
+        lon = round(lon, self.__precision) + 0.0
+        return f"{lat:.{self.__precision}f},{lon:.{self.__precision}f}"
+
+    def resolve(self, query: str):
+        """
+        Returns the location ID of a query.
+
+        :param query: A city name, optionally qualified with a state and a country code.
+        :return: The location ID, or None if the query is not known.
+        """
+        return self.__aliases.get(normalize_query(query))
+
+    def add(self, query: str, lat: float, lon: float, name: str = None) -> str:
+        """
+        Adds a query for a location.
+
+        :param query: A city name, optionally qualified with a state and a country code.
+        :param lat: The latitude of the location.
+        :param lon: The longitude of the location.
+        :param name: The name of the location (defaults to the query of the first addition).
+        :return: The location ID.
+        """
+        location_id = self.location_id(lat, lon)
+        with self.__lock:
+            if name is not None or location_id not in self.__locations:
+                self.__locations[location_id] = (lat, lon, name or query.strip())
+            self.__aliases[normalize_query(query)] = location_id
+        return location_id
+
+    def add_geocoding(self, query: str, result: dict) -> str:
+        """
+        Adds a query and the name variants of its geocoding result.
+
+        :param query: The geocoded query.
+        :param result: An entry of a /geo/1.0/direct response with "name", "lat", "lon" and optionally "state"
+                       and "country".
+        :return: The location ID.
+        """
+        name = result.get("name")
+        location_id = self.add(query, result["lat"], result["lon"], name)
+        if name:
+            state, country = result.get("state"), result.get("country")
+            variants = [name]
+            if country:
+                variants.append(f"{name},{country}")
+            if state:
+                variants.append(f"{name},{state}")
+                if country:
+                    variants.append(f"{name},{state},{country}")
+            with self.__lock:
+                for variant in variants:
+                    self.__aliases[normalize_query(variant)] = location_id
+        return location_id
+
+    def get_coordinates(self, location_id: str):
+        """
+        Returns the coordinates of a location.
+
+        :param location_id: The location ID.
+        :return: A tuple containing the latitude and longitude, or None if the location is not known.
+        """
+        location = self.__locations.get(location_id)
+        return None if location is None else location[:2]
+
+    def get_name(self, location_id: str, default: str = None) -> str:
+        """
+        Returns the name of a location.
+
+        :param location_id: The location ID.
+        :param default: The value returned if the location is not known.
+        :return: The name.
+        """
+        location = self.__locations.get(location_id)
+        return default if location is None else location[2]
+
+    def __contains__(self, query: str) -> bool:
+        return self.resolve(query) is not None
+
+    def __len__(self) -> int:
+        return len(self.__aliases)
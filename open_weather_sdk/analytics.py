@@ -0,0 +1,118 @@
+from dataclasses import fields
+
+from open_weather_sdk import WeatherData, WeatherTable
+from open_weather_sdk.units import celsius_to_fahrenheit, meters_per_second_to_mph
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, only the export functions need it
+    numpy = None
+
+try:
+    import pandas
+except ImportError:  # pandas is optional, only to_dataframe needs it
+    pandas = None
+
+FIELDS = tuple(field.name for field in fields(WeatherData))
+
+
+def _require(module, name: str):
+    if module is None:
+        raise ImportError(f"{name} is required for this function, install it with: pip install {name}")
+    return module
+
+
+def _as_table(records) -> WeatherTable:
+    return records if isinstance(records, WeatherTable) else WeatherTable(records)
+
+
+def _columns(table: WeatherTable) -> dict:
+    """
+    Returns the columns of the table as numpy arrays. Numeric columns share the memory of the table.
+
+    :param table: The table of observations.
+    :return: A dictionary mapping field names to numpy arrays in the order of the WeatherData fields.
+    """
+    columns = dict()
+    for name in FIELDS:
+        column = table.column(name)
+        if isinstance(column, list):
+            columns[name] = numpy.array(column, dtype=object)
+        else:
+            columns[name] = numpy.frombuffer(column, dtype=column.typecode)
+    return columns
+
+
+def to_numpy(records):
+    """
+    Exports observations to a numpy structured array with one field per WeatherData field.
+
+    Numeric fields are copied from the typed arrays of a WeatherTable column by column, without serializing
+    any record. Condition strings and names are object fields.
+
+    :param records: A WeatherTable or an iterable of WeatherData instances, e.g. OpenWeatherSDK.get_table().
+    :return: A numpy structured array.
+    """
+    _require(numpy, "numpy")
+    columns = _columns(_as_table(records))
+    result = numpy.empty(len(columns["name"]), dtype=[(name, column.dtype) for name, column in columns.items()])
+    for name, column in columns.items():
+        result[name] = column
+    return result
+
+
+def to_dataframe(records):
+    """
+    Exports observations to a pandas DataFrame with one column per WeatherData field.
+
+    :param records: A WeatherTable or an iterable of WeatherData instances, e.g. OpenWeatherSDK.get_table().
+    :return: A pandas DataFrame.
+    """
+    _require(numpy, "numpy")
+    _require(pandas, "pandas")
+    return pandas.DataFrame(_columns(_as_table(records)), copy=True)
+
+
+def to_imperial(data):
+    """
+    Converts temperatures from Celsius to Fahrenheit and wind speed from meters per second to miles per hour,
+    the units of the API's imperial mode. Visibility stays in meters as in the API.
+
+    :param data: A structured array or DataFrame returned by to_numpy or to_dataframe.
+    :return: A converted copy of the data.
+    """
+    result = data.copy()
+    for name in ("temperature", "temperature_feels_like"):
+        result[name] = celsius_to_fahrenheit(data[name])
+    result["wind_speed"] = meters_per_second_to_mph(data["wind_speed"])
+    return result
+
+
+def between(data, name: str, low: float = None, high: float = None):
+    """
+    Selects the observations with a field within a range, e.g. between(data, "wind_speed", low=10).
+
+    :param data: A structured array or DataFrame returned by to_numpy or to_dataframe.
+    :param name: The name of a numeric field.
+    :param low: The inclusive lower bound (optional).
+    :param high: The inclusive upper bound (optional).
+    :return: The selected observations.
+    """
+    values = data[name]
+    mask = numpy.ones(len(data), dtype=bool)
+    if low is not None:
+        mask &= numpy.asarray(values >= low)
+    if high is not None:
+        mask &= numpy.asarray(values <= high)
+    return data[mask]
+
+
+def after_sunset(data):
+    """
+    Selects the observations made between sunset and sunrise.
+
+    :param data: A structured array or DataFrame returned by to_numpy or to_dataframe.
+    :return: The selected observations.
+    """
+    mask = numpy.asarray((data["datetime"] >= data["sunset"]) | (data["datetime"] < data["sunrise"]))
+    return data[mask]
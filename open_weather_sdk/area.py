@@ -0,0 +1,70 @@
+import math
+
+from open_weather_sdk.spatial import EARTH_RADIUS, SpatialIndex
+
+
+def cluster_locations(locations: dict, radius: float) -> list:
+    """
+    Groups locations so that every location of a group is within the radius of the group's center.
+
+    Locations are taken in order, each one not yet grouped becomes the center of a new group with all the
+    ungrouped locations within the radius. Neighbours are looked up in a spatial index, so the cost depends on
+    the density of the locations rather than on their total number.
+
+    :param locations: A dictionary mapping keys to (lat, lon) tuples.
+    :param radius: The radius of a group in meters.
+    :return: A list of (center (lat, lon), {key: (lat, lon)}) tuples.
+    """
+    index = SpatialIndex(max(math.degrees(radius / EARTH_RADIUS), 0.001))
+    for key, (lat, lon) in locations.items():
+        index.add(key, lat, lon)
+    clusters = list()
+    for key, center in locations.items():
+        if key not in index:  # Already grouped
+            continue
+        members = dict()
+        for _, member in index.within(*center, radius):
+            members[member] = locations[member]
+            index.remove(member)
+        clusters.append((center, members))
+    return clusters
+
+
+def bounding_box(center: tuple, members: dict, margin: float) -> (float, float, float, float):
+    """
+    Calculates the bounding box of a group of locations.
+
+    Longitudes are measured from the center, so groups crossing the antimeridian get a box extending past 180°.
+
+    :param center: The (lat, lon) center of the group.
+    :param members: A dictionary mapping keys to (lat, lon) tuples.
+    :param margin: The margin around the locations in meters.
+    :return: A tuple containing the left longitude, bottom latitude, right longitude and top latitude.
+    """
+    delta_lat = math.degrees(margin / EARTH_RADIUS)
+    delta_lon = delta_lat / max(math.cos(math.radians(center[0])), 0.01)
+    lats = [lat for lat, _ in members.values()]
+    lons = [center[1] + (lon - center[1] + 180) % 360 - 180 for _, lon in members.values()]
+    return (min(lons) - delta_lon, max(min(lats) - delta_lat, -90),
+            max(lons) + delta_lon, min(max(lats) + delta_lat, 90))
+
+
+def match_stations(stations: list, locations: dict, max_distance: float) -> dict:
+    """
+    Maps each location to the nearest station within the maximum distance.
+
+    :param stations: A list of station entries of a /data/2.5/find or /data/2.5/box/city response.
+    :param locations: A dictionary mapping keys to (lat, lon) tuples.
+    :param max_distance: The maximum distance in meters between a location and its station.
+    :return: A dictionary mapping the keys of the matched locations to station entries.
+    """
+    index = SpatialIndex()
+    for position, station in enumerate(stations):
+        coord = station.get("coord", {})
+        index.add(position, coord.get("lat", coord.get("Lat")), coord.get("lon", coord.get("Lon")))
+    matches = dict()
+    for key, (lat, lon) in locations.items():
+        nearest = index.nearest(lat, lon, 1)
+        if nearest and nearest[0][0] <= max_distance:
+            matches[key] = stations[nearest[0][1]]
+    return matches
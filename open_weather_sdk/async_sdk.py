@@ -0,0 +1,228 @@
+import asyncio
+import json
+
+import aiohttp
+
+from open_weather_sdk import WeatherData
+from open_weather_sdk.cache import BaseCache, LRUCache
+from open_weather_sdk.exeptions import *
+
+
+class AsyncOpenWeatherSDK:
+    """
+    An asyncio client for the OpenWeatherMap API built on aiohttp.
+
+    It mirrors OpenWeatherSDK: the same cache semantics (an LRU cache whose TTL is the update time)
+    and the same exceptions. The number of requests in flight is capped with a semaphore, so thousands
+    of lookups can be fanned out with asyncio.gather without a thread per request.
+
+    The aiohttp session is bound to the running event loop, so unlike OpenWeatherSDK this class is not a
+    singleton per API key. Use it as an async context manager or call close() when done.
+    """
+
+    def __init__(self, apikey: str, max_concurrency: int = 100, limit_per_host: int = 100,
+                 timeout: float = 10, cache_capacity: int = 10, cache: BaseCache = None,
+                 base_url: str = "https://api.openweathermap.org", keep_raw: bool = False):
+        """
+        Initializes the client. The HTTP session is created lazily on the first request.
+
+        :param apikey: The API key for authenticating requests to OpenWeatherMap.
+        :param max_concurrency: The maximum number of requests in flight at the same time.
+        :param limit_per_host: The maximum number of keep-alive connections per host.
+        :param timeout: The total timeout of a single request in seconds.
+        :param cache_capacity: The maximum number of cities kept in the default LRU cache.
+        :param cache: Optional BaseCache implementation used instead of the default LRU cache.
+        :param base_url: The base URL of the API, e.g. of a local stand-in server.
+        :param keep_raw: Whether fetched weather data keeps the body of the response for get_raw and get_payload.
+        """
+        self.__api_key = apikey
+        self.__base_url = base_url.rstrip("/")
+        self.__keep_raw = keep_raw
+        self.__update_time = 10 * 60  # Default update time in seconds
+        # Cache for storing recent weather data
+        self.__local_cache = LRUCache(cache_capacity) if cache is None else cache
+        self.__local_cache.set_ttl(self.__update_time)
+        self.__params = {  # Default parameters for API requests
+            'appid': apikey,
+            "exclude": "minutely,hourly,daily,alerts",
+            "units": "metric",
+            "lang": "en",
+        }
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+        self.__in_flight = dict()  # city -> Future of the fetch in flight
+        self.__limit_per_host = limit_per_host
+        self.__timeout = aiohttp.ClientTimeout(total=timeout)
+        self.__session = None
+
+    async def __aenter__(self) -> "AsyncOpenWeatherSDK":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def __get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the HTTP session, creating it on first use inside the running event loop.
+
+        :return: The aiohttp session shared by all requests of this client.
+        """
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.__limit_per_host)
+            self.__session = aiohttp.ClientSession(connector=connector, timeout=self.__timeout)
+        return self.__session
+
+    async def close(self) -> None:
+        """
+        Closes the HTTP session and all pooled connections.
+        """
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    def get_update_time(self) -> int:
+        """
+        Returns the current update time interval for weather data.
+
+        :return: The update time interval in seconds.
+        """
+        return self.__update_time
+
+    def set_update_time(self, update_time) -> None:
+        """
+        Sets a new update time interval for weather data.
+
+        :param update_time: The new update time interval in seconds.
+        """
+        self.__update_time = update_time
+        self.__local_cache.set_ttl(update_time)
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns weather data cache statistics.
+
+        :return: A dictionary with hit, miss and eviction counters and the current size of the cache.
+        """
+        return self.__local_cache.get_stats()
+
+    async def get_city_coordinates(self, city_name) -> (float, float):
+        """
+        Retrieves the latitude and longitude for a given city name.
+
+        :param city_name: The name of the city.
+        :return: A tuple containing the latitude and longitude of the city.
+        """
+        # Attempt to retrieve city coordinates from the local cache
+
+        weather_data = self.__local_cache.peek(city_name)
+        if weather_data is not None:
+            return weather_data.lat, weather_data.lon
+
+        # Make an API request if the city is not in the local cache
+
+        url = f"{self.__base_url}/geo/1.0/direct"
+        params = {
+            'q': city_name,
+            'limit': 1,
+            'appid': self.__api_key
+        }
+        async with self.__semaphore:
+            async with self.__get_session().get(url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data:
+                        return data[0]['lat'], data[0]['lon']
+                    else:
+                        raise InvalidCity("Город не найден")
+                elif response.status == 401:
+                    raise UnauthorizedError("Unauthorized access", await response.json())
+                elif response.status == 404:
+                    raise NotFoundError("Ресурс не найден", await response.json())
+                else:
+                    raise RequestError("Ошибка запроса к Geocoding API:", await response.text())
+
+    async def get_weatherdata(self, city: str, lat: float = None, lon: float = None) -> json:
+        """
+        Retrieves or updates the weather data for a specified city.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :return: A JSON object containing the weather data.
+        """
+        return (await self.get_weatherdata_object(city, lat, lon)).to_json()
+
+    async def get_weatherdata_bytes(self, city: str, lat: float = None, lon: float = None) -> bytes:
+        """
+        Retrieves or updates the weather data for a specified city as UTF-8 encoded JSON.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :return: JSON bytes containing the weather data.
+        """
+        return (await self.get_weatherdata_object(city, lat, lon)).to_json_bytes()
+
+    async def get_weatherdata_object(self, city: str, lat: float = None, lon: float = None) -> WeatherData:
+        """
+        Retrieves or updates the weather data for a specified city without serializing it.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :return: An instance of WeatherData. It is shared with the cache and must not be modified.
+        """
+
+        # Check if city is not in cache
+
+        weather_data = self.__local_cache.get(city)
+        if weather_data is None:  # Concurrent misses for the same city share one request
+            future = self.__in_flight.get(city)
+            if future is None:
+                future = self.__in_flight[city] = asyncio.ensure_future(self.__refresh(city, lat, lon))
+                future.add_done_callback(lambda _: self.__in_flight.pop(city, None))
+            weather_data = await asyncio.shield(future)
+        return weather_data
+
+    async def __refresh(self, city: str, lat: float = None, lon: float = None) -> WeatherData:
+        """
+        Requests weather data for the city and puts it into the cache.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional).
+        :param lon: The longitude of the city (optional).
+        :return: An instance of WeatherData containing the retrieved weather information.
+        """
+        params = self.__params.copy()
+        if not lat and not lon:  # Get city coordinates if not provided
+            lat, lon = await self.get_city_coordinates(city)
+        params["lat"] = lat
+        params["lon"] = lon
+        params["city_name"] = city
+        weather_data = await self.req_for_weatherdata(params)
+        self.__local_cache.set(city, weather_data)
+        return weather_data
+
+    async def req_for_weatherdata(self, params: dict) -> WeatherData:
+        """
+        Makes a request to the OpenWeatherMap API to retrieve weather data for specific coordinates.
+
+        :param params: A dictionary containing request parameters including latitude, longitude, and API key.
+                       Params can be found at https://api.openweathermap.org/data/2.5/weather
+        :return: An instance of WeatherData containing the retrieved weather information.
+        """
+        url = f"{self.__base_url}/data/2.5/weather"
+        async with self.__semaphore:
+            async with self.__get_session().get(url, params=params) as response:
+
+                # Process the response and construct a WeatherData instance
+
+                if response.status == 200:
+                    raw = await response.read()
+                    return WeatherData.from_bytes(raw, params["lat"], params["lon"], params["city_name"],
+                                                  self.__keep_raw)
+                elif response.status == 401:
+                    raise UnauthorizedError("Unauthorized access", await response.json())
+                elif response.status == 404:
+                    raise NotFoundError("Ресурс не найден", await response.json())
+                else:
+                    raise RequestError("Ошибка получения данных от API:", (await response.json())["message"])
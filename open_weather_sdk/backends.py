@@ -0,0 +1,437 @@
+import json
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, fields
+
+from open_weather_sdk import WeatherData, dumps_json
+from open_weather_sdk.cache import BaseCache, LRUCache
+from open_weather_sdk.exeptions import CacheBackendError
+
+FIELD_COUNT = len(fields(WeatherData))
+
+
+def encode_weather_data(weather_data: WeatherData) -> bytes:
+    """
+    Encodes weather data for a cache shared between processes.
+
+    :param weather_data: The weather data.
+    :return: The field values followed by the extra fields as a JSON array.
+    """
+    return dumps_json(astuple(weather_data) + weather_data.get_extras())
+
+
+def decode_weather_data(data: bytes) -> WeatherData:
+    """
+    Decodes weather data encoded by encode_weather_data. Entries written without the extra fields are accepted.
+
+    :param data: The encoded weather data.
+    :return: An instance of WeatherData.
+    """
+    values = json.loads(data)
+    weather_data = WeatherData(*values[:FIELD_COUNT])
+    if len(values) > FIELD_COUNT:
+        weather_data.set_extras(*values[FIELD_COUNT:])
+    return weather_data
+
+
+class DecodedCache:
+    """
+    The weather data last decoded for each key of a shared cache, kept by the process reading it.
+
+    A value is reused as long as the stored bytes are the same, so repeated reads return the same instance with its
+    memoized JSON, as the in-process cache does, instead of decoding and allocating a new instance every time.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initializes an empty cache.
+
+        :param capacity: The maximum number of decoded values kept.
+        """
+        self.__values = LRUCache(capacity, float("inf"))  # key -> (stored bytes, WeatherData)
+
+    def decode(self, key: str, data: bytes) -> WeatherData:
+        """
+        Returns the weather data stored as data, decoding it only if it differs from the last one seen for the key.
+
+        :param key: The cache key.
+        :param data: The stored bytes.
+        :return: An instance of WeatherData.
+        """
+        entry = self.__values.get(key)
+        if entry is not None and entry[0] == data:
+            return entry[1]
+        value = decode_weather_data(data)
+        self.__values.set(key, (data, value))
+        return value
+
+    def encode(self, key: str, value: WeatherData) -> bytes:
+        """
+        Encodes weather data to be stored and remembers the instance for later reads of the same bytes.
+
+        :param key: The cache key.
+        :param value: The weather data.
+        :return: The bytes to store.
+        """
+        data = encode_weather_data(value)
+        self.__values.set(key, (data, value))
+        return data
+
+    def delete(self, key: str) -> None:
+        """
+        Forgets the weather data of a key.
+
+        :param key: The cache key.
+        """
+        self.__values.delete(key)
+
+
+class SQLiteCache(BaseCache):
+    """
+    A cache in an SQLite file on local disk, shared by all processes of the host (e.g. gunicorn workers).
+
+    Entries keep the time they were fetched at, so every process applies its own TTL. The least recently used
+    entries above the capacity are pruned in batches, so the capacity is enforced approximately.
+    """
+
+    def __init__(self, path: str, capacity: int = 100_000, ttl: float = 10 * 60, timeout: float = 5,
+                 decoded_capacity: int = 1000):
+        """
+        Opens (and creates if needed) the cache database.
+
+        :param path: The path to the SQLite file.
+        :param capacity: The maximum number of entries.
+        :param ttl: The time in seconds a value stays fresh.
+        :param timeout: The time in seconds to wait for a lock held by another process.
+        :param decoded_capacity: The maximum number of decoded values reused while their stored bytes are unchanged.
+        """
+        self.__capacity = capacity
+        self.__decoded = DecodedCache(decoded_capacity)
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__sets_since_prune = 0
+        self.__connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, fetched REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS leader (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expiry REAL NOT NULL)"
+        )
+
+    def __execute(self, query: str, parameters=()) -> sqlite3.Cursor:
+        with self.__lock:
+            try:
+                return self.__connection.execute(query, parameters)
+            except sqlite3.Error as e:
+                raise CacheBackendError("SQLite cache error", str(e)) from e
+
+    def get(self, key: str):
+        row = self.__execute("SELECT value, fetched, used FROM entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now >= row[1] + self.__ttl:
+            self.__misses += 1
+            return None
+        if now - row[2] > 1:  # Limit writes on hot keys, recency only needs to be approximate
+            self.__execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+        self.__hits += 1
+        return self.__decoded.decode(key, row[0])
+
+    def peek(self, key: str):
+        row = self.__execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else self.__decoded.decode(key, row[0])
+
+    def get_with_age(self, key: str):
+        row = self.__execute("SELECT value, fetched FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (self.__decoded.decode(key, row[0]), time.time() - row[1])
+
+    def set(self, key: str, value, timestamp: float = None) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        self.__execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+            (key, self.__decoded.encode(key, value), timestamp, time.time())
+        )
+        self.__sets_since_prune += 1
+        if self.__sets_since_prune >= max(1, self.__capacity // 100):
+            self.__sets_since_prune = 0
+            deleted = self.__execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.__capacity,)
+            ).rowcount
+            self.__evictions += max(deleted, 0)
+
+    def delete(self, key: str) -> None:
+        self.__execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.__decoded.delete(key)
+
+    def items(self) -> list:
+        rows = self.__execute("SELECT key, value FROM entries").fetchall()
+        return [(key, self.__decoded.decode(key, value)) for key, value in rows]
+
+    def record_lookup(self, hit: bool) -> None:
+        if hit:
+            self.__hits += 1
+        else:
+            self.__misses += 1
+
+    def get_ttl(self) -> float:
+        return self.__ttl
+
+    def set_ttl(self, ttl: float) -> None:
+        self.__ttl = ttl
+
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+            "size": self.__execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+            "capacity": self.__capacity,
+        }
+
+    def try_acquire_leadership(self, owner: str, lease: float) -> bool:
+        now = time.time()
+        with self.__lock:
+            try:
+                self.__connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self.__connection.execute("SELECT owner, expiry FROM leader WHERE name = 'polling'").fetchone()
+                    leader = row is None or row[0] == owner or row[1] <= now
+                    if leader:
+                        self.__connection.execute(
+                            "INSERT OR REPLACE INTO leader VALUES ('polling', ?, ?)", (owner, now + lease)
+                        )
+                finally:
+                    self.__connection.execute("COMMIT")
+            except sqlite3.Error as e:
+                raise CacheBackendError("SQLite cache error", str(e)) from e
+        return leader
+
+    def release_leadership(self, owner: str) -> None:
+        self.__execute("DELETE FROM leader WHERE name = 'polling' AND owner = ?", (owner,))
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.__lock:
+            self.__connection.close()
+
+
+class RespClient:
+    """
+    A minimal thread-safe client of the Redis protocol (RESP2) over one TCP connection.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0, password: str = None,
+                 timeout: float = 5):
+        """
+        Initializes the client. The connection is opened on the first command.
+
+        :param host: The server host.
+        :param port: The server port.
+        :param db: The database number.
+        :param password: Optional password for AUTH.
+        :param timeout: The socket timeout in seconds.
+        """
+        self.__address = (host, port)
+        self.__db = db
+        self.__password = password
+        self.__timeout = timeout
+        self.__lock = threading.Lock()
+        self.__socket = None
+        self.__file = None
+
+    def __connect(self) -> None:
+        self.__socket = socket.create_connection(self.__address, timeout=self.__timeout)
+        self.__file = self.__socket.makefile("rb")
+        if self.__password:
+            self.__command("AUTH", self.__password)
+        if self.__db:
+            self.__command("SELECT", self.__db)
+
+    def __command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.__socket.sendall(b"".join(parts))
+        return self.__read()
+
+    def __read(self):
+        line = self.__file.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise CacheBackendError("Redis error", payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.__file.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self.__read() for _ in range(length)]
+        raise CacheBackendError("Unexpected Redis reply", line)
+
+    def execute(self, *args):
+        """
+        Sends a command and returns its reply, reconnecting once if the connection was lost.
+
+        :param args: The command name and its arguments.
+        :return: The decoded reply: str, int, bytes, None or a list of them.
+        """
+        with self.__lock:
+            for attempt in range(2):
+                try:
+                    if self.__socket is None:
+                        self.__connect()
+                    return self.__command(*args)
+                except (OSError, ConnectionError) as e:
+                    self.__close()
+                    if attempt:
+                        raise CacheBackendError("Redis connection error", str(e)) from e
+
+    def __close(self) -> None:
+        if self.__socket is not None:
+            self.__file.close()
+            self.__socket.close()
+        self.__socket = self.__file = None
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+        with self.__lock:
+            self.__close()
+
+
+class RedisCache(BaseCache):
+    """
+    A cache in a Redis (or Redis-protocol compatible) server, shared by processes on many hosts.
+
+    Entries keep the time they were fetched at, so every process applies its own TTL. Stale entries are kept for
+    the retention time so their coordinates stay available, and the server's eviction policy (e.g. allkeys-lru)
+    bounds the memory.
+    """
+    # Compare-and-set scripts, so a process never extends or deletes a lease that expired and was taken by another
+    __RENEW_SCRIPT = ("if redis.call('GET', KEYS[1]) == ARGV[1] then "
+                      "return redis.call('PEXPIRE', KEYS[1], ARGV[2]) else return 0 end")
+    __RELEASE_SCRIPT = ("if redis.call('GET', KEYS[1]) == ARGV[1] then "
+                        "return redis.call('DEL', KEYS[1]) else return 0 end")
+
+    def __init__(self, client: RespClient = None, prefix: str = "open_weather_sdk:", ttl: float = 10 * 60,
+                 retention: float = 24 * 60 * 60, decoded_capacity: int = 1000):
+        """
+        Initializes the cache.
+
+        :param client: The client of the server (defaults to a RespClient for 127.0.0.1:6379).
+        :param prefix: The prefix of all keys written by the cache.
+        :param ttl: The time in seconds a value stays fresh.
+        :param retention: The time in seconds a value is kept in the server after it was stored.
+        :param decoded_capacity: The maximum number of decoded values reused while their stored bytes are unchanged.
+        """
+        self.__client = client or RespClient()
+        self.__decoded = DecodedCache(decoded_capacity)
+        self.__prefix = prefix
+        self.__entry_prefix = prefix + "entry:"
+        self.__ttl = ttl
+        self.__retention = retention
+        self.__hits = 0
+        self.__misses = 0
+
+    def __decode(self, key: str, data: bytes):
+        fetched, value = data.split(b"\n", 1)
+        return float(fetched), self.__decoded.decode(key, value)
+
+    def get(self, key: str):
+        data = self.__client.execute("GET", self.__entry_prefix + key)
+        if data is not None:
+            fetched, value = self.__decode(key, data)
+            if time.time() < fetched + self.__ttl:
+                self.__hits += 1
+                return value
+        self.__misses += 1
+        return None
+
+    def peek(self, key: str):
+        data = self.__client.execute("GET", self.__entry_prefix + key)
+        return None if data is None else self.__decode(key, data)[1]
+
+    def get_with_age(self, key: str):
+        data = self.__client.execute("GET", self.__entry_prefix + key)
+        if data is None:
+            return None
+        fetched, value = self.__decode(key, data)
+        return value, time.time() - fetched
+
+    def set(self, key: str, value, timestamp: float = None) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        data = repr(timestamp).encode() + b"\n" + self.__decoded.encode(key, value)
+        retention = int(max(self.__retention, self.__ttl) * 1000)
+        self.__client.execute("SET", self.__entry_prefix + key, data, "PX", retention)
+
+    def delete(self, key: str) -> None:
+        self.__client.execute("DEL", self.__entry_prefix + key)
+        self.__decoded.delete(key)
+
+    def __keys(self) -> list:
+        keys = list()
+        cursor = "0"
+        while True:
+            cursor, batch = self.__client.execute("SCAN", cursor, "MATCH", self.__entry_prefix + "*", "COUNT", 1000)
+            keys.extend(batch)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else cursor
+            if cursor == "0":
+                return keys
+
+    def items(self) -> list:
+        keys = self.__keys()
+        if not keys:
+            return []
+        values = self.__client.execute("MGET", *keys)
+        offset = len(self.__entry_prefix)
+        keys = [key[offset:].decode() for key in keys]
+        return [(key, self.__decode(key, value)[1]) for key, value in zip(keys, values) if value]
+
+    def record_lookup(self, hit: bool) -> None:
+        if hit:
+            self.__hits += 1
+        else:
+            self.__misses += 1
+
+    def get_ttl(self) -> float:
+        return self.__ttl
+
+    def set_ttl(self, ttl: float) -> None:
+        self.__ttl = ttl
+
+    def get_stats(self) -> dict:
+        return {"hits": self.__hits, "misses": self.__misses, "evictions": 0, "size": len(self.__keys())}
+
+    def try_acquire_leadership(self, owner: str, lease: float) -> bool:
+        key = self.__prefix + "leader"
+        lease = max(int(lease * 1000), 1)
+        if self.__client.execute("SET", key, owner, "NX", "PX", lease) == "OK":
+            return True
+        return self.__client.execute("EVAL", self.__RENEW_SCRIPT, 1, key, owner, lease) == 1
+
+    def release_leadership(self, owner: str) -> None:
+        self.__client.execute("EVAL", self.__RELEASE_SCRIPT, 1, self.__prefix + "leader", owner)
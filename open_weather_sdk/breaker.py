@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker guarding one API endpoint.
+
+    It is closed while requests succeed. After failure_threshold consecutive failures it opens and rejects requests
+    for reset_timeout seconds, so callers fail fast instead of waiting on a failing upstream. Then it is half-open:
+    one trial request is let through, which closes the breaker on success and opens it again on failure.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        Initializes a closed breaker.
+
+        :param failure_threshold: The number of consecutive failures that opens the breaker.
+        :param reset_timeout: The time in seconds the breaker stays open before a trial request.
+        """
+        self.__failure_threshold = failure_threshold
+        self.__reset_timeout = reset_timeout
+        self.__state = self.CLOSED
+        self.__consecutive_failures = 0
+        self.__opened_at = 0.0  # Monotonic time the breaker opened at
+        self.__trial = False  # Whether the trial request of the half-open state is in flight
+        self.__lock = threading.Lock()
+        self.__failures = 0
+        self.__opened = 0
+        self.__rejected = 0
+
+    def allow(self) -> bool:
+        """
+        Checks whether a request may be sent. A True result must be followed by record_success, record_failure or,
+        if no request is sent after all, release.
+
+        :return: False if the request has to be rejected.
+        """
+        with self.__lock:
+            if self.__state == self.CLOSED:
+                return True
+            if self.__state == self.OPEN:
+                if time.monotonic() - self.__opened_at < self.__reset_timeout:
+                    self.__rejected += 1
+                    return False
+                self.__state = self.HALF_OPEN
+                self.__trial = False
+            if self.__trial:  # Only one trial request at a time
+                self.__rejected += 1
+                return False
+            self.__trial = True
+            return True
+
+    def release(self) -> None:
+        """
+        Gives back a permission of allow that was not used for a request, e.g. because the rate limiter rejected
+        it, so the trial slot of the half-open state becomes free again.
+        """
+        with self.__lock:
+            self.__trial = False
+
+    def record_success(self) -> None:
+        """
+        Records a successful request.
+        """
+        with self.__lock:
+            if self.__state == self.OPEN:  # A request sent before the breaker opened
+                return
+            self.__state = self.CLOSED
+            self.__consecutive_failures = 0
+            self.__trial = False
+
+    def record_failure(self) -> None:
+        """
+        Records a failed request.
+        """
+        with self.__lock:
+            self.__failures += 1
+            self.__consecutive_failures += 1
+            self.__trial = False
+            if self.__state == self.HALF_OPEN or (
+                    self.__state == self.CLOSED and self.__consecutive_failures >= self.__failure_threshold):
+                self.__state = self.OPEN
+                self.__opened_at = time.monotonic()
+                self.__opened += 1
+
+    def get_state(self) -> str:
+        """
+        Returns the state of the breaker.
+
+        :return: "closed", "open" or "half_open".
+        """
+        return self.__state
+
+    def get_retry_after(self) -> float:
+        """
+        Returns the time until the breaker lets a trial request through.
+
+        :return: The time in seconds, 0 if requests are not rejected for time reasons.
+        """
+        if self.__state != self.OPEN:
+            return 0.0
+        return max(self.__reset_timeout - (time.monotonic() - self.__opened_at), 0.0)
+
+    def get_stats(self) -> dict:
+        """
+        Returns breaker statistics.
+
+        :return: A dictionary with the state, the number of failures, the number of times the breaker opened and
+                 the number of rejected requests.
+        """
+        return {
+            "state": self.__state,
+            "failures": self.__failures,
+            "opened": self.__opened,
+            "rejected": self.__rejected,
+        }
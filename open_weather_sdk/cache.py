@@ -0,0 +1,260 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class BaseCache(ABC):
+    """
+    Interface of the weather data cache used by the SDK.
+
+    A cache maps a location key to a value stored together with the Unix time it was fetched at.
+    get() returns only fresh values and counts hits and misses, peek() returns a value regardless of its age.
+    """
+
+    @abstractmethod
+    def get(self, key: str):
+        """
+        Returns the value if it is cached and not older than the TTL.
+
+        :param key: The cache key.
+        :return: The cached value or None.
+        """
+
+    @abstractmethod
+    def peek(self, key: str):
+        """
+        Returns the cached value regardless of its age without updating statistics or recency.
+
+        :param key: The cache key.
+        :return: The cached value or None.
+        """
+
+    @abstractmethod
+    def get_with_age(self, key: str):
+        """
+        Returns the cached value regardless of its age together with the age, without updating statistics.
+
+        :param key: The cache key.
+        :return: A tuple containing the value and the time in seconds since it was fetched, or None.
+        """
+
+    @abstractmethod
+    def set(self, key: str, value, timestamp: float = None) -> None:
+        """
+        Stores the value.
+
+        :param key: The cache key.
+        :param value: The value to store.
+        :param timestamp: The Unix time the value was fetched at (defaults to now).
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Removes the value from the cache if present.
+
+        :param key: The cache key.
+        """
+
+    @abstractmethod
+    def items(self) -> list:
+        """
+        Returns a snapshot of all cached entries.
+
+        :return: A list of (key, value) tuples.
+        """
+
+    def entries(self) -> list:
+        """
+        Returns a snapshot of all cached entries together with the time they were fetched at.
+
+        :return: A list of (key, value, fetch Unix time) tuples.
+        """
+        now = time.time()
+        entries = list()
+        for key, _ in self.items():
+            entry = self.get_with_age(key)
+            if entry is not None:
+                entries.append((key, entry[0], now - entry[1]))
+        return entries
+
+    @abstractmethod
+    def get_ttl(self) -> float:
+        """
+        Returns the time in seconds a value stays fresh.
+
+        :return: The TTL in seconds.
+        """
+
+    @abstractmethod
+    def set_ttl(self, ttl: float) -> None:
+        """
+        Sets the time in seconds a value stays fresh.
+
+        :param ttl: The TTL in seconds.
+        """
+
+    @abstractmethod
+    def get_stats(self) -> dict:
+        """
+        Returns cache statistics.
+
+        :return: A dictionary with hit, miss and eviction counters and the current size.
+        """
+
+    def try_acquire_leadership(self, owner: str, lease: float) -> bool:
+        """
+        Tries to become (or stay) the only owner refreshing the cache in polling mode.
+
+        Caches shared between processes elect one leader, so the cities are refreshed once rather than by every
+        process. A cache private to one process always grants the leadership.
+
+        :param owner: A unique identifier of the caller.
+        :param lease: The time in seconds the leadership lasts unless renewed.
+        :return: True if the caller is the leader.
+        """
+        return True
+
+    def release_leadership(self, owner: str) -> None:
+        """
+        Gives up the leadership if the caller holds it.
+
+        :param owner: The identifier passed to try_acquire_leadership.
+        """
+
+    def record_lookup(self, hit: bool) -> None:
+        """
+        Counts a lookup served with get_with_age in the hit and miss statistics, e.g. when stale values are
+        returned. Caches without statistics ignore it.
+
+        :param hit: Whether the value was returned.
+        """
+
+    def set_eviction_listener(self, listener) -> None:
+        """
+        Sets a function called with the key of every entry evicted to make room.
+        Caches that do not report evictions ignore it.
+
+        :param listener: A function taking the evicted key, or None to remove the listener.
+        """
+
+    def __contains__(self, key: str) -> bool:
+        return self.peek(key) is not None
+
+
+class LRUCache(BaseCache):
+    """
+    An in-memory cache with least-recently-used eviction and a TTL for every entry.
+
+    All operations are O(1): entries are kept in an OrderedDict in recency order and hits move the entry to the end.
+    Every entry stores its expiry time, so checking freshness on a hit is a single comparison.
+    """
+
+    def __init__(self, capacity: int = 10, ttl: float = 10 * 60):
+        """
+        Initializes an empty cache.
+
+        :param capacity: The maximum number of entries before the least recently used one is evicted.
+        :param ttl: The time in seconds a value stays fresh.
+        """
+        if capacity < 1:
+            raise ValueError("Cache capacity must be positive")
+        self.__capacity = capacity
+        self.__ttl = ttl
+        self.__data = OrderedDict()  # key -> (value, expiry Unix time), least recently used first
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__eviction_listener = None
+
+    def get(self, key: str):
+        with self.__lock:
+            entry = self.__data.get(key)
+            if entry is None or time.time() >= entry[1]:
+                self.__misses += 1
+                return None
+            self.__data.move_to_end(key)
+            self.__hits += 1
+            return entry[0]
+
+    def peek(self, key: str):
+        entry = self.__data.get(key)
+        return None if entry is None else entry[0]
+
+    def get_with_age(self, key: str):
+        with self.__lock:
+            entry = self.__data.get(key)
+            if entry is None:
+                return None
+            self.__data.move_to_end(key)
+            return entry[0], time.time() - (entry[1] - self.__ttl)
+
+    def set(self, key: str, value, timestamp: float = None) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        evicted = list()
+        with self.__lock:
+            self.__data[key] = (value, timestamp + self.__ttl)
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.__capacity:  # Evict the least recently used entries
+                evicted.append(self.__data.popitem(last=False)[0])
+                self.__evictions += 1
+        listener = self.__eviction_listener
+        if listener is not None:
+            for evicted_key in evicted:
+                listener(evicted_key)
+
+    def delete(self, key: str) -> None:
+        with self.__lock:
+            self.__data.pop(key, None)
+
+    def items(self) -> list:
+        with self.__lock:
+            return [(key, entry[0]) for key, entry in self.__data.items()]
+
+    def entries(self) -> list:
+        with self.__lock:
+            return [(key, value, expiry - self.__ttl) for key, (value, expiry) in self.__data.items()]
+
+    def get_ttl(self) -> float:
+        return self.__ttl
+
+    def set_ttl(self, ttl: float) -> None:
+        with self.__lock:
+            delta = ttl - self.__ttl
+            self.__ttl = ttl
+            if delta:  # Move the expiry of the stored entries as well
+                for key, (value, expiry) in self.__data.items():
+                    self.__data[key] = (value, expiry + delta)
+
+    def record_lookup(self, hit: bool) -> None:
+        with self.__lock:
+            if hit:
+                self.__hits += 1
+            else:
+                self.__misses += 1
+
+    def set_eviction_listener(self, listener) -> None:
+        self.__eviction_listener = listener
+
+    def get_capacity(self) -> int:
+        """
+        Returns the maximum number of entries.
+
+        :return: The capacity of the cache.
+        """
+        return self.__capacity
+
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+            "size": len(self.__data),
+            "capacity": self.__capacity,
+        }
+
+    def __len__(self) -> int:
+        return len(self.__data)
@@ -21,3 +21,18 @@ class InvalidCity(APIError):
 class RequestError(APIError):
     """Exception raised for other types of request errors."""
     pass
+
+
+class RateLimitError(APIError):
+    """Exception raised when the request budget is exhausted or the API keeps responding with 429."""
+    pass
+
+
+class CircuitOpenError(APIError):
+    """Exception raised without a request when the circuit breaker of the endpoint is open after repeated failures."""
+    pass
+
+
+class CacheBackendError(Exception):
+    """Exception raised when a shared cache backend fails or returns an error."""
+    pass
@@ -0,0 +1,115 @@
+import csv
+import json
+import sqlite3
+import threading
+
+
+def normalize_city_name(city_name: str) -> str:
+    """
+    Normalizes a city name so that equivalent spellings share one cache key.
+
+    :param city_name: The name of the city.
+    :return: The name with collapsed whitespace in case-folded form.
+    """
+    return " ".join(city_name.split()).casefold()
+
+
+class GeoCache:
+    """
+    A persistent cache of city coordinates backed by SQLite.
+
+    Coordinates never change, so entries do not expire and are not evicted. Lookups are served from memory
+    after the first read of a city from the database.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        Opens (and creates if needed) the coordinates database.
+
+        :param path: The path to the SQLite file. The default keeps the cache in memory for the process lifetime.
+        """
+        self.__lock = threading.Lock()
+        self.__memory = dict()  # In-memory copy of the coordinates read so far
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS coordinates (name TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL)"
+        )
+        self.__connection.commit()
+
+    def get(self, city_name: str) -> (float, float):
+        """
+        Returns the cached coordinates of the city.
+
+        :param city_name: The name of the city.
+        :return: A tuple containing the latitude and longitude of the city or None if it is not cached.
+        """
+        key = normalize_city_name(city_name)
+        coordinates = self.__memory.get(key)
+        if coordinates is None:
+            with self.__lock:
+                row = self.__connection.execute(
+                    "SELECT lat, lon FROM coordinates WHERE name = ?", (key,)
+                ).fetchone()
+            if row is not None:
+                coordinates = self.__memory[key] = (row[0], row[1])
+        return coordinates
+
+    def set(self, city_name: str, lat: float, lon: float) -> None:
+        """
+        Stores the coordinates of the city.
+
+        :param city_name: The name of the city.
+        :param lat: The latitude of the city.
+        :param lon: The longitude of the city.
+        """
+        self.update([(city_name, lat, lon)])
+
+    def update(self, rows) -> int:
+        """
+        Stores the coordinates of many cities in one transaction.
+
+        :param rows: An iterable of (city_name, lat, lon) tuples.
+        :return: The number of stored cities.
+        """
+        rows = [(normalize_city_name(name), float(lat), float(lon)) for name, lat, lon in rows]
+        with self.__lock:
+            with self.__connection:
+                self.__connection.executemany("INSERT OR REPLACE INTO coordinates VALUES (?, ?, ?)", rows)
+            for name, lat, lon in rows:
+                self.__memory[name] = (lat, lon)
+        return len(rows)
+
+    def load(self, path: str) -> int:
+        """
+        Preloads coordinates from a bulk file so that a cold start makes no geocoding requests.
+
+        A .json file contains either an object mapping city names to [lat, lon] or a list of objects with
+        "name", "lat" and "lon" keys. Any other file is read as CSV with a name,lat,lon header.
+
+        :param path: The path to the bulk file.
+        :return: The number of loaded cities.
+        """
+        with open(path, encoding="utf-8", newline="") as file:
+            if path.endswith(".json"):
+                data = json.load(file)
+                if isinstance(data, dict):
+                    rows = [(name, lat, lon) for name, (lat, lon) in data.items()]
+                else:
+                    rows = [(item["name"], item["lat"], item["lon"]) for item in data]
+            else:
+                rows = [(row["name"], row["lat"], row["lon"]) for row in csv.DictReader(file)]
+        return self.update(rows)
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self.__lock:
+            self.__connection.close()
+
+    def __contains__(self, city_name: str) -> bool:
+        return self.get(city_name) is not None
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM coordinates").fetchone()[0]
@@ -0,0 +1,258 @@
+import threading
+
+
+class Observer:
+    """
+    Receives events from the SDK. Subclass it and override the events of interest, all of them do nothing here.
+
+    Events are called synchronously from the thread doing the work, so they must be fast and must not raise.
+    Without an observer the SDK skips the events and the timing calls altogether.
+    """
+
+    def on_request_start(self, endpoint: str, params: dict) -> None:
+        """
+        Called before an HTTP request is sent.
+
+        :param endpoint: "weather", "geocoding", or "find" and "box" for area requests.
+        :param params: The query parameters of the request.
+        """
+
+    def on_request_end(self, endpoint: str, status, duration: float) -> None:
+        """
+        Called when an HTTP request finishes.
+
+        :param endpoint: "weather", "geocoding", or "find" and "box" for area requests.
+        :param status: The HTTP status code, or None if the request failed without a response.
+        :param duration: The time in seconds spent waiting on the network.
+        """
+
+    def on_cache_hit(self, key: str) -> None:
+        """
+        Called when weather data is served from the cache.
+
+        :param key: The cache key (city name or coordinates).
+        """
+
+    def on_cache_miss(self, key: str) -> None:
+        """
+        Called when weather data has to be requested.
+
+        :param key: The cache key (city name or coordinates).
+        """
+
+    def on_cache_evict(self, key: str) -> None:
+        """
+        Called when the cache evicts an entry to make room. Caches that do not report evictions never call it.
+
+        :param key: The evicted cache key.
+        """
+
+    def on_refresh(self, key: str, lag: float) -> None:
+        """
+        Called when a background refresh starts in polling mode.
+
+        :param key: The refreshed cache key.
+        :param lag: The time in seconds the refresh started after it was due.
+        """
+
+    def on_error(self, key: str, error: Exception) -> None:
+        """
+        Called when retrieving weather data fails, including background refreshes.
+
+        :param key: The cache key (city name or coordinates).
+        :param error: The exception.
+        """
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+    A monotonically increasing counter with optional labels.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        """
+        :param name: The metric name.
+        :param documentation: The help text.
+        :param labels: The label names.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.__values = dict()  # label values -> count
+        self.__lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        """
+        Increments the counter.
+
+        :param labels: The label values in the order of the label names.
+        :param amount: The increment.
+        """
+        with self.__lock:
+            self.__values[labels] = self.__values.get(labels, 0) + amount
+
+    def get(self, *labels) -> float:
+        """
+        Returns the value of the counter.
+
+        :param labels: The label values in the order of the label names.
+        :return: The current value.
+        """
+        return self.__values.get(labels, 0)
+
+    def expose(self) -> list:
+        """
+        Renders the counter in the Prometheus text format.
+
+        :return: A list of lines.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.__lock:
+            values = sorted(self.__values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    A histogram of observed values with cumulative buckets and optional labels.
+    """
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        """
+        :param name: The metric name.
+        :param documentation: The help text.
+        :param labels: The label names.
+        :param buckets: The upper bounds of the buckets in increasing order.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.__values = dict()  # label values -> [bucket counts..., sum, count]
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        """
+        Records a value.
+
+        :param value: The observed value.
+        :param labels: The label values in the order of the label names.
+        """
+        with self.__lock:
+            state = self.__values.get(labels)
+            if state is None:
+                state = self.__values[labels] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def get_count(self, *labels) -> int:
+        """
+        Returns the number of observed values.
+
+        :param labels: The label values in the order of the label names.
+        :return: The count.
+        """
+        state = self.__values.get(labels)
+        return 0 if state is None else state[-1]
+
+    def get_sum(self, *labels) -> float:
+        """
+        Returns the sum of observed values.
+
+        :param labels: The label values in the order of the label names.
+        :return: The sum.
+        """
+        state = self.__values.get(labels)
+        return 0 if state is None else state[-2]
+
+    def expose(self) -> list:
+        """
+        Renders the histogram in the Prometheus text format.
+
+        :return: A list of lines.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.__lock:
+            values = sorted((labels, list(state)) for labels, state in self.__values.items())
+        for labels, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {state[-1]}")
+        return lines
+
+
+class MetricsCollector(Observer):
+    """
+    An observer that aggregates the events into counters and histograms exportable in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = "open_weather_sdk"):
+        """
+        :param prefix: The prefix of the metric names.
+        """
+        self.requests = Counter(f"{prefix}_requests_total", "HTTP requests by endpoint and status.",
+                                ("endpoint", "status"))
+        self.request_duration = Histogram(f"{prefix}_request_duration_seconds",
+                                          "Time spent waiting on the network.", ("endpoint",))
+        self.cache_hits = Counter(f"{prefix}_cache_hits_total", "Lookups served from the cache.")
+        self.cache_misses = Counter(f"{prefix}_cache_misses_total", "Lookups that required a request.")
+        self.cache_evictions = Counter(f"{prefix}_cache_evictions_total", "Entries evicted from the cache.")
+        self.refresh_lag = Histogram(f"{prefix}_refresh_lag_seconds",
+                                     "Delay between the due time and the start of background refreshes.")
+        self.errors = Counter(f"{prefix}_errors_total", "Failed weather data retrievals by exception type.",
+                              ("type",))
+
+    def on_request_end(self, endpoint: str, status, duration: float) -> None:
+        self.requests.inc(endpoint, "error" if status is None else str(status))
+        self.request_duration.observe(duration, endpoint)
+
+    def on_cache_hit(self, key: str) -> None:
+        self.cache_hits.inc()
+
+    def on_cache_miss(self, key: str) -> None:
+        self.cache_misses.inc()
+
+    def on_cache_evict(self, key: str) -> None:
+        self.cache_evictions.inc()
+
+    def on_refresh(self, key: str, lag: float) -> None:
+        self.refresh_lag.observe(lag)
+
+    def on_error(self, key: str, error: Exception) -> None:
+        self.errors.inc(type(error).__name__)
+
+    def to_prometheus(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        :return: The metrics as text, e.g. to serve on a /metrics endpoint.
+        """
+        lines = list()
+        for metric in (self.requests, self.request_duration, self.cache_hits, self.cache_misses,
+                       self.cache_evictions, self.refresh_lag, self.errors):
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
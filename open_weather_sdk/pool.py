@@ -0,0 +1,312 @@
+import bisect
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from open_weather_sdk import WeatherData
+from open_weather_sdk.aliases import normalize_query
+from open_weather_sdk.cache import BaseCache, LRUCache
+from open_weather_sdk.exeptions import RateLimitError, UnauthorizedError
+from open_weather_sdk.geocache import GeoCache
+from open_weather_sdk.sdk import OpenWeatherSDK
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class OpenWeatherSDKPool:
+    """
+    Spreads requests over several API keys, each with its own OpenWeatherSDK instance and request budget.
+
+    Locations are routed with a consistent hash, so a location is always requested with the same key and
+    concurrent misses for it are still coalesced. Adding or removing a key moves only the locations of that key.
+    A key answered with 401 is taken out of the rotation, a key that runs out of its rate limit is skipped for the
+    cooldown, and their locations fail over to the next keys on the ring. All instances share one weather data
+    cache and one coordinates cache.
+    """
+
+    def __init__(self, apikeys: list, cache: BaseCache = None, cache_capacity: int = 10, geocache: GeoCache = None,
+                 replicas: int = 100, cooldown: float = 60, **kwargs):
+        """
+        Creates the OpenWeatherSDK instances of the keys.
+
+        :param apikeys: The API keys. They must not have OpenWeatherSDK instances already.
+        :param cache: Optional BaseCache shared by the keys (an LRU cache of cache_capacity entries by default).
+        :param cache_capacity: The maximum number of cities kept in the default LRU cache.
+        :param geocache: Optional GeoCache shared by the keys (an in-memory one is used by default).
+        :param replicas: The number of points of every key on the hash ring, more spread locations more evenly.
+        :param cooldown: The time in seconds a key is skipped after it ran out of its rate limit.
+        :param kwargs: Other OpenWeatherSDK options applied to every key, e.g. rate_limit_per_minute. Polling
+                       is not supported, use stale_while_revalidate to refresh cached data.
+        """
+        if not apikeys:
+            raise ValueError("At least one API key is required")
+        if kwargs.get("polling"):
+            raise ValueError("Polling is not supported by OpenWeatherSDKPool")
+        self.__cache = LRUCache(cache_capacity) if cache is None else cache
+        self.__geocache = GeoCache() if geocache is None else geocache
+        self.__cooldown = cooldown
+        self.__members = dict()  # API key -> OpenWeatherSDK
+        try:
+            for apikey in dict.fromkeys(apikeys):
+                member = OpenWeatherSDK(apikey, cache=self.__cache, geocache=self.__geocache, **kwargs)
+                if member.get_cache() is not self.__cache:
+                    raise ValueError("An OpenWeatherSDK instance with another cache already exists for an API key")
+                self.__members[apikey] = member
+        except BaseException:  # Do not leave the instances of the previous keys registered
+            self.close()
+            raise
+        self.__ring = sorted((_hash(f"{apikey}#{replica}"), apikey)
+                             for apikey in self.__members for replica in range(replicas))
+        self.__points = [point for point, _ in self.__ring]
+        self.__unavailable = dict()  # API key -> monotonic time until which it is skipped
+        self.__lock = threading.Lock()
+        self.__stats = {apikey: dict.fromkeys(("routed", "failovers", "unauthorized", "rate_limited"), 0)
+                        for apikey in self.__members}
+
+    def get_member(self, apikey: str) -> OpenWeatherSDK:
+        """
+        Returns the OpenWeatherSDK instance of a key.
+
+        :param apikey: The API key.
+        :return: The OpenWeatherSDK instance.
+        """
+        return self.__members[apikey]
+
+    def get_cache(self) -> BaseCache:
+        """
+        Returns the weather data cache shared by the keys.
+
+        :return: The cache.
+        """
+        return self.__cache
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns statistics of the shared weather data cache.
+
+        :return: A dictionary with hit, miss and eviction counters and the current size of the cache.
+        """
+        return self.__cache.get_stats()
+
+    def get_key_stats(self) -> dict:
+        """
+        Returns the usage of every key.
+
+        :return: A dictionary mapping the keys to dictionaries with their state ("active", "cooling" or
+                 "disabled"), the number of lookups routed to them, the number of lookups that failed over to
+                 another key, the number of 401 and rate limit failures and the number of requests sent.
+        """
+        now = time.monotonic()
+        stats = dict()
+        with self.__lock:
+            for apikey, counters in self.__stats.items():
+                until = self.__unavailable.get(apikey, 0)
+                state = "disabled" if until == float("inf") else "cooling" if until > now else "active"
+                requests = self.__members[apikey].get_rate_limit_stats()["requests"]
+                stats[apikey] = dict(counters, state=state, requests=requests)
+        return stats
+
+    def set_update_time(self, update_time) -> None:
+        """
+        Sets the update time of the weather data of all keys.
+
+        :param update_time: The new update time interval in seconds.
+        """
+        for member in self.__members.values():
+            member.set_update_time(update_time)
+
+    def enable(self, apikey: str) -> None:
+        """
+        Puts a key back into the rotation, e.g. after renewing it.
+
+        :param apikey: The API key.
+        """
+        with self.__lock:
+            self.__unavailable.pop(apikey, None)
+
+    def close(self) -> None:
+        """
+        Closes the OpenWeatherSDK instances of all keys and unregisters them, so a new pool can be created for the
+        same keys.
+        """
+        for member in self.__members.values():
+            member.close()
+            member.unregister()
+
+    def get_city_coordinates(self, city_name: str) -> (float, float):
+        """
+        Retrieves the latitude and longitude for a given city name.
+
+        :param city_name: The name of the city.
+        :return: A tuple containing the latitude and longitude of the city.
+        """
+        return self.__call(city_name, lambda member: member.get_city_coordinates(city_name))
+
+    def get_weatherdata(self, city: str, lat: float = None, lon: float = None, max_age: float = None,
+                        units: str = "metric", lang: str = "en") -> json:
+        """
+        Retrieves or updates the weather data for a specified city, see OpenWeatherSDK.get_weatherdata.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :param max_age: The maximum acceptable age in seconds of the returned weather data (optional).
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: A JSON object containing the weather data.
+        """
+        return self.get_weatherdata_object(city, lat, lon, max_age, units, lang).to_json()
+
+    def get_weatherdata_bytes(self, city: str, lat: float = None, lon: float = None, max_age: float = None,
+                              units: str = "metric", lang: str = "en") -> bytes:
+        """
+        Retrieves or updates the weather data for a specified city as UTF-8 encoded JSON,
+        see OpenWeatherSDK.get_weatherdata_bytes.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :param max_age: The maximum acceptable age in seconds of the returned weather data (optional).
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: JSON bytes containing the weather data.
+        """
+        return self.get_weatherdata_object(city, lat, lon, max_age, units, lang).to_json_bytes()
+
+    def get_weatherdata_object(self, city: str, lat: float = None, lon: float = None, max_age: float = None,
+                               units: str = "metric", lang: str = "en") -> WeatherData:
+        """
+        Retrieves or updates the weather data for a specified city without serializing it,
+        see OpenWeatherSDK.get_weatherdata_object.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :param max_age: The maximum acceptable age in seconds of the returned weather data (optional).
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: An instance of WeatherData. It is shared with the cache and must not be modified.
+        """
+        return self.__call(city, lambda member: member.get_weatherdata_object(city, lat, lon, max_age, units, lang))
+
+    def get_weatherdata_many(self, locations: list, max_workers: int = None, units: str = "metric",
+                             lang: str = "en") -> list:
+        """
+        Retrieves weather data for many locations at once, see OpenWeatherSDK.get_weatherdata_many.
+        The locations of every key are fetched as one batch, the batches of the keys concurrently.
+
+        :param locations: A list of city names or (lat, lon) pairs.
+        :param max_workers: The maximum number of concurrent requests of every key.
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: A list in the order of locations. Each item is either a JSON object containing the weather data
+                 or the exception raised while retrieving it.
+        """
+        results = [None] * len(locations)
+        routes = dict()  # Position -> API key
+        batches = dict()  # API key -> positions of its locations
+        for position, location in enumerate(locations):
+            apikey = next(self.__candidates(self.__location_key(location)), None)
+            if apikey is None:
+                results[position] = RateLimitError("No API key is available")
+                continue
+            routes[position] = apikey
+            batches.setdefault(apikey, list()).append(position)
+            self.__count(apikey, "routed")
+
+        if batches:
+            with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+                futures = {
+                    executor.submit(self.__members[apikey].get_weatherdata_many,
+                                    [locations[position] for position in positions], max_workers, units, lang):
+                        (apikey, positions)
+                    for apikey, positions in batches.items()
+                }
+                for future, (apikey, positions) in futures.items():
+                    for position, result in zip(positions, future.result()):
+                        results[position] = result
+
+        # Locations whose key failed are retried one by one with the next keys
+
+        for position, result in enumerate(results):
+            if isinstance(result, (UnauthorizedError, RateLimitError)) and position in routes:
+                self.__mark(routes[position], result)
+                location = locations[position]
+                city, lat, lon = (location, None, None) if isinstance(location, str) else (
+                    f"{location[0]},{location[1]}", *location)
+                try:
+                    results[position] = self.get_weatherdata(city, lat, lon, units=units, lang=lang)
+                except Exception as e:
+                    results[position] = e
+        return results
+
+    @staticmethod
+    def __location_key(location) -> str:
+        """
+        Returns the string a location is routed by.
+
+        :param location: A city name or a (lat, lon) pair.
+        :return: The normalized name or "lat,lon".
+        """
+        if isinstance(location, str):
+            return normalize_query(location)
+        return f"{location[0]},{location[1]}"
+
+    def __candidates(self, key: str):
+        """
+        Yields the keys in the rotation in the order of the ring starting at the point of the location.
+
+        :param key: The string the location is routed by.
+        :return: A generator of API keys.
+        """
+        start = bisect.bisect(self.__points, _hash(key))
+        seen = set()
+        for offset in range(len(self.__ring)):
+            apikey = self.__ring[(start + offset) % len(self.__ring)][1]
+            if apikey in seen:
+                continue
+            seen.add(apikey)
+            if self.__unavailable.get(apikey, 0) <= time.monotonic():
+                yield apikey
+            if len(seen) == len(self.__members):
+                return
+
+    def __call(self, location: str, function):
+        """
+        Calls a function with the OpenWeatherSDK instance of the location's key, failing over to the next keys
+        after 401 and rate limit errors.
+
+        :param location: A city name.
+        :param function: A function taking an OpenWeatherSDK instance.
+        :return: The result of the function.
+        """
+        error = None
+        for apikey in self.__candidates(self.__location_key(location)):
+            self.__count(apikey, "routed")
+            try:
+                return function(self.__members[apikey])
+            except (UnauthorizedError, RateLimitError) as e:
+                self.__mark(apikey, e)
+                error = e
+        raise error or RateLimitError("No API key is available")
+
+    def __mark(self, apikey: str, error: Exception) -> None:
+        """
+        Takes a key out of the rotation after an error, permanently after 401 and for the cooldown otherwise.
+
+        :param apikey: The API key.
+        :param error: An UnauthorizedError or a RateLimitError.
+        """
+        unauthorized = isinstance(error, UnauthorizedError)
+        with self.__lock:
+            self.__unavailable[apikey] = float("inf") if unauthorized else time.monotonic() + self.__cooldown
+            self.__stats[apikey]["unauthorized" if unauthorized else "rate_limited"] += 1
+            self.__stats[apikey]["failovers"] += 1
+
+    def __count(self, apikey: str, name: str) -> None:
+        with self.__lock:
+            self.__stats[apikey][name] += 1
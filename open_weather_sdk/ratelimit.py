@@ -0,0 +1,146 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from open_weather_sdk.exeptions import RateLimitError
+
+
+def parse_retry_after(value: str, default: float = 1.0) -> float:
+    """
+    Parses the Retry-After header, given either in seconds or as an HTTP date.
+
+    :param value: The value of the header (may be None).
+    :param default: The delay returned when the header is missing or malformed.
+    :return: The delay in seconds.
+    """
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at capacity tokens per period.
+    """
+
+    def __init__(self, capacity: float, period: float, burst: float = None):
+        """
+        Initializes a full bucket.
+
+        :param capacity: The number of tokens added per period.
+        :param period: The period in seconds.
+        :param burst: The maximum number of tokens stored (defaults to capacity).
+        """
+        self.rate = capacity / period
+        self.burst = burst or capacity
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def get_delay(self) -> float:
+        """
+        Returns the time in seconds until a token is available.
+
+        :return: 0 if a token is available now.
+        """
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    A client-side limiter of the request budget of an API key.
+
+    Requests are limited by a per-minute and a per-day token bucket. When the API responds with 429 the limiter
+    is paused for the Retry-After delay so every caller sharing it backs off.
+    """
+
+    def __init__(self, per_minute: int = None, per_day: int = None, blocking: bool = True,
+                 max_wait: float = None, burst: int = None):
+        """
+        Initializes the limiter. Both limits are optional, without them only 429 responses throttle requests.
+
+        :param per_minute: The maximum number of requests per minute.
+        :param per_day: The maximum number of requests per day.
+        :param blocking: Whether acquire() waits for a token (True) or fails fast with RateLimitError (False).
+        :param max_wait: The maximum time in seconds a blocking acquire() waits before raising RateLimitError.
+        :param burst: The maximum number of requests sent at once (defaults to per_minute).
+        """
+        self.__buckets = list()
+        if per_minute:
+            self.__buckets.append(TokenBucket(per_minute, 60, burst))
+        if per_day:
+            self.__buckets.append(TokenBucket(per_day, 24 * 60 * 60))
+        self.__blocking = blocking
+        self.__max_wait = max_wait
+        self.__paused_until = 0.0
+        self.__lock = threading.Lock()
+        self.__stats = {
+            "requests": 0,  # Requests allowed by the limiter
+            "throttled": 0,  # Requests that had to wait for a token
+            "wait_time": 0.0,  # Total time in seconds requests waited for a token
+            "rejected": 0,  # Requests that failed fast or waited longer than max_wait
+            "responses_429": 0,  # 429 responses received
+            "retry_after_time": 0.0,  # Total Retry-After delay in seconds received with 429 responses
+        }
+
+    def acquire(self, blocking: bool = None) -> float:
+        """
+        Takes a token for one request.
+
+        :param blocking: Overrides whether to wait for a token or fail fast.
+        :return: The time in seconds spent waiting for the token.
+        """
+        blocking = self.__blocking if blocking is None else blocking
+        waited = 0.0
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                delay = self.__paused_until - now
+                for bucket in self.__buckets:
+                    bucket.refill(now)
+                    delay = max(delay, bucket.get_delay())
+                if delay <= 0:
+                    for bucket in self.__buckets:
+                        bucket.tokens -= 1
+                    self.__stats["requests"] += 1
+                    if waited:
+                        self.__stats["throttled"] += 1
+                        self.__stats["wait_time"] += waited
+                    return waited
+                if not blocking or (self.__max_wait is not None and waited + delay > self.__max_wait):
+                    self.__stats["rejected"] += 1
+                    raise RateLimitError(f"Request budget exhausted, next request possible in {delay:.2f} s")
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, delay: float) -> None:
+        """
+        Pauses all requests after a 429 response.
+
+        :param delay: The Retry-After delay in seconds.
+        """
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, time.monotonic() + delay)
+            self.__stats["responses_429"] += 1
+            self.__stats["retry_after_time"] += delay
+
+    def get_stats(self) -> dict:
+        """
+        Returns limiter metrics.
+
+        :return: A dictionary with allowed, throttled and rejected request counters, the total throttled wait
+                 time and the number of 429 responses with their total Retry-After delay.
+        """
+        with self.__lock:
+            return dict(self.__stats)
@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Refresher:
+    """
+    Refreshes keys in the background when they become due.
+
+    Keys are kept in a priority queue ordered by their next due time, so the scheduler thread sleeps until the
+    earliest key is due instead of scanning all of them. Due keys are refreshed on a bounded worker pool and
+    rescheduled up to jitter earlier than the interval, which spreads keys fetched at the same moment over time.
+    """
+
+    def __init__(self, refresh, interval: float, max_workers: int = 4, jitter: float = 0.1, on_lag=None):
+        """
+        Initializes a stopped refresher.
+
+        :param refresh: A function called with a key when it is due. It returns False to stop refreshing the key.
+        :param interval: The time in seconds between refreshes of a key.
+        :param max_workers: The maximum number of keys refreshed at the same time.
+        :param jitter: The maximum random shortening of the interval as a fraction of it (0.1 is up to 10% earlier).
+                       Keys are never refreshed later than the interval, which is the TTL of the cached data.
+        :param on_lag: Optional function called with a key and the time in seconds its refresh starts after it was
+                       due, which grows when the workers cannot keep up.
+        """
+        self.__refresh = refresh
+        self.__interval = interval
+        self.__max_workers = max_workers
+        self.__jitter = jitter
+        self.__on_lag = on_lag
+        self.__condition = threading.Condition()
+        self.__queue = list()  # Heap of (due, sequence, key)
+        self.__scheduled = dict()  # key -> sequence of its valid heap entry, older entries are skipped
+        self.__sequence = itertools.count()
+        self.__slots = threading.Semaphore(max_workers)
+        self.__executor = None
+        self.__thread = None
+        self.__running = False
+
+    def get_interval(self) -> float:
+        """
+        Returns the time in seconds between refreshes of a key.
+
+        :return: The refresh interval in seconds.
+        """
+        return self.__interval
+
+    def set_interval(self, interval: float) -> None:
+        """
+        Sets the time in seconds between refreshes of a key. Applies to keys scheduled afterwards.
+
+        :param interval: The refresh interval in seconds.
+        """
+        self.__interval = interval
+
+    def schedule(self, key, delay: float = None) -> None:
+        """
+        Schedules the key for refresh, replacing its previous due time.
+
+        :param key: The key to refresh.
+        :param delay: The time in seconds until the refresh (defaults to the interval with jitter).
+        """
+        if delay is None:
+            # Jitter only moves the refresh earlier, so it lands before the cached data expires
+            delay = self.__interval * (1 - random.uniform(0, self.__jitter))
+        with self.__condition:
+            sequence = next(self.__sequence)
+            self.__scheduled[key] = sequence
+            heapq.heappush(self.__queue, (time.monotonic() + delay, sequence, key))
+            if self.__queue[0][1] == sequence:  # The new key is the earliest one, wake up the scheduler
+                self.__condition.notify()
+
+    def unschedule(self, key) -> None:
+        """
+        Stops refreshing the key.
+
+        :param key: The key to stop refreshing.
+        """
+        with self.__condition:
+            self.__scheduled.pop(key, None)
+
+    def start(self) -> None:
+        """
+        Starts the scheduler thread and the worker pool.
+        """
+        with self.__condition:
+            if self.__running:
+                return
+            self.__running = True
+            self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="refresher")
+            self.__thread = threading.Thread(target=self.__run, name="refresher-scheduler", daemon=True)
+            self.__thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stops the scheduler. Scheduled keys are kept and resumed by the next start().
+
+        :param wait: Whether to wait for the refreshes in progress to finish.
+        """
+        with self.__condition:
+            if not self.__running:
+                return
+            self.__running = False
+            self.__condition.notify_all()
+        thread, executor = self.__thread, self.__executor
+        if thread is not threading.current_thread():
+            thread.join()
+        executor.shutdown(wait=wait)
+
+    def is_running(self) -> bool:
+        """
+        Returns whether the scheduler is running.
+
+        :return: True if the scheduler is running.
+        """
+        return self.__running
+
+    def __contains__(self, key) -> bool:
+        return key in self.__scheduled
+
+    def __len__(self) -> int:
+        return len(self.__scheduled)
+
+    def __run(self):
+        """
+        The scheduler loop. Sleeps until the earliest key is due and hands due keys to the worker pool.
+        """
+        while True:
+            with self.__condition:
+                while self.__running:
+                    if not self.__queue:
+                        self.__condition.wait()
+                        continue
+                    due, sequence, key = self.__queue[0]
+                    if self.__scheduled.get(key) != sequence:  # Rescheduled or unscheduled since
+                        heapq.heappop(self.__queue)
+                        continue
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        self.__condition.wait(delay)
+                        continue
+                    heapq.heappop(self.__queue)
+                    del self.__scheduled[key]
+                    break
+                else:
+                    return
+
+            # Wait for a free worker outside the lock, so keys can still be scheduled meanwhile
+
+            self.__slots.acquire()
+            if not self.__running:
+                self.__slots.release()
+                self.schedule(key, 0)  # Keep the key for the next start()
+                return
+            self.__executor.submit(self.__work, key, due)
+
+    def __work(self, key, due: float):
+        """
+        Refreshes the key and schedules its next refresh.
+
+        :param key: The key to refresh.
+        :param due: The monotonic time the refresh was due at.
+        """
+        keep = True
+        try:
+            if self.__on_lag is not None:
+                self.__on_lag(key, time.monotonic() - due)
+            keep = self.__refresh(key) is not False
+        except Exception:  # A failed refresh is retried after the next interval
+            pass
+        finally:
+            self.__slots.release()
+        if keep:
+            with self.__condition:
+                already_scheduled = key in self.__scheduled
+            if not already_scheduled:
+                self.schedule(key)
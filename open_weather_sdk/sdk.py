@@ -1,11 +1,32 @@
+import atexit
 import json
-import time
-from datetime import datetime, timezone
+import logging
+import os
 import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 import requests
 
-from open_weather_sdk import WeatherData, get_time_difference
+from open_weather_sdk import WeatherData, WeatherTable, get_time_difference
+from open_weather_sdk.aliases import AliasIndex
+from open_weather_sdk.area import bounding_box, cluster_locations, match_stations
+from open_weather_sdk.breaker import CircuitBreaker
+from open_weather_sdk.cache import BaseCache, LRUCache
 from open_weather_sdk.exeptions import *
+from open_weather_sdk.geocache import GeoCache
+from open_weather_sdk.metrics import Observer
+from open_weather_sdk.ratelimit import RateLimiter, parse_retry_after
+from open_weather_sdk.refresher import Refresher
+from open_weather_sdk.session import SessionConfig, create_session, get_pool_stats
+from open_weather_sdk.singleflight import SingleFlight
+from open_weather_sdk.snapshot import read_snapshot, write_snapshot
+from open_weather_sdk.spatial import SpatialIndex
+from open_weather_sdk.stream import ChangeStream, Subscription
+from open_weather_sdk.units import convert
+
+logger = logging.getLogger(__name__)
 
 
 class OpenWeatherSDK:
@@ -15,32 +36,135 @@ class OpenWeatherSDK:
     It ensures a single instance per API key and implements on-demand and pooling mode to update weather data.
     """
     __instances = {}
+    __cache_sync = object()  # Refresher key that schedules the cities stored in a shared cache by other processes
 
     def __new__(cls, apikey: str, *args, **kwargs):
         """
         Ensures only one instance of this class is created for each unique API key.
-        Initializes the instance with API key and starts a pooling thread if necessary.
+        Initializes the instance with API key and starts polling if necessary.
 
         :param apikey: The API key for authenticating requests to OpenWeatherMap.
+        :param base_url: The base URL of the API, e.g. of a local stand-in server (https://api.openweathermap.org
+                         by default).
+        :param session_config: Optional SessionConfig with connection pool, timeout and retry settings.
+        :param geocache: Optional GeoCache for city coordinates (an in-memory one is used by default).
+        :param canonical_keys: Whether to cache weather data by canonical location IDs, so names differing in case,
+                               whitespace or country qualification ("London", "london ", "London,GB") and nearby
+                               coordinates share one cache entry. Names are mapped once they have been geocoded.
+        :param canonical_precision: The number of decimals of the coordinates of canonical location IDs (3 by
+                                    default, which is about 100 meters).
+        :param cache_capacity: The maximum number of cities kept in the default LRU cache (10 by default).
+        :param cache: Optional BaseCache implementation used instead of the default LRU cache, e.g. a SQLiteCache or
+                      RedisCache shared between processes. Only one process refreshes a shared cache in polling mode.
+        :param rate_limiter: Optional RateLimiter shared by all requests of this API key. Without it one is
+                             created from rate_limit_per_minute, rate_limit_per_day and rate_limit_blocking.
+        :param max_429_retries: The number of retries after a 429 response before RateLimitError is raised.
+        :param polling: Whether to refresh cached cities in the background when they become stale.
+        :param refresh_workers: The maximum number of cities refreshed at the same time in polling mode.
+        :param refresh_jitter: The random shortening of the refresh interval as a fraction of it (0.1 is up to 10%
+                               earlier), so cities are refreshed before their cached data expires.
+        :param stale_while_revalidate: Whether to return stale weather data immediately and refresh it in the
+                                       background instead of waiting for the request.
+        :param max_stale_age: The age in seconds above which stale weather data is not returned anymore in
+                              stale-while-revalidate mode (1 hour by default).
+        :param reuse_radius: The distance in meters within which fresh weather data cached for other coordinates
+                             is returned for a lookup by coordinates instead of making a request (0 disables it).
+        :param spatial_cell_size: The grid cell size in degrees of the spatial index of cached coordinates.
+        :param observer: Optional Observer receiving request, cache, refresh and error events, e.g. a
+                         MetricsCollector.
+        :param snapshot_path: Optional path of a cache snapshot file. The cache is loaded from it on start if it
+                              exists and saved to it by close() and at interpreter exit.
+        :param snapshot_interval: The time in seconds between periodic snapshots (only on shutdown by default).
+        :param negative_ttl: The time in seconds invalid cities and coordinates without weather data are remembered
+                             and answered without a request (5 minutes by default, 0 disables it).
+        :param negative_capacity: The maximum number of remembered invalid cities and coordinates (1000 by default).
+        :param breaker_threshold: The number of consecutive failed requests to an endpoint (network errors and 5xx
+                                  responses) after which its requests fail fast with CircuitOpenError (5 by default,
+                                  0 disables the circuit breakers).
+        :param breaker_reset_timeout: The time in seconds before a trial request to a failing endpoint (30 by
+                                      default).
+        :param serve_stale: Whether to return cached weather data within max_stale_age instead of raising when it
+                            cannot be refreshed because the API fails or the circuit breaker is open.
+        :param variant_capacity: The maximum number of weather data variants in other units or languages kept
+                                 for reuse (100 by default).
+        :param keep_raw: Whether fetched weather data keeps the body of the response for get_raw and get_payload
+                         (False by default, the body takes more memory than the record).
         """
         if apikey not in cls.__instances:
             cls.__instances[apikey] = super(OpenWeatherSDK, cls).__new__(cls)
             # Initialization of instance attributes
             instance = cls.__instances[apikey]
             instance.__api_key = apikey
-            instance.__local_cache = dict()  # Cache for storing recent weather data
-            instance.__local_history = list()  # History to track the cities queried
             instance.__update_time = 10 * 60  # Default update time for pooling in seconds
-            instance.__params = {  # Default parameters for API requests
+            # Cache for storing recent weather data
+            instance.__local_cache = kwargs.get("cache")
+            if instance.__local_cache is None:  # An empty cache passed in is falsy, so it is not tested with "or"
+                instance.__local_cache = LRUCache(kwargs.get("cache_capacity", 10))
+            instance.__local_cache.set_ttl(instance.__update_time)
+            instance.__params = {  # Default parameters for API requests, the cache holds metric data in English
                 'appid': cls.__instances[apikey].__api_key,
                 "exclude": "minutely,hourly,daily,alerts",
                 "units": "metric",
                 "lang": "en",
             }
-            instance.__poling = kwargs.get("polling", False)
-            if instance.__poling:  # Start a pooling thread if pooling is enabled
-                instance.__pooling_thread = threading.Thread(target=instance.__pooling_cycle)
-                instance.__pooling_thread.start()
+            instance.__base_url = kwargs.get("base_url", "https://api.openweathermap.org").rstrip("/")
+            instance.__session_config = kwargs.get("session_config") or SessionConfig()
+            instance.__session = create_session(instance.__session_config)  # Pooled keep-alive HTTP session
+            instance.__keep_raw = kwargs.get("keep_raw", False)
+            instance.__geocache = kwargs.get("geocache") if kwargs.get("geocache") is not None else GeoCache()
+            instance.__canonical_keys = kwargs.get("canonical_keys", False)
+            instance.__aliases = AliasIndex(kwargs.get("canonical_precision", 3))  # Queries -> location IDs
+            instance.__single_flight = SingleFlight()  # Deduplicates concurrent fetches of the same city
+            instance.__rate_limiter = kwargs.get("rate_limiter") or RateLimiter(  # Request budget of the API key
+                kwargs.get("rate_limit_per_minute"), kwargs.get("rate_limit_per_day"),
+                kwargs.get("rate_limit_blocking", True)
+            )
+            instance.__max_429_retries = kwargs.get("max_429_retries", 3)
+            instance.__negative_cache = LRUCache(  # Invalid cities and coordinates -> exception
+                kwargs.get("negative_capacity", 1000), kwargs.get("negative_ttl", 5 * 60)
+            )
+            breaker_threshold = kwargs.get("breaker_threshold", 5)
+            instance.__breakers = {  # Circuit breakers by endpoint
+                endpoint: CircuitBreaker(breaker_threshold, kwargs.get("breaker_reset_timeout", 30))
+                for endpoint in ("weather", "geocoding", "find", "box") if breaker_threshold
+            }
+            instance.__serve_stale = kwargs.get("serve_stale", False)
+            instance.__stale_served = 0
+            instance.__refresher = Refresher(  # Background refresher of cached cities for polling mode
+                instance.__poll, instance.__update_time,
+                kwargs.get("refresh_workers", 4), kwargs.get("refresh_jitter", 0.1), instance.__observe_lag
+            )
+            instance.__stale_while_revalidate = kwargs.get("stale_while_revalidate", False)
+            instance.__max_stale_age = kwargs.get("max_stale_age", 60 * 60)
+            instance.__revalidator = ThreadPoolExecutor(  # Background refreshes of stale cities
+                max_workers=kwargs.get("refresh_workers", 4), thread_name_prefix="revalidator"
+            )
+            instance.__revalidating = set()  # Cities with a background refresh queued or in progress
+            instance.__revalidating_lock = threading.Lock()
+            instance.__spatial_index = SpatialIndex(kwargs.get("spatial_cell_size", 0.01))  # Cached coordinates
+            instance.__reuse_radius = kwargs.get("reuse_radius", 0)
+            instance.__variants = LRUCache(kwargs.get("variant_capacity", 100), float("inf"))  # Converted data
+            instance.__descriptions = dict()  # (language, English description) -> translated description
+            instance.__changes = ChangeStream()  # Subscriptions to changes of cached weather data
+            instance.__observer = None
+            instance.set_observer(kwargs.get("observer"))
+            instance.__owner = uuid.uuid4().hex  # Identifies this instance in the polling leader election
+            instance.__snapshot_path = kwargs.get("snapshot_path")
+            instance.__snapshot_stop = threading.Event()  # Stops periodic snapshots
+            if instance.__snapshot_path is not None:  # Warm start from the previous snapshot
+                if os.path.exists(instance.__snapshot_path):
+                    try:
+                        instance.load_snapshot()
+                    except (OSError, ValueError):  # A missing warm start must not prevent the SDK from starting
+                        logger.warning("Cannot load the cache snapshot %s, starting with a cold cache",
+                                       instance.__snapshot_path, exc_info=True)
+                atexit.register(instance.__save_on_exit)
+                if kwargs.get("snapshot_interval"):
+                    threading.Thread(target=instance.__snapshot_periodically, args=(kwargs["snapshot_interval"],),
+                                     name="snapshot", daemon=True).start()
+            instance.__poling = False
+            if kwargs.get("polling", False):  # Start the refresher if polling is enabled
+                instance.start_polling()
         return cls.__instances[apikey]
 
     def __init__(self, apikey, **kwargs):
@@ -51,12 +175,38 @@ class OpenWeatherSDK:
         """
         self.__api_key = self.__instances.get(apikey).__api_key
         self.__local_cache = self.__instances.get(apikey).__local_cache
-        self.__local_history = self.__instances.get(apikey).__local_history
         self.__update_time = self.__instances.get(apikey).__update_time
         self.__params = self.__instances.get(apikey).__params
+        self.__base_url = self.__instances.get(apikey).__base_url
+        self.__session_config = self.__instances.get(apikey).__session_config
+        self.__session = self.__instances.get(apikey).__session
+        self.__keep_raw = self.__instances.get(apikey).__keep_raw
+        self.__geocache = self.__instances.get(apikey).__geocache
+        self.__canonical_keys = self.__instances.get(apikey).__canonical_keys
+        self.__aliases = self.__instances.get(apikey).__aliases
+        self.__single_flight = self.__instances.get(apikey).__single_flight
+        self.__rate_limiter = self.__instances.get(apikey).__rate_limiter
+        self.__max_429_retries = self.__instances.get(apikey).__max_429_retries
+        self.__negative_cache = self.__instances.get(apikey).__negative_cache
+        self.__breakers = self.__instances.get(apikey).__breakers
+        self.__serve_stale = self.__instances.get(apikey).__serve_stale
+        self.__stale_served = self.__instances.get(apikey).__stale_served
+        self.__refresher = self.__instances.get(apikey).__refresher
+        self.__stale_while_revalidate = self.__instances.get(apikey).__stale_while_revalidate
+        self.__max_stale_age = self.__instances.get(apikey).__max_stale_age
+        self.__revalidator = self.__instances.get(apikey).__revalidator
+        self.__revalidating = self.__instances.get(apikey).__revalidating
+        self.__revalidating_lock = self.__instances.get(apikey).__revalidating_lock
+        self.__spatial_index = self.__instances.get(apikey).__spatial_index
+        self.__reuse_radius = self.__instances.get(apikey).__reuse_radius
+        self.__variants = self.__instances.get(apikey).__variants
+        self.__descriptions = self.__instances.get(apikey).__descriptions
+        self.__changes = self.__instances.get(apikey).__changes
+        self.__observer = self.__instances.get(apikey).__observer
+        self.__owner = self.__instances.get(apikey).__owner
+        self.__snapshot_path = self.__instances.get(apikey).__snapshot_path
+        self.__snapshot_stop = self.__instances.get(apikey).__snapshot_stop
         self.__poling = self.__instances.get(apikey).__poling
-        if self.__poling:
-            self.__pooling_thread = self.__instances.get(apikey).__pooling_thread
 
     def get_update_time(self) -> int:
         """
@@ -73,6 +223,225 @@ class OpenWeatherSDK:
         :param update_time: The new update time interval in seconds.
         """
         self.__update_time = update_time
+        self.__local_cache.set_ttl(update_time)
+        self.__refresher.set_interval(update_time)
+
+    def start_polling(self) -> None:
+        """
+        Starts refreshing cached cities in the background, each one when its update time has passed.
+        """
+        if self.__poling:
+            return
+        self.__poling = True
+        self.__refresher.schedule(self.__cache_sync, 0)  # Schedules all cached cities if this process leads
+        self.__refresher.start()
+
+    def stop_polling(self) -> None:
+        """
+        Stops the background refresh and waits for the refreshes in progress.
+        """
+        self.__poling = False
+        self.__refresher.stop()
+        self.__local_cache.release_leadership(self.__owner)
+
+    def is_polling(self) -> bool:
+        """
+        Returns whether cached cities are refreshed in the background.
+
+        :return: True if polling mode is enabled.
+        """
+        return self.__poling
+
+    def get_cache(self) -> BaseCache:
+        """
+        Returns the weather data cache.
+
+        :return: The cache used by this instance.
+        """
+        return self.__local_cache
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns weather data cache statistics.
+
+        :return: A dictionary with hit, miss and eviction counters and the current size of the cache.
+        """
+        return self.__local_cache.get_stats()
+
+    def get_table(self) -> WeatherTable:
+        """
+        Returns a columnar snapshot of all cached weather data regardless of its age, e.g. for
+        open_weather_sdk.analytics.to_numpy or to_dataframe.
+
+        :return: A WeatherTable with one row per cached location.
+        """
+        return WeatherTable(weather_data for _, weather_data in self.__local_cache.items())
+
+    def get_pool_stats(self) -> dict:
+        """
+        Returns connection pool statistics of the HTTP session to confirm that connections are reused.
+
+        :return: A dictionary with the number of pools, opened connections, sent requests,
+                 reused connections and idle connections kept alive.
+        """
+        return get_pool_stats(self.__session)
+
+    def get_rate_limit_stats(self) -> dict:
+        """
+        Returns rate limiter metrics: throttled wait time, rejected requests and 429 responses.
+
+        :return: A dictionary with the rate limiter metrics.
+        """
+        return self.__rate_limiter.get_stats()
+
+    def get_failure_stats(self) -> dict:
+        """
+        Returns negative cache and circuit breaker statistics.
+
+        :return: A dictionary with the negative cache stats (its hits are requests avoided), the stats of the
+                 circuit breaker of every endpoint and the number of times stale data was served after a failure.
+        """
+        return {
+            "negative_cache": self.__negative_cache.get_stats(),
+            "breakers": {endpoint: breaker.get_stats() for endpoint, breaker in self.__breakers.items()},
+            "stale_served": self.__stale_served,
+        }
+
+    def get_observer(self) -> Observer:
+        """
+        Returns the observer receiving the events of this instance.
+
+        :return: The Observer, or None.
+        """
+        return self.__observer
+
+    def set_observer(self, observer: Observer) -> None:
+        """
+        Sets the observer receiving request, cache, refresh and error events.
+
+        :param observer: An Observer, or None to stop emitting events.
+        """
+        self.__observer = observer
+        self.__local_cache.set_eviction_listener(self.__on_cache_evict)
+
+    def subscribe(self, keys=None, fields=None, thresholds: dict = None, condition=None, maxsize: int = 1000,
+                  overflow: str = "drop_oldest", block_timeout: float = 1.0) -> Subscription:
+        """
+        Subscribes to changes of cached weather data, e.g. from background refreshes in polling mode.
+
+        An event with a field-level diff is emitted only when the weather data of a location actually changes.
+        Iterate over the subscription with a for loop, which blocks, or with an async for loop, and close it when
+        done. See Subscription for the filters and the behaviour of slow subscribers.
+
+        :param keys: Optional iterable of the cities (cache keys) of interest.
+        :param fields: Optional iterable of the WeatherData fields of interest.
+        :param thresholds: Optional dictionary mapping numeric fields to the minimum absolute change reported.
+        :param condition: Optional function called with the new WeatherData that returns whether to emit the event.
+        :param maxsize: The maximum number of pending events, one per location.
+        :param overflow: "drop_oldest" to drop the oldest pending event of a full subscription, or "block" to make
+                         the refresh wait up to block_timeout seconds for the subscriber.
+        :param block_timeout: The maximum time in seconds a refresh waits with overflow="block".
+        :return: The Subscription.
+        """
+        return self.__changes.subscribe(keys=keys, fields=fields, thresholds=thresholds, condition=condition,
+                                        maxsize=maxsize, overflow=overflow, block_timeout=block_timeout)
+
+    def get_geocache(self) -> GeoCache:
+        """
+        Returns the coordinates cache, e.g. to preload it from a bulk file.
+
+        :return: The GeoCache used by this instance.
+        """
+        return self.__geocache
+
+    def get_aliases(self) -> AliasIndex:
+        """
+        Returns the index mapping location queries onto canonical location IDs, used with canonical_keys.
+
+        :return: The AliasIndex used by this instance.
+        """
+        return self.__aliases
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list:
+        """
+        Finds the cached weather data nearest to the coordinates, regardless of its age.
+
+        :param lat: Latitude in degrees.
+        :param lon: Longitude in degrees.
+        :param k: The maximum number of results.
+        :return: A list of up to k (WeatherData, distance in meters) tuples, nearest first.
+        """
+        while True:
+            found = list()
+            for distance, key in self.__spatial_index.nearest(lat, lon, k):
+                weather_data = self.__local_cache.peek(key)
+                if weather_data is None:  # Removed from the cache without an eviction event
+                    self.__spatial_index.remove(key)
+                    continue
+                found.append((weather_data, distance))
+            if len(found) == k or len(found) == len(self.__spatial_index):
+                return found
+
+    def save_snapshot(self, path: str = None) -> int:
+        """
+        Saves the cached weather data with the times it was fetched at to a binary snapshot file.
+
+        :param path: The path of the snapshot file (defaults to snapshot_path).
+        :return: The number of saved entries.
+        """
+        return write_snapshot(self.__snapshot_file(path), self.__local_cache.entries())
+
+    def load_snapshot(self, path: str = None, max_age: float = None) -> int:
+        """
+        Loads weather data from a snapshot file into the cache. Entries keep the time they were fetched at, so
+        they expire as they would have without the restart. Cities already cached are not overwritten.
+
+        :param path: The path of the snapshot file (defaults to snapshot_path).
+        :param max_age: The age in seconds above which entries are skipped (optional).
+        :return: The number of loaded entries.
+        """
+        now = time.time()
+        count = 0
+        for key, weather_data, fetched in read_snapshot(self.__snapshot_file(path)):
+            if (max_age is not None and now - fetched > max_age) or key in self.__local_cache:
+                continue
+            self.__local_cache.set(key, weather_data, fetched)
+            self.__index(key, weather_data)
+            count += 1
+        return count
+
+    def __snapshot_file(self, path: str = None) -> str:
+        """
+        Returns the path of the snapshot file to use.
+
+        :param path: The path passed by the caller (optional).
+        :return: The path, or snapshot_path if it is not provided.
+        """
+        path = path or self.__snapshot_path
+        if path is None:
+            raise ValueError("No snapshot path: pass path or set snapshot_path")
+        return path
+
+    def close(self) -> None:
+        """
+        Stops polling and background refreshes, saves the snapshot if snapshot_path is set and closes all pooled
+        connections of the HTTP session.
+        """
+        self.stop_polling()
+        self.__changes.close()
+        self.__revalidator.shutdown(cancel_futures=True)  # Waits for the refreshes in progress
+        if self.__snapshot_path is not None:
+            self.__snapshot_stop.set()
+            self.save_snapshot()
+        self.__session.close()
+
+    def unregister(self) -> None:
+        """
+        Removes the instance from the instances by API key, so the next OpenWeatherSDK(apikey) creates a new
+        instance with new options. Call close() first to stop its background work.
+        """
+        if self.__instances.get(self.__api_key) is self:
+            del self.__instances[self.__api_key]
 
     def get_city_coordinates(self, city_name) -> (float, float):
         """
@@ -83,24 +452,36 @@ class OpenWeatherSDK:
         """
         # Attempt to retrieve city coordinates from the local cache
 
-        if city_name in self.__local_cache:
-            return self.__local_cache[city_name].lat, self.__local_cache[city_name].lon
+        weather_data = self.__local_cache.peek(city_name)
+        if weather_data is not None:
+            return weather_data.lat, weather_data.lon
+        coordinates = self.__geocache.get(city_name)
+        if coordinates is not None:
+            if self.__canonical_keys and city_name not in self.__aliases:
+                self.__aliases.add(city_name, *coordinates)
+            return coordinates
+        self.__raise_remembered(("geocoding", city_name))
 
         # Make an API request if the city is not in the local cache
 
-        url = f"http://api.openweathermap.org/geo/1.0/direct"
+        url = f"{self.__base_url}/geo/1.0/direct"
         params = {
             'q': city_name,
             'limit': 1,
             'appid': self.__api_key
         }
-        response = requests.get(url, params=params)
+        response = self.__get("geocoding", url, params)
         if response.status_code == 200:
             data = response.json()
             if data:
+                self.__geocache.set(city_name, data[0]['lat'], data[0]['lon'])
+                if self.__canonical_keys:
+                    self.__aliases.add_geocoding(city_name, data[0])
                 return data[0]['lat'], data[0]['lon']
             else:
-                raise InvalidCity("Город не найден")
+                error = InvalidCity("Город не найден")
+                self.__negative_cache.set(("geocoding", city_name), error)
+                raise error
         elif response.status_code == 401:
             raise UnauthorizedError("Unauthorized access", response.json())
         elif response.status_code == 404:
@@ -108,42 +489,547 @@ class OpenWeatherSDK:
         else:
             raise RequestError("Ошибка запроса к Geocoding API:", response.text)
 
-    def get_weatherdata(self, city: str, lat: float = None, lon: float = None) -> json:
+    def get_weatherdata(self, city: str, lat: float = None, lon: float = None, max_age: float = None,
+                        units: str = "metric", lang: str = "en") -> json:
         """
         Retrieves or updates the weather data for a specified city.
 
         :param city: The name of the city.
         :param lat: The latitude of the city (optional if city name is provided).
         :param lon: The longitude of the city (optional if city name is provided).
+        :param max_age: The maximum acceptable age in seconds of the returned weather data (optional).
+                        Stale data within this age is returned immediately and refreshed in the background.
+        :param units: "metric", "imperial" or "standard", converted from the cached metric data.
+        :param lang: The language of the weather description.
         :return: A JSON object containing the weather data.
         """
-        now = datetime.now(timezone.utc)
+        return self.get_weatherdata_object(city, lat, lon, max_age, units, lang).to_json()
 
-        # Check if city is not in cache
+    def get_weatherdata_bytes(self, city: str, lat: float = None, lon: float = None,
+                              max_age: float = None, units: str = "metric", lang: str = "en") -> bytes:
+        """
+        Retrieves or updates the weather data for a specified city as UTF-8 encoded JSON.
 
-        if not (city in self.__local_cache and
-                get_time_difference(
-                    datetime.utcfromtimestamp(self.__local_cache[city].datetime).replace(tzinfo=timezone.utc), now
-                ) < self.__update_time):
-            with threading.Lock():
-                params = self.__params.copy()
-                if not lat and not lon:  # Get city coordinates if not provided
-                    lat, lon = self.get_city_coordinates(city)
-                params["lat"] = lat
-                params["lon"] = lon
-                params["city_name"] = city
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :param max_age: The maximum acceptable age in seconds of the returned weather data (optional).
+        :param units: "metric", "imperial" or "standard", converted from the cached metric data.
+        :param lang: The language of the weather description.
+        :return: JSON bytes containing the weather data.
+        """
+        return self.get_weatherdata_object(city, lat, lon, max_age, units, lang).to_json_bytes()
 
-                # Update the cache and the history of queried cities
+    def get_weatherdata_object(self, city: str, lat: float = None, lon: float = None,
+                               max_age: float = None, units: str = "metric", lang: str = "en") -> WeatherData:
+        """
+        Retrieves or updates the weather data for a specified city without serializing it.
 
-                if city not in self.__local_history:
-                    self.__local_history.append(city)
-                if len(self.__local_history) > 10:  # Remove the oldest city from the cache if history exceeds 10 cities
-                    del self.__local_cache[self.__local_history.pop(0)]
-                self.__local_cache[city] = self.req_for_weatherdata(params)
-        return self.__local_cache[city].to_json()
+        The cache holds one metric observation in English per city. Other units are converted from it and other
+        languages only need the translated description, which is requested once per weather condition.
 
-    @staticmethod
-    def req_for_weatherdata(params: dict) -> WeatherData:
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional if city name is provided).
+        :param lon: The longitude of the city (optional if city name is provided).
+        :param max_age: The maximum acceptable age in seconds of the returned weather data (optional).
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: An instance of WeatherData. It is shared with the cache and must not be modified.
+        """
+        if self.__canonical_keys:
+            city, lat, lon = self.__canonicalize(city, lat, lon)
+        return self.__localize(city, self.__lookup(city, lat, lon, max_age), units, lang)
+
+    def __canonicalize(self, city: str, lat: float = None, lon: float = None) -> (str, float, float):
+        """
+        Maps a location onto its canonical location ID, geocoding names that are not known yet.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional).
+        :param lon: The longitude of the city (optional).
+        :return: A tuple containing the location ID and the coordinates of the location.
+        """
+        if lat is not None and lon is not None:
+            return self.__aliases.location_id(lat, lon), lat, lon
+        location_id = self.__aliases.resolve(city)
+        if location_id is None:
+            lat, lon = self.get_city_coordinates(city)
+            location_id = self.__aliases.resolve(city) or self.__aliases.add(city, lat, lon)
+        lat, lon = self.__aliases.get_coordinates(location_id)
+        return location_id, lat, lon
+
+    def __lookup(self, city: str, lat: float = None, lon: float = None, max_age: float = None) -> WeatherData:
+        """
+        Returns the cached metric weather data of the city, requesting it if needed.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional).
+        :param lon: The longitude of the city (optional).
+        :param max_age: The maximum acceptable age in seconds of the returned weather data (optional).
+        :return: An instance of WeatherData.
+        """
+        if max_age is None and not self.__stale_while_revalidate:
+
+            # Check if city is not in cache
+
+            weather_data = self.__local_cache.get(city)
+            if weather_data is None:
+                weather_data = self.__find_nearby(lat, lon)
+            if weather_data is None:  # Concurrent misses for the same city share one request
+                if self.__observer is not None:
+                    self.__observer.on_cache_miss(city)
+                weather_data = self.__load(city, lat, lon)
+            elif self.__observer is not None:
+                self.__observer.on_cache_hit(city)
+            return weather_data
+
+        # Stale-while-revalidate: return stale data within the maximum age and refresh it in the background
+
+        entry = self.__local_cache.get_with_age(city)
+        if entry is not None:
+            weather_data, age = entry
+            if age <= (self.__max_stale_age if max_age is None else max_age):
+                if age >= self.__update_time:
+                    self.__revalidate(city, lat, lon)
+                self.__local_cache.record_lookup(True)
+                if self.__observer is not None:
+                    self.__observer.on_cache_hit(city)
+                return weather_data
+        self.__local_cache.record_lookup(False)
+        weather_data = self.__find_nearby(lat, lon, max_age)
+        if weather_data is not None:
+            if self.__observer is not None:
+                self.__observer.on_cache_hit(city)
+            return weather_data
+        if self.__observer is not None:
+            self.__observer.on_cache_miss(city)
+        return self.__load(city, lat, lon)
+
+    def get_weatherdata_many(self, locations: list, max_workers: int = None, units: str = "metric",
+                             lang: str = "en") -> list:
+        """
+        Retrieves weather data for many locations at once.
+
+        Duplicate locations are requested only once, fresh entries are served from the cache and the misses
+        are fetched concurrently on a bounded thread pool.
+
+        :param locations: A list of city names or (lat, lon) pairs.
+        :param max_workers: The maximum number of concurrent requests (defaults to the connection pool size).
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: A list in the order of locations. Each item is either a JSON object containing the weather data
+                 or the exception raised while retrieving it.
+        """
+        keys, coordinates = self.__parse_locations(locations)
+        results, misses = self.__lookup_many(coordinates)
+        if misses:
+            workers = min(max_workers or self.__session_config.pool_maxsize, len(misses))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {key: executor.submit(self.__load, key, *coordinates[key]) for key in misses}
+                for key, future in futures.items():
+                    try:
+                        results[key] = future.result()
+                    except Exception as e:  # Errors are reported per location instead of aborting the batch
+                        results[key] = e
+        return self.__localize_many(keys, results, units, lang)
+
+    def get_weatherdata_area(self, locations: list, cluster_radius: float = 25_000, max_distance: float = 10_000,
+                             method: str = "circle", max_workers: int = None, units: str = "metric",
+                             lang: str = "en") -> list:
+        """
+        Retrieves weather data for many locations with one request per group of nearby locations.
+
+        Locations missing from the cache are grouped so that each group fits in a circle of cluster_radius.
+        Each group is fetched with one call to the find (method "circle") or box/city (method "box") endpoint,
+        and every location is assigned the nearest returned station within max_distance. Locations without
+        such a station, single-location groups and groups whose request fails are fetched one by one.
+        Station data lacks visibility, sunrise, sunset and timezone. They are taken from the weather data cached
+        for the location within max_stale_age, which is then updated. Otherwise the location is fetched one by one,
+        so partial station data is never returned or cached.
+
+        :param locations: A list of city names or (lat, lon) pairs.
+        :param cluster_radius: The radius of a group of locations in meters.
+        :param max_distance: The maximum distance in meters between a location and the station assigned to it.
+        :param method: "circle" or "box".
+        :param max_workers: The maximum number of concurrent requests (defaults to the connection pool size).
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: A list in the order of locations. Each item is either a JSON object containing the weather data
+                 or the exception raised while retrieving it.
+        """
+        if method not in ("circle", "box"):
+            raise ValueError(f"Unknown method {method!r}, expected 'circle' or 'box'")
+        keys, coordinates = self.__parse_locations(locations)
+        results, misses = self.__lookup_many(coordinates)
+        if not misses:
+            return self.__localize_many(keys, results, units, lang)
+
+        workers = min(max_workers or self.__session_config.pool_maxsize, len(misses))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            # Resolve the coordinates of city names
+
+            pending = dict()
+            futures = {key: executor.submit(self.get_city_coordinates, key)
+                       for key in misses if coordinates[key][0] is None}
+            for key in misses:
+                if key not in futures:
+                    pending[key] = coordinates[key]
+                    continue
+                try:
+                    pending[key] = futures[key].result()
+                except Exception as e:
+                    results[key] = e
+
+            # Fetch every group with one area request and the remaining locations one by one
+
+            singles = dict()
+            futures = dict()
+            for center, members in cluster_locations(pending, cluster_radius):
+                if len(members) == 1:
+                    singles.update(members)
+                else:
+                    futures[executor.submit(self.__fetch_area, center, members, max_distance, method)] = members
+            for future, members in futures.items():
+                try:
+                    stations = future.result()
+                except Exception:  # Fall back to the per-location endpoint
+                    singles.update(members)
+                    continue
+                matches = match_stations(stations, members, max_distance)
+                for key, (lat, lon) in members.items():
+                    if key not in matches:
+                        singles[key] = (lat, lon)
+                        continue
+                    weather_data = WeatherData.from_station(matches[key], lat, lon, self.__aliases.get_name(key, key))
+                    storage_key = self.__storage_key(key)
+                    completed = self.__complete_station(storage_key, matches[key], weather_data)
+                    if completed is None:  # Partial station data is fetched per location instead
+                        singles[key] = (lat, lon)
+                        continue
+                    self.__store(storage_key, completed)
+                    results[key] = completed
+
+            futures = {key: executor.submit(self.__load, key, *singles[key]) for key in singles}
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    results[key] = e
+        return self.__localize_many(keys, results, units, lang)
+
+    def __complete_station(self, key: str, station: dict, weather_data: WeatherData):
+        """
+        Fills the fields missing from station data with the weather data cached for the location.
+
+        :param key: The cache key of the location.
+        :param station: The station entry of the area response.
+        :param weather_data: The weather data created from the station entry.
+        :return: The complete weather data, or None if fields are missing and nothing recent enough is cached.
+        """
+        sun = station.get("sys", {})
+        missing = [name for name, present in (("visibility", "visibility" in station), ("sunrise", "sunrise" in sun),
+                                              ("sunset", "sunset" in sun), ("timezone", "timezone" in station))
+                   if not present]
+        if not missing:
+            return weather_data
+        entry = self.__local_cache.get_with_age(key)
+        if entry is None or entry[1] > self.__max_stale_age:
+            return None
+        return replace(weather_data, **{name: getattr(entry[0], name) for name in missing})
+
+    def __parse_locations(self, locations: list) -> (list, dict):
+        """
+        Converts locations into cache keys. Coordinates are keyed as "lat,lon". With canonical keys coordinates and
+        known names are keyed by their location ID, names that are not known yet are mapped when they are stored.
+
+        :param locations: A list of city names or (lat, lon) pairs.
+        :return: A tuple containing the keys in the order of locations and a dictionary mapping the unique keys,
+                 in order of first appearance, to (lat, lon) tuples, which are (None, None) for city names.
+        """
+        keys = list()
+        coordinates = dict()
+        for location in locations:
+            if isinstance(location, str):
+                key, lat, lon = location, None, None
+                location_id = self.__aliases.resolve(location) if self.__canonical_keys else None
+                if location_id is not None:
+                    key = location_id
+                    lat, lon = self.__aliases.get_coordinates(location_id)
+            else:
+                lat, lon = location
+                key = self.__aliases.location_id(lat, lon) if self.__canonical_keys else f"{lat},{lon}"
+            keys.append(key)
+            coordinates.setdefault(key, (lat, lon))
+        return keys, coordinates
+
+    def __lookup_many(self, coordinates: dict) -> (dict, list):
+        """
+        Serves fresh entries from the cache and collects the misses.
+
+        :param coordinates: A dictionary mapping keys to (lat, lon) tuples.
+        :return: A tuple containing a dictionary mapping the cached keys to WeatherData and a list of the missing keys.
+        """
+        results = dict()
+        misses = list()
+        for key in coordinates:
+            weather_data = self.__local_cache.get(key)
+            if weather_data is None:
+                weather_data = self.__find_nearby(*coordinates[key])
+            if weather_data is not None:
+                results[key] = weather_data
+            else:
+                misses.append(key)
+            if self.__observer is not None:
+                (self.__observer.on_cache_miss if weather_data is None else self.__observer.on_cache_hit)(key)
+        return results, misses
+
+    def __load(self, city: str, lat: float = None, lon: float = None) -> WeatherData:
+        """
+        Requests weather data for the city, sharing the request with concurrent callers. If the request fails
+        because of the API or an open circuit breaker, stale cached data is returned in serve_stale mode.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional).
+        :param lon: The longitude of the city (optional).
+        :return: An instance of WeatherData.
+        """
+        try:
+            return self.__single_flight.do(city, self.__refresh, city, lat, lon)
+        except (CircuitOpenError, RequestError, requests.RequestException):
+            if not self.__serve_stale:
+                raise
+            entry = self.__local_cache.get_with_age(city)
+            if entry is None or entry[1] > self.__max_stale_age:
+                raise
+            self.__stale_served += 1
+            return entry[0]
+
+    def __raise_remembered(self, key: tuple) -> None:
+        """
+        Raises the exception remembered in the negative cache for the key, if any.
+
+        :param key: The negative cache key.
+        """
+        error = self.__negative_cache.get(key)
+        if error is not None:
+            raise type(error)(*error.args)
+
+    def __localize_many(self, keys: list, results: dict, units: str, lang: str) -> list:
+        """
+        Converts the results of a batch into the requested units and language and serializes them.
+
+        :param keys: The keys in the order of the locations.
+        :param results: A dictionary mapping the keys to WeatherData or exceptions.
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: A list in the order of keys with JSON objects or exceptions.
+        """
+        for key, result in results.items():
+            if not isinstance(result, Exception):
+                try:
+                    results[key] = self.__localize(key, result, units, lang).to_json()
+                except Exception as e:
+                    results[key] = e
+        return [results[key] for key in keys]
+
+    def __localize(self, city: str, weather_data: WeatherData, units: str, lang: str) -> WeatherData:
+        """
+        Derives the weather data in the requested units and language from the cached metric data in English.
+        The result is kept until the cached data changes, so repeated reads do not convert and serialize again.
+
+        :param city: The cache key.
+        :param weather_data: The cached weather data.
+        :param units: "metric", "imperial" or "standard".
+        :param lang: The language of the weather description.
+        :return: An instance of WeatherData, weather_data itself for metric units in English.
+        """
+        if units == "metric" and lang == self.__params["lang"]:
+            return weather_data
+        key = (city, units, lang)
+        entry = self.__variants.peek(key)
+        if entry is not None and entry[0] is weather_data:
+            return entry[1]
+        description = None if lang == self.__params["lang"] else self.__translate(weather_data, lang)
+        variant = convert(weather_data, units, description)
+        self.__variants.set(key, (weather_data, variant))
+        return variant
+
+    def __translate(self, weather_data: WeatherData, lang: str) -> str:
+        """
+        Returns the weather description in another language.
+
+        Descriptions depend only on the weather condition, so a translation is requested once with the
+        coordinates of the weather data and reused for every location with the same condition.
+
+        :param weather_data: The weather data in English.
+        :param lang: The language of the description.
+        :return: The translated description.
+        """
+        key = (lang, weather_data.weather_description)
+        description = self.__descriptions.get(key)
+        if description is not None:
+            return description
+        params = self.__params.copy()
+        params["lat"] = weather_data.lat
+        params["lon"] = weather_data.lon
+        params["city_name"] = weather_data.name
+        params["lang"] = lang
+        translated = self.__single_flight.do(key, self.req_for_weatherdata, params)
+        if translated.datetime == weather_data.datetime:  # The same observation, so the same condition
+            self.__descriptions[key] = translated.weather_description
+        return translated.weather_description
+
+    def __fetch(self, city: str, lat: float = None, lon: float = None) -> WeatherData:
+        """
+        Requests weather data for the city, resolving its coordinates first if they are not provided.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional).
+        :param lon: The longitude of the city (optional).
+        :return: An instance of WeatherData containing the retrieved weather information.
+        """
+        params = self.__params.copy()
+        if lat is None and lon is None:  # Get city coordinates if not provided
+            lat, lon = self.get_city_coordinates(city)
+        self.__raise_remembered(("weather", lat, lon))
+        params["lat"] = lat
+        params["lon"] = lon
+        params["city_name"] = self.__aliases.get_name(city, city)
+        try:
+            return self.req_for_weatherdata(params)
+        except NotFoundError as e:  # Coordinates without weather data
+            self.__negative_cache.set(("weather", lat, lon), e)
+            raise
+
+    def __find_nearby(self, lat: float = None, lon: float = None, max_age: float = None):
+        """
+        Finds fresh cached weather data within the reuse radius of the coordinates.
+
+        :param lat: Latitude in degrees (optional).
+        :param lon: Longitude in degrees (optional).
+        :param max_age: The maximum acceptable age in seconds of the weather data, if lower than the update time
+                        (optional).
+        :return: The nearest fresh WeatherData, or None if there is none or the coordinates are not provided.
+        """
+        if not self.__reuse_radius or lat is None or lon is None:
+            return None
+        max_age = self.__update_time if max_age is None else min(max_age, self.__update_time)
+        for _, key in self.__spatial_index.within(lat, lon, self.__reuse_radius):
+            entry = self.__local_cache.get_with_age(key)
+            if entry is None:  # Removed from the cache without an eviction event
+                self.__spatial_index.remove(key)
+            elif entry[1] < max_age:
+                return entry[0]
+        return None
+
+    def __revalidate(self, city: str, lat: float = None, lon: float = None) -> None:
+        """
+        Queues a background refresh of the city unless one is already queued or in progress.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional).
+        :param lon: The longitude of the city (optional).
+        """
+        with self.__revalidating_lock:
+            if city in self.__revalidating:
+                return
+            self.__revalidating.add(city)
+
+        def revalidate():
+            try:
+                self.__single_flight.do(city, self.__refresh, city, lat, lon)
+            except Exception:  # The stale data stays in the cache and the next call tries again
+                pass
+            finally:
+                with self.__revalidating_lock:
+                    self.__revalidating.discard(city)
+
+        try:
+            self.__revalidator.submit(revalidate)
+        except RuntimeError:  # The instance has been closed, the stale data is returned without a refresh
+            with self.__revalidating_lock:
+                self.__revalidating.discard(city)
+
+    def __refresh(self, city: str, lat: float = None, lon: float = None) -> WeatherData:
+        """
+        Requests weather data for the city and puts it into the cache.
+
+        :param city: The name of the city.
+        :param lat: The latitude of the city (optional).
+        :param lon: The longitude of the city (optional).
+        :return: An instance of WeatherData containing the retrieved weather information.
+        """
+        try:
+            weather_data = self.__fetch(city, lat, lon)
+        except Exception as e:
+            if self.__observer is not None:
+                self.__observer.on_error(city, e)
+            raise
+        self.__store(self.__storage_key(city), weather_data)
+        return weather_data
+
+    def __storage_key(self, city: str) -> str:
+        """
+        Returns the cache key of a location. With canonical keys names geocoded in the meantime are stored by
+        their location ID.
+
+        :param city: The name of the city or its location ID.
+        :return: The cache key.
+        """
+        if self.__canonical_keys:
+            return self.__aliases.resolve(city) or city
+        return city
+
+    def __store(self, city: str, weather_data: WeatherData) -> None:
+        """
+        Puts fetched weather data into the cache and the spatial index and schedules its refresh in polling mode.
+
+        :param city: The cache key.
+        :param weather_data: The fetched weather data.
+        """
+        self.__publish(city, weather_data)
+        if self.__poling:
+            self.__refresher.schedule(city)
+
+    def __index(self, key: str, weather_data: WeatherData) -> None:
+        """
+        Adds cached weather data to the spatial index. Keys evicted from the cache are removed by the eviction
+        listener. Keys that leave the cache without an eviction event, e.g. entries expired in a shared cache or
+        evicted while another instance holds the listener of a shared cache, are pruned once the index doubled.
+
+        :param key: The cache key.
+        :param weather_data: The cached weather data.
+        """
+        self.__spatial_index.add(key, weather_data.lat, weather_data.lon)
+        if self.__spatial_index.needs_pruning():
+            self.__spatial_index.prune(self.__local_cache.__contains__)
+
+    def __on_cache_evict(self, key: str) -> None:
+        """
+        Removes an evicted key from the spatial index and reports the eviction to the observer.
+
+        :param key: The evicted cache key.
+        """
+        self.__spatial_index.remove(key)
+        if self.__observer is not None:
+            self.__observer.on_cache_evict(key)
+
+    def __publish(self, city: str, weather_data: WeatherData) -> None:
+        """
+        Puts weather data into the cache and the spatial index and notifies the subscribers if it changed.
+
+        :param city: The cache key.
+        :param weather_data: The new weather data.
+        """
+        publishing = self.__changes.has_subscribers()
+        previous = self.__local_cache.peek(city) if publishing else None
+        self.__local_cache.set(city, weather_data)
+        self.__index(city, weather_data)
+        if publishing:
+            self.__changes.publish(city, previous, weather_data)
+
+    def req_for_weatherdata(self, params: dict) -> WeatherData:
         """
         Makes a request to the OpenWeatherMap API to retrieve weather data for specific coordinates.
 
@@ -151,29 +1037,14 @@ class OpenWeatherSDK:
                        Params can be found at https://api.openweathermap.org/data/2.5/weather
         :return: An instance of WeatherData containing the retrieved weather information.
         """
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        response = requests.get(url, params=params)
+        url = f"{self.__base_url}/data/2.5/weather"
+        response = self.__get("weather", url, params)
 
         # Process the response and construct a WeatherData instance
 
         if response.status_code == 200:
-            data = response.json()
-            weather_data = WeatherData(
-                lat=params["lat"],
-                lon=params["lon"],
-                weather_main=data["weather"][0]["main"],
-                weather_description=data["weather"][0]["description"],
-                temperature=data["main"]["temp"],
-                temperature_feels_like=data["main"]["feels_like"],
-                visibility=data["visibility"],
-                wind_speed=data["wind"]["speed"],
-                datetime=data["dt"],
-                sunrise=data["sys"]["sunrise"],
-                sunset=data["sys"]["sunset"],
-                timezone=data["timezone"],
-                name=params["city_name"]
-            )
-            return weather_data
+            return WeatherData.from_bytes(response.content, params["lat"], params["lon"], params["city_name"],
+                                          self.__keep_raw)
         elif response.status_code == 401:
             raise UnauthorizedError("Unauthorized access", response.json())
         elif response.status_code == 404:
@@ -181,24 +1052,153 @@ class OpenWeatherSDK:
         else:
             raise RequestError("Ошибка получения данных от API:", response.json()["message"])
 
-    def __pooling_cycle(self):
+    def __fetch_area(self, center: tuple, members: dict, margin: float, method: str) -> list:
+        """
+        Requests the stations around a group of locations with one call to an area endpoint.
+
+        :param center: The (lat, lon) center of the group.
+        :param members: A dictionary mapping keys to (lat, lon) tuples of the group.
+        :param margin: The distance in meters around the locations covered by a box request.
+        :param method: "circle" for /data/2.5/find or "box" for /data/2.5/box/city.
+        :return: A list of station entries.
+        """
+        params = {key: value for key, value in self.__params.items() if key != "exclude"}
+        if method == "circle":
+            url = f"{self.__base_url}/data/2.5/find"
+            params["lat"], params["lon"] = center
+            params["cnt"] = 50  # The maximum number of stations returned by the endpoint
+        else:
+            url = f"{self.__base_url}/data/2.5/box/city"
+            left, bottom, right, top = bounding_box(center, members, margin)
+            params["bbox"] = f"{left:.6f},{bottom:.6f},{right:.6f},{top:.6f},10"
+        response = self.__get("find" if method == "circle" else "box", url, params)
+        if response.status_code == 200:
+            return response.json().get("list") or list()
+        elif response.status_code == 401:
+            raise UnauthorizedError("Unauthorized access", response.json())
+        elif response.status_code == 404:
+            raise NotFoundError("Ресурс не найден", response.json())
+        else:
+            raise RequestError("Ошибка получения данных от API:", response.text)
+
+    def __get(self, endpoint: str, url: str, params: dict) -> requests.Response:
         """
-       A continuous loop that updates cached weather data for all cities in the cache at set intervals.
-       """
+        Sends a GET request within the request budget of the API key, retrying after 429 responses.
 
-        # Iterate through the cache to update weather data for each city based on the update interval
+        :param endpoint: The name of the endpoint reported to the observer ("weather", "geocoding", "find" or "box").
+        :param url: The URL of the request.
+        :param params: The query parameters of the request.
+        :return: The response.
+        """
+        breaker = self.__breakers.get(endpoint)
+        for attempt in range(self.__max_429_retries + 1):
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(f"The {endpoint} endpoint is failing, retry in", breaker.get_retry_after())
+            try:
+                self.__rate_limiter.acquire()
+                if self.__observer is None:
+                    response = self.__session.get(url, params=params, timeout=self.__session_config.get_timeout())
+                else:
+                    response = self.__observed_get(endpoint, url, params)
+            except requests.RequestException:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            except BaseException:  # No request was sent, e.g. the rate limiter rejected it
+                if breaker is not None:
+                    breaker.release()
+                raise
+            if breaker is not None:
+                (breaker.record_failure if response.status_code >= 500 else breaker.record_success)()
+            if response.status_code != 429:
+                return response
+            # Pause every caller sharing the limiter for the Retry-After delay
+            self.__rate_limiter.pause(parse_retry_after(response.headers.get("Retry-After")))
+        raise RateLimitError("Too many requests", response.text)
 
-        while True:
-            time.sleep(30)
-            for city in self.__local_cache:
-                city = self.__local_cache[city]
-                now = datetime.now(timezone.utc)
-                if get_time_difference(
-                        city.get_datetime().replace(tzinfo=timezone.utc), now
-                ) >= self.__update_time:
-                    params = self.__params.copy()
-                    city = self.__local_cache[city.name]
-                    params["lat"] = city.lat
-                    params["lon"] = city.lon
-                    params["city_name"] = city.name
-                    self.__local_cache[city.name] = self.req_for_weatherdata(params)
+    def __observed_get(self, endpoint: str, url: str, params: dict) -> requests.Response:
+        """
+        Sends a GET request and reports it with its duration to the observer.
+
+        :param endpoint: The name of the endpoint ("weather", "geocoding", "find" or "box").
+        :param url: The URL of the request.
+        :param params: The query parameters of the request.
+        :return: The response.
+        """
+        observer = self.__observer
+        observer.on_request_start(endpoint, params)
+        start = time.perf_counter()
+        try:
+            response = self.__session.get(url, params=params, timeout=self.__session_config.get_timeout())
+        except Exception:
+            observer.on_request_end(endpoint, None, time.perf_counter() - start)
+            raise
+        observer.on_request_end(endpoint, response.status_code, time.perf_counter() - start)
+        return response
+
+    def __snapshot_periodically(self, interval: float) -> None:
+        """
+        Saves the snapshot every interval seconds until the instance is closed. Runs in a daemon thread.
+
+        :param interval: The time in seconds between snapshots.
+        """
+        while not self.__snapshot_stop.wait(interval):
+            try:
+                self.save_snapshot()
+            except OSError:  # The next snapshot tries again
+                pass
+
+    def __save_on_exit(self) -> None:
+        """
+        Saves the snapshot at interpreter exit unless the instance has been closed, which saves it already.
+        """
+        if not self.__snapshot_stop.is_set():
+            try:
+                self.save_snapshot()
+            except OSError:
+                pass
+
+    def __observe_lag(self, city, lag: float) -> None:
+        """
+        Reports how late a background refresh starts. Called by the refresher.
+
+        :param city: The refreshed city.
+        :param lag: The time in seconds the refresh starts after it was due.
+        """
+        if self.__observer is not None and city is not self.__cache_sync:
+            self.__observer.on_refresh(city, lag)
+
+    def __poll(self, city: str) -> bool:
+        """
+        Refreshes the weather data of a cached city. Called by the refresher when the city is due.
+
+        When the cache is shared between processes only the elected leader refreshes it. The other processes keep
+        their cities scheduled, so one of them takes over if the leader stops.
+
+        :param city: The name of the city.
+        :return: False if the city is no longer cached and should not be refreshed anymore.
+        """
+        if not self.__local_cache.try_acquire_leadership(self.__owner, 2 * self.__update_time):
+            return True
+        if city is self.__cache_sync:  # Schedule the cities stored by other processes
+            for key, weather_data in self.__local_cache.items():
+                self.__index(key, weather_data)
+                if key not in self.__refresher:
+                    self.__refresher.schedule(key)
+            return True
+
+        cached = self.__local_cache.peek(city)
+        if cached is None:  # The city has been evicted from the cache
+            return False
+        params = self.__params.copy()
+        params["lat"] = cached.lat
+        params["lon"] = cached.lon
+        params["city_name"] = cached.name
+        try:
+            weather_data = self.req_for_weatherdata(params)
+        except Exception as e:
+            if self.__observer is not None:
+                self.__observer.on_error(city, e)
+            raise
+        self.__publish(city, weather_data)
+        return True
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+@dataclass
+class SessionConfig:
+    """
+    Contains settings of the pooled HTTP session used by the SDK.
+
+    :argument pool_connections: int - Number of per-host connection pools to keep.
+    :argument pool_maxsize: int - Maximum number of keep-alive connections kept per host.
+    :argument connect_timeout: float - Timeout in seconds for establishing a connection.
+    :argument read_timeout: float - Timeout in seconds for reading a response.
+    :argument retries: int - Number of retries for failed connections and retryable status codes.
+    :argument backoff_factor: float - Backoff factor between retries (0.5 gives 0.5s, 1s, 2s, ...).
+    :argument status_forcelist: tuple - Status codes that trigger a retry.
+    """
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    connect_timeout: float = 3.05
+    read_timeout: float = 10
+    retries: int = 3
+    backoff_factor: float = 0.3
+    status_forcelist: tuple = (500, 502, 503, 504)
+
+    def get_timeout(self) -> (float, float):
+        """
+        Returns the timeout in the format expected by requests.
+
+        :return: A tuple containing the connect and read timeouts.
+        """
+        return self.connect_timeout, self.read_timeout
+
+
+def create_session(config: SessionConfig) -> requests.Session:
+    """
+    Creates a requests session with keep-alive connection pools and retry/backoff for both HTTP and HTTPS.
+
+    :param config: The session settings.
+    :return: A configured requests session.
+    """
+    retry = Retry(
+        total=config.retries,
+        connect=config.retries,
+        read=config.retries,
+        status=config.retries,
+        backoff_factor=config.backoff_factor,
+        status_forcelist=config.status_forcelist,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+        respect_retry_after_header=False,  # 429 responses are retried by the SDK through its rate limiter
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_pool_stats(session: requests.Session) -> dict:
+    """
+    Collects connection reuse statistics from all connection pools of the session.
+
+    :param session: The session created by create_session.
+    :return: A dictionary with the number of pools, opened connections, sent requests,
+             reused connections and idle connections kept alive.
+    """
+    stats = {"pools": 0, "connections": 0, "requests": 0, "reused": 0, "idle": 0}
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:  # The same adapter is mounted for both schemes
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["pools"] += 1
+            stats["connections"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+            stats["idle"] += pool.pool.qsize() if pool.pool is not None else 0
+    stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+    return stats
@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    The first caller for a key runs the function, every caller arriving while it is in flight waits for the
+    same result or exception. The internal lock only guards the table of calls in flight, so calls for
+    different keys never block one another.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls = dict()  # key -> Future of the call in flight
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Runs the function unless a call for the same key is already in flight, in which case waits for it.
+
+        :param key: The key identifying equivalent calls.
+        :param function: The function to run.
+        :return: The result of the function, or raises the exception it raised.
+        """
+        with self.__lock:
+            future = self.__calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.__calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+    def in_flight(self) -> int:
+        """
+        Returns the number of keys with a call in flight.
+
+        :return: The number of calls in flight.
+        """
+        return len(self.__calls)
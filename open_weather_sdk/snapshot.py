@@ -0,0 +1,118 @@
+import mmap
+import os
+import struct
+import tempfile
+
+from open_weather_sdk import WeatherData
+
+MAGIC = b"OWSNAP\x00\x00"
+VERSION = 1
+
+# magic, version, number of entries, offset of the string table
+HEADER = struct.Struct("<8sIIQ")
+# key, name, weather_main, weather_description (string table indexes), lat, lon, temperature,
+# temperature_feels_like, wind_speed, datetime, fetch time, visibility, sunrise, sunset, timezone
+RECORD = struct.Struct("<IIIIdddddddqqqi")
+LENGTH = struct.Struct("<I")
+
+
+def write_snapshot(path: str, entries) -> int:
+    """
+    Writes cache entries to a binary snapshot file.
+
+    Entries are stored as fixed-size records followed by a table of the distinct strings, so the file is compact
+    and can be read through a memory map without parsing. The file is written to a unique temporary file in the
+    same directory and renamed, so readers never see a partial snapshot and concurrent writers never share it.
+
+    :param path: The path of the snapshot file.
+    :param entries: An iterable of (key, WeatherData, fetch Unix time) tuples.
+    :return: The number of entries written.
+    """
+    strings = dict()  # string -> index in the string table
+
+    def encode(value: str) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    records = bytearray()
+    count = 0
+    for key, weather_data, fetched in entries:
+        records += RECORD.pack(
+            encode(key), encode(weather_data.name), encode(weather_data.weather_main),
+            encode(weather_data.weather_description), weather_data.lat, weather_data.lon,
+            weather_data.temperature, weather_data.temperature_feels_like, weather_data.wind_speed,
+            weather_data.datetime, fetched, int(weather_data.visibility), int(weather_data.sunrise),
+            int(weather_data.sunset), int(weather_data.timezone)
+        )
+        count += 1
+
+    descriptor, temporary = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(path) + ".",
+                                             dir=os.path.dirname(path) or None)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, count, HEADER.size + len(records)))
+            file.write(records)
+            file.write(LENGTH.pack(len(strings)))
+            for value in strings:
+                data = value.encode()
+                file.write(LENGTH.pack(len(data)))
+                file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return count
+
+
+def read_snapshot(path: str):
+    """
+    Reads the entries of a snapshot file through a memory map.
+
+    The record count, the string table and the string indexes of all records are checked against the file before
+    the first entry is returned, so a truncated or corrupt file raises ValueError instead of yielding part of it.
+
+    :param path: The path of the snapshot file.
+    :return: A generator of (key, WeatherData, fetch Unix time) tuples.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a weather cache snapshot")
+        magic, version, count, strings_offset = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a weather cache snapshot of version {VERSION}")
+        if strings_offset != HEADER.size + count * RECORD.size or strings_offset + LENGTH.size > len(data):
+            raise ValueError(f"{path} is truncated: {count} records do not fit in {len(data)} bytes")
+
+        # Decode the string table once, records refer to it by index
+
+        strings = list()
+        offset = strings_offset + LENGTH.size
+        for _ in range(LENGTH.unpack_from(data, strings_offset)[0]):
+            if offset + LENGTH.size > len(data):
+                raise ValueError(f"{path} is truncated in the string table")
+            length = LENGTH.unpack_from(data, offset)[0]
+            offset += LENGTH.size
+            if offset + length > len(data):
+                raise ValueError(f"{path} is truncated in the string table")
+            strings.append(data[offset:offset + length].decode())
+            offset += length
+
+        records = memoryview(data)[HEADER.size:strings_offset]
+        try:
+            if any(max(record[:4]) >= len(strings) for record in RECORD.iter_unpack(records)):
+                raise ValueError(f"{path} refers to strings missing from its string table")
+        finally:
+            records.release()
+
+        for offset in range(HEADER.size, strings_offset, RECORD.size):
+            (key, name, weather_main, weather_description, lat, lon, temperature, feels_like, wind_speed,
+             datetime, fetched, visibility, sunrise, sunset, timezone) = RECORD.unpack_from(data, offset)
+            yield strings[key], WeatherData(
+                lat=lat, lon=lon, weather_main=strings[weather_main],
+                weather_description=strings[weather_description], temperature=temperature,
+                temperature_feels_like=feels_like, visibility=visibility, wind_speed=wind_speed,
+                datetime=int(datetime) if datetime.is_integer() else datetime, sunrise=sunrise, sunset=sunset,
+                timezone=timezone, name=strings[name]
+            ), fetched
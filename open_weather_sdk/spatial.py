@@ -0,0 +1,198 @@
+import heapq
+import math
+import threading
+
+EARTH_RADIUS = 6_371_008.8  # Mean Earth radius in meters
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculates the great-circle distance between two points.
+
+    :param lat1: Latitude of the first point in degrees.
+    :param lon1: Longitude of the first point in degrees.
+    :param lat2: Latitude of the second point in degrees.
+    :param lon2: Longitude of the second point in degrees.
+    :return: The distance in meters.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    A grid index of keys by their coordinates for radius and nearest-neighbour queries.
+
+    The globe is divided into cells of cell_size degrees. A radius query only visits the cells overlapping the
+    bounding box of the circle, so its cost depends on the number of points nearby rather than on the total
+    number of points. Queries whose bounding box spans more cells than there are points scan all points instead.
+    """
+
+    def __init__(self, cell_size: float = 0.01):
+        """
+        Initializes an empty index.
+
+        :param cell_size: The size of a grid cell in degrees (0.01 is about 1.1 km of latitude).
+        """
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive")
+        self.__cell_size = cell_size
+        self.__columns = math.ceil(360 / cell_size)  # Number of cells around a parallel, for wrapping at 180°
+        self.__cells = dict()  # (row, column) -> {key: (lat, lon)}
+        self.__points = dict()  # key -> (lat, lon)
+        self.__pruned_size = 0  # Number of points after the last prune
+        self.__lock = threading.Lock()
+
+    def __cell(self, lat: float, lon: float) -> (int, int):
+        return math.floor(lat / self.__cell_size), math.floor((lon + 180) / self.__cell_size) % self.__columns
+
+    def add(self, key, lat: float, lon: float) -> None:
+        """
+        Adds the key at the coordinates, moving it if it is already indexed.
+
+        :param key: The key to index.
+        :param lat: Latitude in degrees.
+        :param lon: Longitude in degrees.
+        """
+        with self.__lock:
+            self.__discard(key)
+            self.__points[key] = (lat, lon)
+            self.__cells.setdefault(self.__cell(lat, lon), dict())[key] = (lat, lon)
+
+    def remove(self, key) -> None:
+        """
+        Removes the key from the index if present.
+
+        :param key: The key to remove.
+        """
+        with self.__lock:
+            self.__discard(key)
+
+    def __discard(self, key) -> None:
+        point = self.__points.pop(key, None)
+        if point is None:
+            return
+        cell = self.__cell(*point)
+        points = self.__cells[cell]
+        del points[key]
+        if not points:
+            del self.__cells[cell]
+
+    def needs_pruning(self) -> bool:
+        """
+        Returns whether the index has doubled in size since the last prune, so callers that cannot remove every
+        stale key right away can prune it at an amortized constant cost per addition.
+
+        :return: True if prune should be called.
+        """
+        return len(self.__points) >= 2 * max(self.__pruned_size, 64)
+
+    def prune(self, keep) -> int:
+        """
+        Removes the keys that are no longer valid.
+
+        :param keep: A function called with every key, returning False for the keys to remove.
+        :return: The number of removed keys.
+        """
+        with self.__lock:
+            keys = list(self.__points)
+        removed = [key for key in keys if not keep(key)]
+        with self.__lock:
+            for key in removed:
+                self.__discard(key)
+            self.__pruned_size = len(self.__points)
+        return len(removed)
+
+    def get(self, key):
+        """
+        Returns the coordinates of the key.
+
+        :param key: The indexed key.
+        :return: A tuple containing the latitude and longitude, or None.
+        """
+        return self.__points.get(key)
+
+    def within(self, lat: float, lon: float, radius: float) -> list:
+        """
+        Finds the keys within the radius of the point.
+
+        :param lat: Latitude in degrees.
+        :param lon: Longitude in degrees.
+        :param radius: The radius in meters.
+        :return: A list of (distance in meters, key) tuples, nearest first.
+        """
+        delta_lat = math.degrees(radius / EARTH_RADIUS)
+        with self.__lock:
+            candidates = self.__candidates(lat, lon, delta_lat)
+            found = list()
+            for key, (point_lat, point_lon) in candidates:
+                distance = haversine(lat, lon, point_lat, point_lon)
+                if distance <= radius:
+                    found.append((distance, key))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def __candidates(self, lat: float, lon: float, delta_lat: float):
+        """
+        Returns the points in the cells overlapping the bounding box of a circle.
+
+        :param lat: Latitude of the center in degrees.
+        :param lon: Longitude of the center in degrees.
+        :param delta_lat: The radius of the circle in degrees of latitude.
+        :return: An iterable of (key, (lat, lon)) tuples.
+        """
+        low, high = lat - delta_lat, lat + delta_lat
+        widest = max(abs(low), abs(high))
+        if widest >= 90 or delta_lat >= 90:  # The circle covers a pole, every longitude is involved
+            return list(self.__points.items())
+        delta_lon = delta_lat / math.cos(math.radians(widest))
+        if delta_lon >= 180:
+            return list(self.__points.items())
+
+        first_row, first_column = self.__cell(low, lon - delta_lon)
+        last_row, last_column = self.__cell(high, lon + delta_lon)
+        columns = (last_column - first_column) % self.__columns + 1
+        if (last_row - first_row + 1) * columns > len(self.__points):  # Scanning is cheaper than visiting cells
+            return list(self.__points.items())
+
+        candidates = list()
+        for row in range(first_row, last_row + 1):
+            for offset in range(columns):
+                points = self.__cells.get((row, (first_column + offset) % self.__columns))
+                if points:
+                    candidates.extend(points.items())
+        return candidates
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list:
+        """
+        Finds the k keys nearest to the point.
+
+        The search radius starts at one cell and doubles until k keys are found, so nearby queries stay local.
+
+        :param lat: Latitude in degrees.
+        :param lon: Longitude in degrees.
+        :param k: The maximum number of keys to return.
+        :return: A list of up to k (distance in meters, key) tuples, nearest first.
+        """
+        if k <= 0 or not self.__points:
+            return list()
+        radius = math.radians(self.__cell_size) * EARTH_RADIUS
+        while radius < math.pi * EARTH_RADIUS:
+            found = self.within(lat, lon, radius)
+            if len(found) >= k:
+                return found[:k]
+            radius *= 2
+        with self.__lock:
+            points = list(self.__points.items())
+        return heapq.nsmallest(
+            k, ((haversine(lat, lon, point_lat, point_lon), key) for key, (point_lat, point_lon) in points),
+            key=lambda item: item[0]
+        )
+
+    def __contains__(self, key) -> bool:
+        return key in self.__points
+
+    def __len__(self) -> int:
+        return len(self.__points)
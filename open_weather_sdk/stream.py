@@ -0,0 +1,321 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+
+from open_weather_sdk import WeatherData, WeatherRecord
+
+FIELDS = tuple(field.name for field in fields(WeatherData))
+
+
+def diff(previous: WeatherRecord, current: WeatherRecord) -> dict:
+    """
+    Compares two observations field by field.
+
+    :param previous: The previous observation, or None for a new location.
+    :param current: The current observation.
+    :return: A dictionary mapping the names of the changed fields to (old value, new value) tuples. All fields
+             are changed, with None old values, if there is no previous observation.
+    """
+    if previous is None:
+        return {name: (None, getattr(current, name)) for name in FIELDS}
+    changes = dict()
+    for name in FIELDS:
+        old, new = getattr(previous, name), getattr(current, name)
+        if old != new:
+            changes[name] = (old, new)
+    return changes
+
+
+@dataclass(slots=True, frozen=True)
+class ChangeEvent:
+    """
+    A change of the weather data of a location.
+
+    :argument key: str - The cache key of the location.
+    :argument previous: WeatherData - The previous observation, or None for a new location.
+    :argument current: WeatherData - The new observation.
+    :argument changes: dict - The changed fields mapped to (old value, new value) tuples.
+    :argument timestamp: float - The Unix time of the change.
+    """
+    key: str
+    previous: WeatherRecord
+    current: WeatherRecord
+    changes: dict
+    timestamp: float
+
+
+class Subscription:
+    """
+    A bounded stream of change events, iterable with a for loop (blocking) or an async for loop.
+
+    Pending events are kept one per location: a new change of a location whose previous change has not been
+    consumed yet is merged into it, so a slow subscriber gets the latest state with the combined diff instead of
+    every intermediate one. A merged change that no longer passes the condition leaves the pending one as it is,
+    and one without any change of interest left drops it. At most maxsize locations are pending. When the stream
+    is full, the oldest event is dropped, or with overflow="block" the publishing thread waits up to block_timeout
+    seconds for the subscriber, which slows down the background refresh instead of losing events.
+    """
+
+    def __init__(self, stream, keys=None, fields=None, thresholds: dict = None, condition=None,
+                 maxsize: int = 1000, overflow: str = "drop_oldest", block_timeout: float = 1.0):
+        """
+        Initializes an empty subscription. Use ChangeStream.subscribe to create one.
+
+        :param stream: The ChangeStream publishing the events.
+        :param keys: Optional iterable of the cache keys of interest.
+        :param fields: Optional iterable of the field names of interest, changes of other fields are ignored.
+        :param thresholds: Optional dictionary mapping numeric field names to the minimum absolute change reported,
+                           compared to the previous observation.
+        :param condition: Optional function called with the new WeatherData, events are only delivered if it
+                          returns True, e.g. lambda weather_data: weather_data.wind_speed >= 10.
+        :param maxsize: The maximum number of pending events.
+        :param overflow: "drop_oldest" or "block".
+        :param block_timeout: The maximum time in seconds a publisher waits with overflow="block".
+        """
+        if overflow not in ("drop_oldest", "block"):
+            raise ValueError(f"Unknown overflow {overflow!r}, expected 'drop_oldest' or 'block'")
+        if maxsize < 1:
+            raise ValueError("Subscription maxsize must be positive")
+        self.__stream = stream
+        self.__keys = None if keys is None else frozenset(keys)
+        self.__fields = None if fields is None else frozenset(fields)
+        self.__thresholds = thresholds or dict()
+        self.__condition = condition
+        self.__maxsize = maxsize
+        self.__overflow = overflow
+        self.__block_timeout = block_timeout
+        self.__pending = OrderedDict()  # key -> ChangeEvent, oldest first
+        self.__lock = threading.Condition()
+        self.__waiters = list()  # (event loop, future) of async consumers
+        self.__closed = False
+        self.__delivered = 0
+        self.__merged = 0
+        self.__dropped = 0
+
+    def __select(self, changes: dict) -> dict:
+        """
+        Keeps the changes of interest.
+
+        :param changes: The changed fields mapped to (old value, new value) tuples.
+        :return: The changes of the fields of interest that exceed their threshold.
+        """
+        selected = dict()
+        for name, (old, new) in changes.items():
+            if self.__fields is not None and name not in self.__fields:
+                continue
+            threshold = self.__thresholds.get(name)
+            if threshold is not None and old is not None and abs(new - old) < threshold:
+                continue
+            selected[name] = (old, new)
+        return selected
+
+    def offer(self, event: ChangeEvent) -> bool:
+        """
+        Queues an event if it matches the filters. Called by the ChangeStream.
+
+        :param event: The change event.
+        :return: True if the event was queued or merged into a pending one.
+        """
+        if self.__closed or (self.__keys is not None and event.key not in self.__keys):
+            return False
+        with self.__lock:
+            pending = self.__pending.get(event.key)
+            if pending is not None:  # Merge with the pending change of the location
+                event = ChangeEvent(event.key, pending.previous, event.current,
+                                    diff(pending.previous, event.current), event.timestamp)
+            changes = self.__select(event.changes)
+            if not changes:
+                if pending is not None:  # The new change cancels out the pending one
+                    del self.__pending[event.key]
+                    self.__merged += 1
+                    self.__dropped += 1
+                    self.__lock.notify_all()
+                return False
+            if self.__condition is not None and not self.__condition(event.current):
+                return False  # A pending change stays, as it would have been delivered to a faster subscriber
+            if pending is not None:
+                del self.__pending[event.key]
+                self.__merged += 1
+            if len(self.__pending) >= self.__maxsize:
+                if self.__overflow == "block":
+                    self.__lock.wait_for(lambda: len(self.__pending) < self.__maxsize or self.__closed,
+                                         self.__block_timeout)
+                if self.__closed:
+                    return False
+                while len(self.__pending) >= self.__maxsize:
+                    self.__pending.popitem(last=False)
+                    self.__dropped += 1
+            self.__pending[event.key] = ChangeEvent(event.key, event.previous, event.current, changes,
+                                                    event.timestamp)
+            self.__wake()
+        return True
+
+    def __wake(self) -> None:
+        """
+        Wakes up the blocked and async consumers. Must be called with the lock held.
+        """
+        self.__lock.notify_all()
+        for loop, future in self.__waiters:
+            try:
+                loop.call_soon_threadsafe(self.__resolve, future)
+            except RuntimeError:  # The event loop of the consumer has been closed
+                pass
+        self.__waiters.clear()
+
+    @staticmethod
+    def __resolve(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def __pop(self):
+        """
+        Removes the oldest pending event. Must be called with the lock held.
+
+        :return: The event, or None if there is none.
+        """
+        if not self.__pending:
+            return None
+        event = self.__pending.popitem(last=False)[1]
+        self.__delivered += 1
+        self.__lock.notify_all()  # Wake up publishers blocked on a full stream
+        return event
+
+    def get(self, timeout: float = None):
+        """
+        Returns the next event, waiting for it if there is none.
+
+        :param timeout: The maximum time in seconds to wait (optional).
+        :return: The ChangeEvent, or None if the timeout passed or the subscription is closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__lock:
+            while True:
+                event = self.__pop()
+                if event is not None or self.__closed:
+                    return event
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.__lock.wait(remaining)
+
+    def close(self) -> None:
+        """
+        Stops the subscription. Iteration ends after the pending events are consumed.
+        """
+        self.__stream.unsubscribe(self)
+        with self.__lock:
+            self.__closed = True
+            self.__wake()
+
+    def is_closed(self) -> bool:
+        """
+        Returns whether the subscription has been closed.
+
+        :return: True if closed.
+        """
+        return self.__closed
+
+    def get_stats(self) -> dict:
+        """
+        Returns subscription statistics.
+
+        :return: A dictionary with the number of delivered, merged and dropped events and of pending events.
+        """
+        return {
+            "delivered": self.__delivered,
+            "merged": self.__merged,
+            "dropped": self.__dropped,
+            "pending": len(self.__pending),
+        }
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        while True:
+            with self.__lock:
+                event = self.__pop()
+                if event is not None:
+                    return event
+                if self.__closed:
+                    raise StopAsyncIteration
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                self.__waiters.append((loop, future))
+            await future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ChangeStream:
+    """
+    Publishes the changes of weather data to subscriptions.
+    """
+
+    def __init__(self):
+        self.__subscriptions = list()
+        self.__lock = threading.Lock()
+
+    def has_subscribers(self) -> bool:
+        """
+        Returns whether there is any subscription, so publishers can skip preparing events otherwise.
+
+        :return: True if there is at least one subscription.
+        """
+        return bool(self.__subscriptions)
+
+    def subscribe(self, **kwargs) -> Subscription:
+        """
+        Creates a subscription.
+
+        :param kwargs: The filters and limits of the subscription, see Subscription.
+        :return: The Subscription.
+        """
+        subscription = Subscription(self, **kwargs)
+        with self.__lock:
+            self.__subscriptions = self.__subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Removes a subscription.
+
+        :param subscription: The subscription.
+        """
+        with self.__lock:
+            self.__subscriptions = [item for item in self.__subscriptions if item is not subscription]
+
+    def close(self) -> None:
+        """
+        Closes all subscriptions.
+        """
+        for subscription in self.__subscriptions:
+            subscription.close()
+
+    def publish(self, key: str, previous: WeatherRecord, current: WeatherRecord) -> int:
+        """
+        Delivers the change of the weather data of a location to the subscriptions, if anything changed.
+
+        :param key: The cache key of the location.
+        :param previous: The previous observation, or None for a new location.
+        :param current: The new observation.
+        :return: The number of subscriptions the event was delivered to.
+        """
+        subscriptions = self.__subscriptions
+        if not subscriptions or previous is current or previous == current:
+            return 0
+        event = ChangeEvent(key, previous, current, diff(previous, current), time.time())
+        return sum(subscription.offer(event) for subscription in subscriptions)
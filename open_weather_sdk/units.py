@@ -0,0 +1,77 @@
+import sys
+from dataclasses import replace
+
+UNITS = ("metric", "imperial", "standard")
+KELVIN_OFFSET = 273.15  # 0 °C in Kelvin
+MPH = 0.44704  # One mile per hour in meters per second
+
+
+def celsius_to_fahrenheit(celsius):
+    """
+    Converts temperatures from Celsius to Fahrenheit. Works on numbers and on numpy arrays and pandas columns.
+
+    :param celsius: The temperature in Celsius.
+    :return: The temperature in Fahrenheit.
+    """
+    return celsius * 9 / 5 + 32
+
+
+def meters_per_second_to_mph(meters_per_second):
+    """
+    Converts speeds from meters per second to miles per hour. Works on numbers and on numpy arrays and pandas
+    columns.
+
+    :param meters_per_second: The speed in meters per second.
+    :return: The speed in miles per hour.
+    """
+    return meters_per_second / MPH
+
+
+def convert_temperature(celsius: float, units: str) -> float:
+    """
+    Converts a temperature from Celsius to the units of the API.
+
+    :param celsius: The temperature in Celsius.
+    :param units: "metric" (Celsius), "imperial" (Fahrenheit) or "standard" (Kelvin).
+    :return: The converted temperature rounded to two decimals as in API responses.
+    """
+    if units == "imperial":
+        return round(celsius_to_fahrenheit(celsius), 2)
+    if units == "standard":
+        return round(celsius + KELVIN_OFFSET, 2)
+    return celsius
+
+
+def convert_speed(meters_per_second: float, units: str) -> float:
+    """
+    Converts a wind speed from meters per second to the units of the API.
+
+    :param meters_per_second: The speed in meters per second.
+    :param units: "metric" or "standard" (meters per second) or "imperial" (miles per hour).
+    :return: The converted speed rounded to two decimals as in API responses.
+    """
+    if units == "imperial":
+        return round(meters_per_second_to_mph(meters_per_second), 2)
+    return meters_per_second
+
+
+def convert(weather_data, units: str, description: str = None):
+    """
+    Derives the weather data in other units, and optionally with a translated description, from metric weather data.
+    Visibility stays in meters as in the API.
+
+    :param weather_data: A WeatherData or FrozenWeatherData instance in metric units.
+    :param units: "metric", "imperial" or "standard".
+    :param description: The weather description in the requested language (optional).
+    :return: A new instance of the same class, or weather_data itself if nothing changes.
+    """
+    if units not in UNITS:
+        raise ValueError(f"Unknown units {units!r}, expected one of {', '.join(UNITS)}")
+    changes = dict()
+    if units != "metric":
+        changes["temperature"] = convert_temperature(weather_data.temperature, units)
+        changes["temperature_feels_like"] = convert_temperature(weather_data.temperature_feels_like, units)
+        changes["wind_speed"] = convert_speed(weather_data.wind_speed, units)
+    if description is not None and description != weather_data.weather_description:
+        changes["weather_description"] = sys.intern(description)
+    return replace(weather_data, **changes) if changes else weather_data
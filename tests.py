@@ -1,10 +1,38 @@
+import asyncio
+import fnmatch
 import json
+import os
+import socketserver
+import tempfile
+import threading
 import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock
 from unittest.mock import patch
+from dataclasses import FrozenInstanceError, replace
 from datetime import datetime, timezone
+from benchmarks.mock_server import MockServer
+from open_weather_sdk import FrozenWeatherData, WeatherData, WeatherTable, analytics
+from open_weather_sdk.aliases import AliasIndex, normalize_query
+from open_weather_sdk.area import bounding_box, cluster_locations, match_stations
+from open_weather_sdk.async_sdk import AsyncOpenWeatherSDK
+from open_weather_sdk.breaker import CircuitBreaker
+from open_weather_sdk.backends import RedisCache, RespClient, SQLiteCache
+from open_weather_sdk.cache import LRUCache
+from open_weather_sdk.exeptions import CircuitOpenError, InvalidCity, RateLimitError, RequestError
+from open_weather_sdk.geocache import GeoCache
+from open_weather_sdk.metrics import Counter, Histogram, MetricsCollector
+from open_weather_sdk.pool import OpenWeatherSDKPool
+from open_weather_sdk.ratelimit import RateLimiter, parse_retry_after
+from open_weather_sdk.refresher import Refresher
 from open_weather_sdk.sdk import OpenWeatherSDK, get_time_difference
+from open_weather_sdk.session import SessionConfig, create_session, get_pool_stats
+from open_weather_sdk.singleflight import SingleFlight
+from open_weather_sdk.snapshot import HEADER, RECORD, read_snapshot, write_snapshot
+from open_weather_sdk.spatial import SpatialIndex, haversine
+from open_weather_sdk.stream import ChangeStream
+from open_weather_sdk.units import convert
 
 
 class TestOpenWeatherSDK(unittest.TestCase):
@@ -149,7 +177,7 @@ class TestOpenWeatherSDK(unittest.TestCase):
         diff = get_time_difference(time1, time2)
         self.assertEqual(diff, 1800)
 
-    @patch('open_weather_sdk.sdk.requests.get')
+    @patch('open_weather_sdk.sdk.requests.Session.get')
     def test_get_city_coordinates(self, mock_get):
         """
         Test getting the coordinates of a specific city using the SDK.
@@ -216,7 +244,7 @@ class TestOpenWeatherSDK(unittest.TestCase):
         city_coordinates = sdk.get_city_coordinates("Saint Petersburg")
         self.assertEqual((59.938732, 30.316229), city_coordinates)
 
-    @patch('open_weather_sdk.sdk.requests.get')
+    @patch('open_weather_sdk.sdk.requests.Session.get')
     @patch('open_weather_sdk.sdk.OpenWeatherSDK.get_city_coordinates')
     def test_get_weatherdata(self, mock_get_city_coordinates, mock_get):
         """
@@ -224,7 +252,7 @@ class TestOpenWeatherSDK(unittest.TestCase):
         """
         mock_get_city_coordinates.return_value = (59.938732, 30.316229)
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = {'coord': {'lon': 30.3162, 'lat': 59.9387}, 'weather': [
+        mock_get.return_value.content = json.dumps({'coord': {'lon': 30.3162, 'lat': 59.9387}, 'weather': [
             {'id': 500, 'main': 'Rain', 'description': 'light rain', 'icon': '10n'}], 'base': 'stations',
                                                    'main': {'temp': 6.58, 'feels_like': 3.31, 'temp_min': 5.23,
                                                             'temp_max': 7.33, 'pressure': 1007, 'humidity': 91},
@@ -234,7 +262,7 @@ class TestOpenWeatherSDK(unittest.TestCase):
                                                    'sys': {'type': 2, 'id': 197864, 'country': 'RU',
                                                            'sunrise': 1710476089, 'sunset': 1710518428},
                                                    'timezone': 10800, 'id': 519690, 'name': 'Novaya Gollandiya',
-                                                   'cod': 200}
+                                                   'cod': 200}).encode()
 
         sdk = OpenWeatherSDK(self.api_key)
         city_weatherdata = sdk.get_weatherdata("Saint Petersburg")
@@ -255,7 +283,7 @@ class TestOpenWeatherSDK(unittest.TestCase):
         self.assertIn("timezone", city_weatherdata)
         self.assertIn("name", city_weatherdata)
 
-    @patch('open_weather_sdk.sdk.requests.get')
+    @patch('open_weather_sdk.sdk.requests.Session.get')
     @patch('open_weather_sdk.sdk.OpenWeatherSDK.get_city_coordinates')
     def test_cache(self, mock_get_city_coordinates, mock_get: mock.Mock):
         """
@@ -269,7 +297,7 @@ class TestOpenWeatherSDK(unittest.TestCase):
             mock_get.reset_mock(return_value=True, side_effect=True)
             mock_get_city_coordinates.return_value = city_coords[city]
             mock_get.return_value.status_code = 200
-            mock_get.return_value.json.return_value = city_mocks[city]
+            mock_get.return_value.content = json.dumps(city_mocks[city]).encode()
 
             sdk.get_weatherdata(city)
             sdk.get_weatherdata(city)
@@ -279,13 +307,13 @@ class TestOpenWeatherSDK(unittest.TestCase):
 
         mock_get_city_coordinates.return_value = city_coords["Saint Petersburg"]
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = city_mocks["Saint Petersburg"]
+        mock_get.return_value.content = json.dumps(city_mocks["Saint Petersburg"]).encode()
 
         sdk.get_weatherdata("Saint Petersburg")
         sdk.get_weatherdata("Saint Petersburg")
         mock_get.assert_called_once()
 
-    @patch('open_weather_sdk.sdk.requests.get')
+    @patch('open_weather_sdk.sdk.requests.Session.get')
     @patch('open_weather_sdk.sdk.OpenWeatherSDK.get_city_coordinates')
     def test_pooling(self, mock_get_city_coordinates, mock_get: mock.Mock):
         """
@@ -296,7 +324,7 @@ class TestOpenWeatherSDK(unittest.TestCase):
 
         mock_get_city_coordinates.return_value = city_coords["London"]
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = city_mocks["London"]
+        mock_get.return_value.content = json.dumps(city_mocks["London"]).encode()
 
         sdk = OpenWeatherSDK(self.api_key, pooling=True)
         sdk.get_weatherdata("London")
@@ -306,12 +334,1614 @@ class TestOpenWeatherSDK(unittest.TestCase):
         mock_get.reset_mock(return_value=True, side_effect=True)
         mock_get_city_coordinates.return_value = city_coords["London"]
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = city_mocks["London"]
-        mock_get.return_value.json.return_value["dt"] = datetime.now(timezone.utc).timestamp()
+        data = dict(city_mocks["London"])
+        data["dt"] = datetime.now(timezone.utc).timestamp()
+        mock_get.return_value.content = json.dumps(data).encode()
         sdk.get_weatherdata("London")
         sdk.get_weatherdata("London")
         mock_get.assert_called_once()
 
 
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_get_weatherdata_many(self, mock_get: mock.Mock):
+        """
+        Test that a batch is deduplicated, returned in input order and reports errors per location.
+        """
+        coords_to_city = {coords: city for city, coords in self.city_coords.items()}
+
+        def fake_get(url, params=None, timeout=None):
+            response = mock.Mock()
+            response.status_code = 200
+            if "geo" in url:
+                coords = self.city_coords.get(params["q"])
+                response.json.return_value = [{"lat": coords[0], "lon": coords[1]}] if coords else []
+            else:
+                city = coords_to_city.get((params["lat"], params["lon"]), "London")
+                data = dict(self.city_mocks[city])
+                data["dt"] = datetime.now(timezone.utc).timestamp()
+                response.content = json.dumps(data).encode()
+            return response
+
+        mock_get.side_effect = fake_get
+        sdk = OpenWeatherSDK("batch-key")
+        results = sdk.get_weatherdata_many(["Paris", "Atlantis", (51.5, -0.12), "Paris", "Rome"])
+        self.assertEqual(5, len(results))
+        self.assertEqual(results[0], results[3])
+        self.assertEqual(13.66, json.loads(results[0])["temperature"]["temp"])
+        self.assertIsInstance(results[1], InvalidCity)
+        self.assertEqual("51.5,-0.12", json.loads(results[2])["name"])
+        self.assertEqual(13.79, json.loads(results[4])["temperature"]["temp"])
+        # Paris, Atlantis and Rome geocoding plus three weather requests
+        self.assertEqual(6, mock_get.call_count)
+
+        mock_get.reset_mock()
+        results = sdk.get_weatherdata_many(["Rome", "Paris"])
+        self.assertEqual(13.79, json.loads(results[0])["temperature"]["temp"])
+        mock_get.assert_not_called()
+
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    @patch('open_weather_sdk.sdk.OpenWeatherSDK.get_city_coordinates')
+    def test_get_weatherdata_object_and_bytes(self, mock_get_city_coordinates, mock_get: mock.Mock):
+        """
+        Test that cached weather data can be returned as an object or bytes without serializing again.
+        """
+        mock_get_city_coordinates.return_value = self.city_coords["Madrid"]
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(self.city_mocks["Madrid"]).encode()
+
+        sdk = OpenWeatherSDK("serialization-key")
+        weather_data = sdk.get_weatherdata_object("Madrid")
+        self.assertIsInstance(weather_data, WeatherData)
+        self.assertIs(weather_data, sdk.get_weatherdata_object("Madrid"))
+        self.assertIs(sdk.get_weatherdata_bytes("Madrid"), sdk.get_weatherdata_bytes("Madrid"))
+        self.assertEqual(json.loads(sdk.get_weatherdata("Madrid")), json.loads(sdk.get_weatherdata_bytes("Madrid")))
+        mock_get.assert_called_once()
+
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_stale_while_revalidate(self, mock_get: mock.Mock):
+        """
+        Test that stale data is returned immediately with one background refresh and that the maximum age blocks.
+        """
+        def slow_get(url, params=None, timeout=None):
+            time.sleep(0.2)
+            response = mock.Mock()
+            response.status_code = 200
+            if "geo" in url:
+                response.json.return_value = [{"lat": 55.7504461, "lon": 37.6174943}]
+            else:
+                response.content = json.dumps(self.city_mocks["Moscow"]).encode()
+            return response
+
+        mock_get.side_effect = slow_get
+        sdk = OpenWeatherSDK("swr-key", stale_while_revalidate=True, max_stale_age=60)
+        sdk.set_update_time(0.3)
+        first = sdk.get_weatherdata_object("Moscow")
+        self.assertEqual(2, mock_get.call_count)
+        time.sleep(0.35)
+
+        start = time.monotonic()
+        for _ in range(5):
+            self.assertIs(first, sdk.get_weatherdata_object("Moscow"))
+        self.assertLess(time.monotonic() - start, 0.1)
+        time.sleep(0.3)
+        self.assertEqual(3, mock_get.call_count)
+        self.assertIsNot(first, sdk.get_weatherdata_object("Moscow"))
+
+        time.sleep(0.4)
+        start = time.monotonic()
+        sdk.get_weatherdata("Moscow", max_age=0.4)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(4, mock_get.call_count)
+        stats = sdk.get_cache_stats()
+        self.assertEqual((6, 2), (stats["hits"], stats["misses"]))
+
+        sdk.close()  # Stale data is still returned, without a background refresh
+        time.sleep(0.35)
+        sdk.get_weatherdata("Moscow")
+        self.assertEqual(4, mock_get.call_count)
+
+
+class TestWeatherData(unittest.TestCase):
+    """
+    A set of unit tests for the compact WeatherData storages.
+    """
+
+    def make_records(self, cls=WeatherData):
+        records = []
+        for (city, data), (lat, lon) in zip(TestOpenWeatherSDK.city_mocks.items(),
+                                            TestOpenWeatherSDK.city_coords.values()):
+            data = json.loads(json.dumps(data))
+            data["dt"] = 1710525000
+            records.append(cls.from_response(data, lat, lon, city))
+        return records
+
+    def test_slots_and_interning(self):
+        """
+        Test that records have no __dict__ and share interned condition strings.
+        """
+        records = self.make_records()
+        self.assertFalse(hasattr(records[0], "__dict__"))
+        self.assertEqual("Clouds", records[0].weather_main)
+        self.assertIs(records[0].weather_main, records[1].weather_main)
+        records[0].temperature = 20
+        self.assertEqual(20, records[0].temperature)
+
+    def test_frozen(self):
+        """
+        Test that FrozenWeatherData is immutable, hashable and serialized like WeatherData.
+        """
+        frozen = self.make_records(FrozenWeatherData)[0]
+        with self.assertRaises(FrozenInstanceError):
+            frozen.temperature = 20
+        self.assertEqual(hash(frozen), hash(self.make_records(FrozenWeatherData)[0]))
+        self.assertEqual(self.make_records()[0].to_json(), frozen.to_json())
+
+    def test_memoized_json(self):
+        """
+        Test that the serialized JSON is memoized and encoded again when a field changes.
+        """
+        record = self.make_records()[0]
+        self.assertIs(record.to_json(), record.to_json())
+        self.assertIs(record.to_json_bytes(), record.to_json_bytes())
+        self.assertEqual(json.dumps(record.to_dict()), record.to_json())  # The format of json.dumps is kept
+        self.assertEqual(json.loads(record.to_json()), json.loads(record.to_json_bytes()))
+        record.temperature = 30.5
+        self.assertEqual(30.5, json.loads(record.to_json())["temperature"]["temp"])
+        self.assertEqual(30.5, json.loads(record.to_json_bytes())["temperature"]["temp"])
+        self.assertEqual(30.5, json.loads(replace(record, name="Other").to_json())["temperature"]["temp"])
+
+    def test_lazy_payload(self):
+        """
+        Test that records created from the response body hold the extra fields and keep the body on request.
+        """
+        raw = json.dumps(TestOpenWeatherSDK.city_mocks["New York"]).encode()
+        record = WeatherData.from_bytes(raw, 40.7127, -74.006, "New York")
+        self.assertEqual(WeatherData.from_response(json.loads(raw), 40.7127, -74.006, "New York"), record)
+        self.assertEqual((51, 1005, 16.46), (record.humidity, record.pressure, record.wind_gust))
+        self.assertIsNone(record.get_raw())
+        record = WeatherData.from_bytes(raw, 40.7127, -74.006, "New York", keep_raw=True)
+        self.assertIs(raw, record.get_raw())
+        self.assertEqual(json.loads(raw), record.get_payload())
+        self.assertEqual((51, 1005, 16.46), (record.humidity, record.pressure, record.wind_gust))
+        frozen = FrozenWeatherData.from_bytes(raw, 40.7127, -74.006, "New York")
+        self.assertEqual(51, frozen.humidity)
+
+        record = self.make_records()[0]
+        self.assertIsNone(record.get_payload())
+        self.assertIsNone(record.humidity)
+        self.assertIsNone(WeatherData.from_bytes(json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode(),
+                                                 51.5073, -0.1276, "London").wind_gust)
+
+    def test_weather_table(self):
+        """
+        Test that WeatherTable stores and restores observations column by column.
+        """
+        records = self.make_records()
+        table = WeatherTable(records)
+        self.assertEqual(len(records), len(table))
+        self.assertEqual(records, list(table))
+        self.assertEqual([record.temperature for record in records], list(table.column("temperature")))
+        self.assertEqual("d", table.column("temperature").typecode)
+        table.set(0, records[1])
+        self.assertEqual(records[1], table[0])
+        self.assertEqual(["Clouds", "Clouds"], table.column("weather_main")[:2])
+        self.assertGreater(table.nbytes(), 0)
+
+    @unittest.skipIf(analytics.numpy is None or analytics.pandas is None, "numpy and pandas are not installed")
+    def test_analytics_export(self):
+        """
+        Test the export to numpy and pandas, the filters and the conversion to imperial units.
+        """
+        records = self.make_records()
+        array = analytics.to_numpy(WeatherTable(records))
+        frame = analytics.to_dataframe(records)
+        self.assertEqual(analytics.FIELDS, array.dtype.names)
+        self.assertEqual(list(analytics.FIELDS), list(frame.columns))
+        self.assertEqual([record.temperature for record in records], array["temperature"].tolist())
+        self.assertEqual(max(record.temperature for record in records), frame["temperature"].max())
+        self.assertEqual("Clouds", array["weather_main"][0])
+
+        windy = [record.name for record in records if record.wind_speed >= 8]
+        self.assertEqual(windy, analytics.between(array, "wind_speed", low=8)["name"].tolist())
+        self.assertEqual(windy, analytics.between(frame, "wind_speed", low=8)["name"].tolist())
+        night = [record.name for record in records if not record.sunrise <= record.datetime < record.sunset]
+        self.assertEqual(night, analytics.after_sunset(array)["name"].tolist())
+        self.assertEqual(night, analytics.after_sunset(frame)["name"].tolist())
+
+        imperial = analytics.to_imperial(frame)
+        self.assertAlmostEqual(records[0].temperature * 1.8 + 32, imperial["temperature"][0])
+        self.assertAlmostEqual(records[0].wind_speed * 2.2369363, imperial["wind_speed"][0], 5)
+        self.assertEqual(records[0].temperature, frame["temperature"][0])
+        self.assertAlmostEqual(records[0].temperature * 1.8 + 32, analytics.to_imperial(array)["temperature"][0])
+
+
+class TestUnits(unittest.TestCase):
+    """
+    A set of unit tests for units and languages derived from the cached metric data.
+    """
+
+    def test_convert(self):
+        """
+        Test the conversion of metric weather data to imperial and standard units.
+        """
+        record = TestWeatherData().make_records()[0]
+        imperial = convert(record, "imperial")
+        self.assertEqual((53.83, 53.01, 10.36), (imperial.temperature, imperial.temperature_feels_like,
+                                                 imperial.wind_speed))
+        self.assertEqual(record.visibility, imperial.visibility)
+        self.assertEqual((285.28, 4.63), (convert(record, "standard").temperature, record.wind_speed))
+        self.assertIs(record, convert(record, "metric"))
+        self.assertEqual("nuageux", convert(record, "metric", "nuageux").weather_description)
+        with self.assertRaises(ValueError):
+            convert(record, "kelvin")
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_units_and_languages(self, mock_get: mock.Mock):
+        """
+        Test that all units share one cached observation and that a translation is requested once per condition.
+        """
+        def fake_get(url, params=None, timeout=None):
+            data = dict(TestOpenWeatherSDK.city_mocks["London"])
+            if params["lang"] == "de":
+                data["weather"] = [dict(data["weather"][0], description="Überwiegend bewölkt")]
+            response = mock.Mock()
+            response.status_code = 200
+            response.content = json.dumps(data).encode()
+            return response
+
+        mock_get.side_effect = fake_get
+        sdk = OpenWeatherSDK("units-key")
+        metric = json.loads(sdk.get_weatherdata("London", 51.5073, -0.1276))
+        imperial = json.loads(sdk.get_weatherdata("London", 51.5073, -0.1276, units="imperial"))
+        self.assertEqual(12.13, metric["temperature"]["temp"])
+        self.assertEqual(53.83, imperial["temperature"]["temp"])
+        self.assertIs(sdk.get_weatherdata_bytes("London", units="imperial"),
+                      sdk.get_weatherdata_bytes("London", units="imperial"))
+        mock_get.assert_called_once()
+
+        german = sdk.get_weatherdata_object("London", units="standard", lang="de")
+        self.assertEqual(("Überwiegend bewölkt", 285.28), (german.weather_description, german.temperature))
+        self.assertEqual(2, mock_get.call_count)
+        self.assertEqual("de", mock_get.call_args.kwargs["params"]["lang"])
+        results = sdk.get_weatherdata_many([(51.5, -0.12), "London"], lang="de")  # The same condition
+        self.assertEqual(["Überwiegend bewölkt"] * 2, [json.loads(r)["weather"]["description"] for r in results])
+        self.assertEqual(3, mock_get.call_count)
+        self.assertEqual("en", mock_get.call_args.kwargs["params"]["lang"])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    A set of unit tests for the circuit breaker states.
+    """
+
+    def test_states(self):
+        """
+        Test that the breaker opens after consecutive failures, lets one trial through and closes after it succeeds.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual("closed", breaker.get_state())
+        breaker.record_failure()
+        self.assertEqual("open", breaker.get_state())
+        self.assertFalse(breaker.allow())
+        self.assertGreater(breaker.get_retry_after(), 0)
+
+        time.sleep(0.1)
+        self.assertTrue(breaker.allow())
+        self.assertEqual("half_open", breaker.get_state())
+        self.assertFalse(breaker.allow())  # Only one trial request
+        breaker.record_failure()
+        self.assertEqual("open", breaker.get_state())
+
+        time.sleep(0.1)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual("closed", breaker.get_state())
+        self.assertTrue(breaker.allow())
+        self.assertEqual({"state": "closed", "failures": 4, "opened": 2, "rejected": 2}, breaker.get_stats())
+
+    def test_trial_released_when_rate_limited(self):
+        """
+        Test that a trial request rejected by the rate limiter does not keep the breaker half-open forever.
+        """
+        with MockServer() as server:
+            limiter = RateLimiter(blocking=False)
+            sdk = OpenWeatherSDK("breaker-limiter-key", base_url=server.url, rate_limiter=limiter,
+                                 breaker_threshold=1, breaker_reset_timeout=0.05)
+            server.error_rate = 1
+            with self.assertRaises(RequestError):
+                sdk.get_weatherdata("Lisbon", 38.72, -9.14)
+            server.error_rate = 0
+            time.sleep(0.1)
+            limiter.pause(0.1)
+            with self.assertRaises(RateLimitError):  # Takes the trial slot, then the limiter rejects the request
+                sdk.get_weatherdata("Lisbon", 38.72, -9.14)
+            self.assertEqual("half_open", sdk.get_failure_stats()["breakers"]["weather"]["state"])
+
+            time.sleep(0.15)
+            self.assertEqual("Lisbon", json.loads(sdk.get_weatherdata("Lisbon", 38.72, -9.14))["name"])
+            self.assertEqual("closed", sdk.get_failure_stats()["breakers"]["weather"]["state"])
+            sdk.close()
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    A set of unit tests for the LRU/TTL weather data cache.
+    """
+
+    def test_lru_eviction(self):
+        """
+        Test that hits refresh recency so the least recently used entry is evicted.
+        """
+        cache = LRUCache(capacity=2)
+        cache.set("London", 1)
+        cache.set("Paris", 2)
+        self.assertEqual(1, cache.get("London"))
+        cache.set("Rome", 3)
+        self.assertIsNone(cache.peek("Paris"))
+        self.assertEqual(1, cache.get("London"))
+        self.assertEqual(3, cache.get("Rome"))
+        self.assertEqual({"hits": 3, "misses": 0, "evictions": 1, "size": 2, "capacity": 2}, cache.get_stats())
+
+    def test_ttl(self):
+        """
+        Test that stale entries are misses but still available through peek.
+        """
+        cache = LRUCache(capacity=10, ttl=60)
+        cache.set("London", 1, time.time() - 120)
+        cache.set("Paris", 2, time.time() - 30)
+        self.assertIsNone(cache.get("London"))
+        self.assertEqual(1, cache.peek("London"))
+        self.assertEqual(2, cache.get("Paris"))
+        cache.set_ttl(10)
+        self.assertIsNone(cache.get("Paris"))
+        self.assertEqual(2, cache.get_stats()["misses"])
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    @patch('open_weather_sdk.sdk.OpenWeatherSDK.get_city_coordinates')
+    def test_sdk_cache_capacity(self, mock_get_city_coordinates, mock_get: mock.Mock):
+        """
+        Test that the SDK cache capacity is configurable and follows set_update_time.
+        """
+        mock_get_city_coordinates.return_value = TestOpenWeatherSDK.city_coords["London"]
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode()
+
+        sdk = OpenWeatherSDK("capacity-key", cache_capacity=1000)
+        for i in range(100):
+            sdk.get_weatherdata(f"City {i}")
+        for i in range(100):
+            sdk.get_weatherdata(f"City {i}")
+        self.assertEqual(100, mock_get.call_count)
+        self.assertEqual({"hits": 100, "misses": 100, "evictions": 0, "size": 100, "capacity": 1000},
+                         sdk.get_cache_stats())
+        sdk.set_update_time(300)
+        self.assertEqual(300, sdk.get_cache().get_ttl())
+
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    @patch('open_weather_sdk.sdk.OpenWeatherSDK.get_city_coordinates')
+    def test_freshness_from_fetch_time(self, mock_get_city_coordinates, mock_get: mock.Mock):
+        """
+        Test that an observation that is already old when fetched is still cached for the update time.
+        """
+        data = dict(TestOpenWeatherSDK.city_mocks["Toronto"])
+        data["dt"] = int(time.time()) - 2 * 60 * 60
+        mock_get_city_coordinates.return_value = TestOpenWeatherSDK.city_coords["Toronto"]
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(data).encode()
+
+        sdk = OpenWeatherSDK("freshness-key")
+        sdk.get_weatherdata("Toronto")
+        sdk.get_weatherdata("Toronto")
+        mock_get.assert_called_once()
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    A set of unit tests for concurrent request coalescing.
+    """
+
+    def run_concurrently(self, function, count=20):
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def worker(index):
+            barrier.wait()
+            try:
+                results[index] = function()
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_same_result_and_exception(self):
+        """
+        Test that concurrent callers share one call and its result or exception.
+        """
+        single_flight = SingleFlight()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            time.sleep(0.1)
+            if value == "error":
+                raise InvalidCity("Atlantis")
+            return value
+
+        results = self.run_concurrently(lambda: single_flight.do("London", slow, "London"))
+        self.assertEqual(["London"] * 20, results)
+        results = self.run_concurrently(lambda: single_flight.do("Atlantis", slow, "error"))
+        self.assertTrue(all(isinstance(result, InvalidCity) for result in results))
+        self.assertEqual(["London", "error"], calls)
+        self.assertEqual(0, single_flight.in_flight())
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_coalesces_misses(self, mock_get: mock.Mock):
+        """
+        Test that concurrent misses on the same city send one geocoding and one weather request.
+        """
+        def slow_get(url, params=None, timeout=None):
+            time.sleep(0.1)
+            response = mock.Mock()
+            response.status_code = 200
+            if "geo" in url:
+                response.json.return_value = [{"lat": 51.5073219, "lon": -0.1276474}]
+            else:
+                response.content = json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode()
+            return response
+
+        mock_get.side_effect = slow_get
+        sdk = OpenWeatherSDK("single-flight-key")
+        results = self.run_concurrently(lambda: sdk.get_weatherdata("London"))
+        self.assertEqual(1, len(set(results)))
+        self.assertEqual(2, mock_get.call_count)
+
+
+class TestRefresher(unittest.TestCase):
+    """
+    A set of unit tests for the scheduled background refresher.
+    """
+
+    def test_refresh_when_due(self):
+        """
+        Test that keys are refreshed in due order, rescheduled and dropped when the refresh returns False.
+        """
+        calls = []
+
+        def refresh(key):
+            calls.append(key)
+            return key != "Paris"
+
+        refresher = Refresher(refresh, interval=0.05, max_workers=2, jitter=0.2)
+        refresher.schedule("London", 0.01)
+        refresher.schedule("Paris", 0.02)
+        refresher.start()
+        time.sleep(0.3)
+        refresher.stop()
+        self.assertEqual(["London", "Paris"], calls[:2])
+        self.assertEqual(1, calls.count("Paris"))
+        self.assertGreater(calls.count("London"), 2)
+        self.assertEqual(1, len(refresher))
+
+        count = len(calls)
+        time.sleep(0.1)
+        self.assertEqual(count, len(calls))
+        self.assertFalse(refresher.is_running())
+
+    def test_jitter_only_earlier(self):
+        """
+        Test that the jitter never delays a refresh beyond the interval.
+        """
+        times = []
+        refresher = Refresher(lambda key: times.append(time.monotonic()) or True, interval=0.05, jitter=0.5)
+        refresher.start()
+        start = time.monotonic()
+        refresher.schedule("London")
+        time.sleep(0.3)
+        refresher.stop()
+        gaps = [later - earlier for earlier, later in zip([start] + times, times)]
+        self.assertGreater(len(gaps), 5)
+        self.assertTrue(all(0.02 <= gap <= 0.05 + 0.015 for gap in gaps), gaps)
+
+    def test_bounded_workers(self):
+        """
+        Test that no more than max_workers keys are refreshed at the same time.
+        """
+        lock = threading.Lock()
+        state = {"in_flight": 0, "max_in_flight": 0, "calls": 0}
+
+        def refresh(key):
+            with lock:
+                state["calls"] += 1
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            time.sleep(0.02)
+            with lock:
+                state["in_flight"] -= 1
+            return False
+
+        refresher = Refresher(refresh, interval=60, max_workers=3)
+        for i in range(30):
+            refresher.schedule(f"City {i}", 0)
+        refresher.start()
+        time.sleep(0.5)
+        refresher.stop()
+        self.assertEqual(30, state["calls"])
+        self.assertEqual(3, state["max_in_flight"])
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    @patch('open_weather_sdk.sdk.OpenWeatherSDK.get_city_coordinates')
+    def test_sdk_polling(self, mock_get_city_coordinates, mock_get: mock.Mock):
+        """
+        Test that polling mode refreshes cached cities in the background and can be stopped.
+        """
+        mock_get_city_coordinates.return_value = TestOpenWeatherSDK.city_coords["London"]
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode()
+
+        sdk = OpenWeatherSDK("polling-key", polling=True)
+        sdk.set_update_time(0.05)
+        sdk.get_weatherdata("London")
+        time.sleep(0.3)
+        sdk.stop_polling()
+        self.assertFalse(sdk.is_polling())
+        count = mock_get.call_count
+        self.assertGreater(count, 2)
+        time.sleep(0.1)
+        self.assertEqual(count, mock_get.call_count)
+
+
+class TestChangeStream(unittest.TestCase):
+    """
+    A set of unit tests for subscriptions to weather data changes.
+    """
+
+    def setUp(self):
+        records = TestWeatherData().make_records()
+        self.london, self.paris = records[0], records[2]
+
+    def test_diff_and_filters(self):
+        """
+        Test that only actual changes matching the filters are emitted, with a field-level diff.
+        """
+        stream = ChangeStream()
+        everything = stream.subscribe()
+        warm = stream.subscribe(keys=["London"], fields=["temperature"], thresholds={"temperature": 1},
+                                condition=lambda weather_data: weather_data.temperature > 12.2)
+        hot = replace(self.london, temperature=14)
+        mild = replace(self.london, temperature=12.5)
+        self.assertEqual(0, stream.publish("London", self.london, replace(self.london)))
+        self.assertEqual(2, stream.publish("London", self.london, hot))
+        self.assertEqual(1, stream.publish("Paris", self.paris, replace(self.paris, visibility=5000)))
+        event = warm.get(timeout=0)
+        self.assertEqual(("London", {"temperature": (12.13, 14)}), (event.key, event.changes))
+        self.assertIsNone(warm.get(timeout=0))
+
+        self.assertEqual(2, stream.publish("London", hot, mild))
+        # The pending changes are merged: back to 12.13 for everything and below the condition for warm
+        self.assertEqual(0, stream.publish("London", mild, self.london))
+        event = everything.get(timeout=0)
+        self.assertEqual(("Paris", {"visibility": (10000, 5000)}), (event.key, event.changes))
+        self.assertIsNone(everything.get(timeout=0))
+        self.assertEqual({"delivered": 1, "merged": 2, "dropped": 1, "pending": 0}, everything.get_stats())
+        event = warm.get(timeout=0)  # The change that passed the condition is kept
+        self.assertEqual({"temperature": (14, 12.5)}, event.changes)
+        self.assertEqual({"delivered": 2, "merged": 0, "dropped": 0, "pending": 0}, warm.get_stats())
+        everything.close()
+        warm.close()
+        self.assertFalse(stream.has_subscribers())
+        self.assertEqual([], list(everything))
+
+    def test_backpressure(self):
+        """
+        Test that a full subscription drops the oldest event or blocks the publisher until there is room.
+        """
+        stream = ChangeStream()
+        dropping = stream.subscribe(maxsize=2)
+        for i in range(4):
+            stream.publish(f"City {i}", None, self.london)
+        self.assertEqual(["City 2", "City 3"], [dropping.get(timeout=0).key for _ in range(2)])
+        self.assertEqual(2, dropping.get_stats()["dropped"])
+        dropping.close()
+
+        blocking = stream.subscribe(maxsize=1, overflow="block", block_timeout=1)
+        stream.publish("City 0", None, self.london)
+        threading.Timer(0.1, blocking.get).start()
+        start = time.monotonic()
+        stream.publish("City 1", None, self.london)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual("City 1", blocking.get(timeout=0).key)
+        self.assertEqual(0, blocking.get_stats()["dropped"])
+        blocking.close()
+
+    def test_async_iterator(self):
+        """
+        Test that a subscription can be consumed with async for while another thread publishes.
+        """
+        stream = ChangeStream()
+        subscription = stream.subscribe()
+
+        def publish():
+            for i in range(3):
+                time.sleep(0.02)
+                stream.publish(f"City {i}", None, self.london)
+            subscription.close()
+
+        async def consume():
+            threading.Thread(target=publish).start()
+            return [event.key async for event in subscription]
+
+        self.assertEqual(["City 0", "City 1", "City 2"], asyncio.run(consume()))
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_polling_stream(self, mock_get: mock.Mock):
+        """
+        Test that background refreshes in polling mode emit an event only when the weather data changes.
+        """
+        temperatures = iter([12.13, 12.13, 13.5] + [13.5] * 100)
+
+        def fake_get(url, params=None, timeout=None):
+            data = dict(TestOpenWeatherSDK.city_mocks["London"])
+            data["main"] = dict(data["main"], temp=next(temperatures))
+            response = mock.Mock()
+            response.status_code = 200
+            response.content = json.dumps(data).encode()
+            return response
+
+        mock_get.side_effect = fake_get
+        sdk = OpenWeatherSDK("stream-key", polling=True)
+        sdk.set_update_time(0.05)
+        subscription = sdk.subscribe(keys=["London"])
+        sdk.get_weatherdata("London", 51.5073, -0.1276)
+        self.assertIsNone(subscription.get(timeout=0).previous)
+        event = subscription.get(timeout=2)
+        self.assertEqual({"temperature": (12.13, 13.5)}, event.changes)
+        self.assertIsNone(subscription.get(timeout=0.2))  # Later refreshes return the same data
+        self.assertGreater(mock_get.call_count, 3)
+        sdk.close()
+        self.assertTrue(subscription.is_closed())
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    A set of unit tests for the client-side rate limiter.
+    """
+
+    def test_blocking(self):
+        """
+        Test that requests over the budget wait for a token and the wait is recorded.
+        """
+        limiter = RateLimiter(per_minute=600, burst=1)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+        stats = limiter.get_stats()
+        self.assertEqual(3, stats["requests"])
+        self.assertEqual(2, stats["throttled"])
+        self.assertGreater(stats["wait_time"], 0.15)
+
+    def test_fail_fast(self):
+        """
+        Test that a non-blocking limiter raises RateLimitError instead of waiting.
+        """
+        limiter = RateLimiter(per_minute=60, per_day=1000, blocking=False, burst=1)
+        limiter.acquire()
+        with self.assertRaises(RateLimitError):
+            limiter.acquire()
+        limiter = RateLimiter(per_minute=60, burst=1, max_wait=0.1)
+        limiter.acquire()
+        with self.assertRaises(RateLimitError):
+            limiter.acquire()
+        self.assertEqual(1, limiter.get_stats()["rejected"])
+
+    def test_parse_retry_after(self):
+        """
+        Test parsing Retry-After given in seconds, as an HTTP date or missing.
+        """
+        self.assertEqual(30, parse_retry_after("30"))
+        self.assertEqual(0, parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"))
+        self.assertEqual(1, parse_retry_after(None))
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_retries_429(self, mock_get: mock.Mock):
+        """
+        Test that a 429 response pauses requests for Retry-After and the request is retried.
+        """
+        too_many = mock.Mock(status_code=429, headers={"Retry-After": "0.1"}, text="Too many requests")
+        ok = mock.Mock(status_code=200)
+        ok.json.return_value = [{"lat": 41.8933203, "lon": 12.4829321}]
+        mock_get.side_effect = [too_many, ok]
+
+        sdk = OpenWeatherSDK("rate-limit-key")
+        start = time.monotonic()
+        self.assertEqual((41.8933203, 12.4829321), sdk.get_city_coordinates("Rome"))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        stats = sdk.get_rate_limit_stats()
+        self.assertEqual(1, stats["responses_429"])
+        self.assertEqual(2, stats["requests"])
+
+        mock_get.side_effect = [too_many] * 4
+        with self.assertRaises(RateLimitError):
+            OpenWeatherSDK("rate-limit-key-2", max_429_retries=3, rate_limiter=RateLimiter()).get_city_coordinates(
+                "Paris")
+
+
+class TestGeoCache(unittest.TestCase):
+    """
+    A set of unit tests for the persistent coordinates cache.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "geo.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persistence(self):
+        """
+        Test that coordinates survive reopening the database and are keyed by the normalized name.
+        """
+        geocache = GeoCache(self.path)
+        geocache.set("New York", 40.7127281, -74.0060152)
+        geocache.close()
+
+        geocache = GeoCache(self.path)
+        self.assertEqual((40.7127281, -74.0060152), geocache.get("  new   YORK "))
+        self.assertIsNone(geocache.get("Boston"))
+        self.assertEqual(1, len(geocache))
+        geocache.close()
+
+    def test_load(self):
+        """
+        Test preloading coordinates from CSV and JSON bulk files.
+        """
+        csv_path = os.path.join(self.directory.name, "cities.csv")
+        with open(csv_path, "w", encoding="utf-8") as file:
+            file.write("name,lat,lon\nLondon,51.5073219,-0.1276474\nRome,41.8933203,12.4829321\n")
+        json_path = os.path.join(self.directory.name, "cities.json")
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump({"Madrid": [40.4167047, -3.7035825]}, file)
+
+        geocache = GeoCache(self.path)
+        self.assertEqual(2, geocache.load(csv_path))
+        self.assertEqual(1, geocache.load(json_path))
+        self.assertEqual((41.8933203, 12.4829321), geocache.get("Rome"))
+        self.assertIn("madrid", geocache)
+        geocache.close()
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_uses_geocache(self, mock_get: mock.Mock):
+        """
+        Test that the SDK resolves preloaded cities without geocoding requests and stores new ones.
+        """
+        geocache = GeoCache(self.path)
+        geocache.set("London", 51.5073219, -0.1276474)
+        sdk = OpenWeatherSDK("geocache-key", geocache=geocache)
+        self.assertEqual((51.5073219, -0.1276474), sdk.get_city_coordinates("London"))
+        mock_get.assert_not_called()
+
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = [{"lat": 48.8588897, "lon": 2.3200410217200766}]
+        sdk.get_city_coordinates("Paris")
+        sdk.get_city_coordinates("Paris")
+        mock_get.assert_called_once()
+        reopened = GeoCache(self.path)
+        self.assertEqual((48.8588897, 2.3200410217200766), reopened.get("Paris"))
+        reopened.close()
+
+
+class TestAliasIndex(unittest.TestCase):
+    """
+    A set of unit tests for canonical location keys.
+    """
+
+    def test_aliases(self):
+        """
+        Test that names, qualified names and nearby coordinates map onto one location ID.
+        """
+        self.assertEqual("london,gb", normalize_query(" London ,  GB"))
+        index = AliasIndex()
+        location_id = index.add_geocoding("london ", {"name": "London", "lat": 51.5073219, "lon": -0.1276474,
+                                                      "country": "GB", "state": "England"})
+        self.assertEqual("51.507,-0.128", location_id)
+        for query in ("London", "LONDON", "London, GB", "london,england", "London,England,GB"):
+            self.assertEqual(location_id, index.resolve(query))
+        self.assertEqual(location_id, index.location_id(51.5071, -0.1279))
+        self.assertIsNone(index.resolve("London,CA"))
+        self.assertEqual(("London", (51.5073219, -0.1276474)), (index.get_name(location_id),
+                                                                 index.get_coordinates(location_id)))
+        self.assertEqual("0.000,0.000", index.location_id(-0.0001, 0.0001))
+        self.assertEqual(location_id, index.add("Londres", 51.5074, -0.1278))
+        self.assertEqual("London", index.get_name(location_id))
+        self.assertEqual(5, len(index))
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_canonical_keys(self, mock_get: mock.Mock):
+        """
+        Test that equivalent queries share one geocoding request and one cache entry.
+        """
+        def fake_get(url, params=None, timeout=None):
+            response = mock.Mock()
+            response.status_code = 200
+            if "geo" in url:
+                response.json.return_value = [{"name": "London", "lat": 51.5073219, "lon": -0.1276474,
+                                               "country": "GB"}]
+            else:
+                response.content = json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode()
+            return response
+
+        mock_get.side_effect = fake_get
+        sdk = OpenWeatherSDK("canonical-key", canonical_keys=True)
+        results = [sdk.get_weatherdata("London"), sdk.get_weatherdata("london "), sdk.get_weatherdata("London,GB"),
+                   sdk.get_weatherdata("Somewhere", 51.5074, -0.1278)]
+        self.assertEqual(1, len(set(results)))
+        self.assertEqual("London", json.loads(results[0])["name"])
+        results = sdk.get_weatherdata_many(["LONDON", (51.5072, -0.1276)])
+        self.assertEqual([results[0]] * 2, results)
+        self.assertEqual(2, mock_get.call_count)
+        self.assertEqual(["51.507,-0.128"], [key for key, _ in sdk.get_cache().items()])
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """
+    A set of unit tests for the spatial index of cached coordinates.
+    """
+
+    def test_within_and_nearest(self):
+        """
+        Test radius and nearest-neighbour queries, including across the antimeridian.
+        """
+        index = SpatialIndex()
+        for city, (lat, lon) in TestOpenWeatherSDK.city_coords.items():
+            index.add(city, lat, lon)
+        index.add("Suva", -18.1416, 178.4419)
+        index.add("Apia", -13.8333, -171.7667)
+
+        self.assertAlmostEqual(342_000, haversine(51.5073219, -0.1276474, 48.8588897, 2.3200410217200766), -3)
+        self.assertEqual([], index.within(51.51, -0.12, 500))
+        self.assertEqual(["London"], [key for _, key in index.within(51.51, -0.12, 2000)])
+        self.assertEqual(["London", "Paris"], [key for _, key in index.nearest(51.51, -0.12, 2)])
+        self.assertEqual(["Suva", "Apia"], [key for _, key in index.nearest(-17, 179.9, 2)])
+        self.assertEqual(len(index), len(index.nearest(0, 0, 100)))
+
+        index.add("London", 48.86, 2.33)  # Moving a key replaces its previous position
+        index.remove("Paris")
+        self.assertEqual([], index.within(51.51, -0.12, 2000))
+        self.assertEqual(["London"], [key for _, key in index.nearest(48.85, 2.35, 1)])
+        self.assertNotIn("Paris", index)
+
+        for i in range(200):  # Keys removed elsewhere are pruned once the index doubled
+            index.add(i, i / 100, 0)
+            if index.needs_pruning():
+                index.prune(lambda key: not isinstance(key, int) or key >= i - 9)
+        self.assertLess(len(index), 128)
+        self.assertIn("London", index)
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_reuses_nearby_data(self, mock_get: mock.Mock):
+        """
+        Test that lookups by coordinates reuse fresh data cached within the radius.
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode()
+
+        sdk = OpenWeatherSDK("spatial-key", reuse_radius=500)
+        sdk.get_weatherdata("51.5073,-0.1276", 51.5073, -0.1276)
+        nearby = sdk.get_weatherdata("51.5090,-0.1280", 51.5090, -0.1280)  # About 200 m away
+        self.assertEqual("51.5073,-0.1276", json.loads(nearby)["name"])
+        mock_get.assert_called_once()
+        sdk.get_weatherdata("51.5200,-0.1276", 51.52, -0.1276)  # About 1.4 km away
+        self.assertEqual(2, mock_get.call_count)
+
+        weather_data, distance = sdk.nearest(51.5090, -0.1280)[0]
+        self.assertEqual("51.5073,-0.1276", weather_data.name)
+        self.assertAlmostEqual(191, distance, 0)
+        self.assertEqual(2, len(sdk.nearest(51.5090, -0.1280, 5)))
+
+        time.sleep(0.15)  # The maximum age of the call applies to nearby data as well
+        sdk.get_weatherdata("51.5090,-0.1280", 51.5090, -0.1280, max_age=0.1)
+        self.assertEqual(3, mock_get.call_count)
+
+        sdk.set_update_time(0)  # Stale data is not reused
+        sdk.get_weatherdata("51.5090,-0.1280", 51.5090, -0.1280)
+        self.assertEqual(4, mock_get.call_count)
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    A set of unit tests for cache snapshots.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """
+        Test that records and fetch times survive a snapshot and that strings are stored once.
+        """
+        records = TestWeatherData().make_records()
+        entries = [(record.name, record, 1710525000.5 + index) for index, record in enumerate(records)]
+        self.assertEqual(len(entries), write_snapshot(self.path, entries))
+        self.assertEqual(entries, list(read_snapshot(self.path)))
+        self.assertLess(os.path.getsize(self.path), len(entries) * 160)
+
+        with open(self.path, "rb") as file:
+            data = file.read()
+        for corrupt in (b"not a snapshot", data[:-3], data[:HEADER.size + RECORD.size]):
+            with open(self.path, "wb") as file:
+                file.write(corrupt)
+            with self.assertRaises(ValueError):
+                next(read_snapshot(self.path))
+
+        write_snapshot(self.path, entries[:1])
+        self.assertEqual(["cache.snapshot"], os.listdir(self.directory.name))  # No temporary file is left
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_warm_start(self, mock_get: mock.Mock):
+        """
+        Test that a new instance starts with the saved cache and that entries keep their original expiry.
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode()
+        sdk = OpenWeatherSDK("snapshot-key", snapshot_path=self.path)
+        sdk.get_weatherdata("51.5073,-0.1276", 51.5073, -0.1276)
+        sdk.close()
+        london = sdk.get_cache().peek("51.5073,-0.1276")
+        write_snapshot(self.path, list(read_snapshot(self.path)) + [("Stale", london, time.time() - 700)])
+
+        mock_get.reset_mock()
+        restarted = OpenWeatherSDK("snapshot-key-2", snapshot_path=self.path, snapshot_interval=0.05)
+        self.assertEqual(london.to_json(), restarted.get_weatherdata("51.5073,-0.1276", 51.5073, -0.1276))
+        mock_get.assert_not_called()
+        self.assertIsNone(restarted.get_cache().get("Stale"))
+        self.assertAlmostEqual(700, restarted.get_cache().get_with_age("Stale")[1], 0)
+
+        os.remove(self.path)
+        time.sleep(0.2)
+        self.assertEqual(2, len(list(read_snapshot(self.path))))  # Saved periodically
+        restarted.close()
+
+        with self.assertRaises(ValueError):  # Nothing is written without a path
+            OpenWeatherSDK("snapshot-key-3").save_snapshot()
+        self.assertFalse(os.path.exists("None.tmp"))
+
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 3)
+        with self.assertLogs("open_weather_sdk.sdk", "WARNING"):  # A corrupt snapshot starts a cold cache
+            cold = OpenWeatherSDK("snapshot-key-4", snapshot_path=self.path)
+        self.assertEqual(0, len(cold.get_cache()))
+        cold.close()
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """
+    A local stand-in for a Redis server implementing the commands used by RedisCache.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    class Handler(socketserver.StreamRequestHandler):
+        def read_command(self):
+            line = self.rfile.readline()
+            if not line:
+                return None
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            return args
+
+        def reply(self, value):
+            if value is None:
+                return b"$-1\r\n"
+            if isinstance(value, int):
+                return b":%d\r\n" % value
+            if isinstance(value, list):
+                return b"*%d\r\n" % len(value) + b"".join(self.reply(item) for item in value)
+            if value == "OK":
+                return b"+OK\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+
+        def handle(self):
+            while True:
+                args = self.read_command()
+                if args is None:
+                    return
+                self.wfile.write(self.reply(self.server.execute(args[0].decode().upper(), args[1:])))
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), self.Handler)
+        self.data = {}  # key -> (value, expiry)
+        self.lock = threading.Lock()
+
+    def lookup(self, key):
+        value, expiry = self.data.get(key, (None, None))
+        if expiry is not None and expiry <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command, args):
+        with self.lock:
+            if command == "GET":
+                return self.lookup(args[0])
+            if command == "MGET":
+                return [self.lookup(key) for key in args]
+            if command == "SET":
+                options = [arg.upper() for arg in args[2:]]
+                exists = self.lookup(args[0]) is not None
+                if b"NX" in options and exists or b"XX" in options and not exists:
+                    return None
+                expiry = None
+                if b"PX" in options:
+                    expiry = time.time() + int(args[2 + options.index(b"PX") + 1]) / 1000
+                self.data[args[0]] = (args[1], expiry)
+                return "OK"
+            if command == "PEXPIRE":
+                if self.lookup(args[0]) is None:
+                    return 0
+                self.data[args[0]] = (self.data[args[0]][0], time.time() + int(args[1]) / 1000)
+                return 1
+            if command == "DEL":
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if command == "EVAL":  # Only the compare-and-set scripts of RedisCache, run under the lock
+                script, keys = args[0], args[2:2 + int(args[1])]
+                argv = args[2 + int(args[1]):]
+                if self.lookup(keys[0]) != argv[0]:
+                    return 0
+                if b"PEXPIRE" in script:
+                    self.data[keys[0]] = (argv[0], time.time() + int(argv[1]) / 1000)
+                    return 1
+                return int(self.data.pop(keys[0], None) is not None)
+            if command == "SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode()
+                keys = [key for key in list(self.data) if fnmatch.fnmatchcase(key.decode(), pattern)
+                        and self.lookup(key) is not None]
+                return [b"0", keys]
+            raise ValueError(command)
+
+
+class TestSharedCache(unittest.TestCase):
+    """
+    A set of unit tests for the caches shared between processes.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+        self.server = RespStandIn()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.records = TestWeatherData().make_records()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def make_caches(self):
+        """
+        Returns pairs of cache instances that share their data like two processes would.
+        """
+        port = self.server.server_address[1]
+        return [
+            (SQLiteCache(self.path, ttl=60), SQLiteCache(self.path, ttl=60)),
+            (RedisCache(RespClient(port=port), ttl=60), RedisCache(RespClient(port=port), ttl=60)),
+        ]
+
+    def test_shared_entries(self):
+        """
+        Test that entries written by one process are read by another, with the TTL applied on read.
+        """
+        for first, second in self.make_caches():
+            with self.subTest(cache=type(first).__name__):
+                first.set("London", self.records[0])
+                first.set("Paris", self.records[2], time.time() - 120)
+                self.assertEqual(self.records[0], second.get("London"))
+                self.assertIsNone(second.get("Paris"))
+                self.assertEqual(self.records[2], second.peek("Paris"))
+                self.assertEqual({"London", "Paris"}, {key for key, _ in second.items()})
+                second.delete("London")
+                self.assertIsNone(first.peek("London"))
+                self.assertEqual({"hits": 1, "misses": 1}, {key: second.get_stats()[key] for key in ("hits", "misses")})
+
+    def test_decoded_values(self):
+        """
+        Test that reads reuse the decoded instance until another process stores new data, and keep the extra fields.
+        """
+        for first, second in self.make_caches():
+            with self.subTest(cache=type(first).__name__):
+                london = replace(self.records[0])
+                london.set_extras(87, 1006, None)
+                first.set("London", london)
+                self.assertIs(london, first.get("London"))
+                decoded = second.get("London")
+                self.assertEqual((london, (87, 1006, None)), (decoded, decoded.get_extras()))
+                self.assertIs(decoded, second.peek("London"))
+                self.assertIs(decoded, second.get_with_age("London")[0])
+                first.set("London", replace(london, temperature=15))
+                self.assertEqual(15, second.get("London").temperature)
+
+    def test_leader_election(self):
+        """
+        Test that only one process holds the polling leadership until it releases it or the lease expires.
+        """
+        for first, second in self.make_caches():
+            with self.subTest(cache=type(first).__name__):
+                self.assertTrue(first.try_acquire_leadership("first", 60))
+                self.assertTrue(first.try_acquire_leadership("first", 60))
+                self.assertFalse(second.try_acquire_leadership("second", 60))
+                first.release_leadership("first")
+                self.assertTrue(second.try_acquire_leadership("second", 0.05))
+                self.assertFalse(first.try_acquire_leadership("first", 60))
+                time.sleep(0.1)
+                self.assertTrue(first.try_acquire_leadership("first", 60))
+                second.release_leadership("second")  # An expired lease does not let its owner release the new one
+                self.assertFalse(second.try_acquire_leadership("second", 60))
+                first.release_leadership("first")
+
+    def test_sqlite_capacity(self):
+        """
+        Test that the least recently used entries above the capacity are pruned.
+        """
+        cache = SQLiteCache(self.path, capacity=100)
+        for i in range(150):
+            cache.set(f"City {i}", self.records[i % len(self.records)])
+        self.assertEqual(100, cache.get_stats()["size"])
+        self.assertIsNone(cache.peek("City 0"))
+        self.assertIsNotNone(cache.peek("City 149"))
+        cache.close()
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_sdk_single_poller(self, mock_get: mock.Mock):
+        """
+        Test that processes sharing a cache reuse each other's data and only the leader polls.
+        """
+        def fake_get(url, params=None, timeout=None):
+            response = mock.Mock()
+            response.status_code = 200
+            if "geo" in url:
+                response.json.return_value = [{"lat": 51.5073219, "lon": -0.1276474}]
+            else:
+                response.content = json.dumps(TestOpenWeatherSDK.city_mocks["London"]).encode()
+            return response
+
+        mock_get.side_effect = fake_get
+        workers = [OpenWeatherSDK(f"shared-{i}", cache=SQLiteCache(self.path), polling=True) for i in range(3)]
+        for worker in workers:
+            worker.set_update_time(0.1)
+        workers[0].get_weatherdata("London")
+        workers[1].get_weatherdata("London")
+        workers[2].get_weatherdata("London")
+        self.assertEqual(2, mock_get.call_count)
+
+        time.sleep(0.5)
+        for worker in workers:
+            worker.stop_polling()
+        pollers = {call.kwargs["params"]["appid"] for call in mock_get.call_args_list[2:]}
+        self.assertGreater(mock_get.call_count, 3)
+        self.assertEqual(1, len(pollers))
+
+
+class TestSDKPool(unittest.TestCase):
+    """
+    A set of unit tests for spreading requests over several API keys.
+    """
+
+    @staticmethod
+    def fake_get(url, params=None, timeout=None):
+        response = mock.Mock()
+        response.headers = {"Retry-After": "0"}
+        response.status_code = {"pool-unauthorized": 401, "pool-limited": 429}.get(params["appid"], 200)
+        if "geo" in url:
+            response.json.return_value = [{"lat": 48.8588897, "lon": 2.3200410217200766}]
+        else:
+            response.json.return_value = {"cod": response.status_code, "message": "error"}
+            response.content = json.dumps(TestOpenWeatherSDK.city_mocks["Paris"]).encode()
+        return response
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_routing(self, mock_get: mock.Mock):
+        """
+        Test that locations are spread over the keys consistently and that the keys share one cache.
+        """
+        mock_get.side_effect = self.fake_get
+        pool = OpenWeatherSDKPool(["pool-1", "pool-2", "pool-3"], cache_capacity=1000)
+        cities = [f"City {i}" for i in range(60)]
+        for city in cities:
+            pool.get_weatherdata(city)
+        self.assertEqual(120, mock_get.call_count)
+        stats = pool.get_key_stats()
+        self.assertEqual(60, sum(key["routed"] for key in stats.values()))
+        self.assertTrue(all(key["routed"] > 5 and key["state"] == "active" for key in stats.values()))
+        self.assertEqual(120, sum(key["requests"] for key in stats.values()))
+        for apikey in stats:
+            self.assertIs(pool.get_cache(), pool.get_member(apikey).get_cache())
+
+        results = pool.get_weatherdata_many(cities + [(48.85, 2.35)])
+        self.assertEqual(pool.get_weatherdata("City 0"), results[0])
+        self.assertEqual("48.85,2.35", json.loads(results[-1])["name"])
+        self.assertEqual(121, mock_get.call_count)
+        self.assertEqual(61, pool.get_cache_stats()["size"])
+        pool.close()
+
+        pool = OpenWeatherSDKPool(["pool-1", "pool-2"])  # The keys of a closed pool can be pooled again
+        self.assertEqual(0, pool.get_cache_stats()["size"])
+        self.assertIs(pool.get_cache(), pool.get_member("pool-1").get_cache())
+        pool.close()
+
+        taken = OpenWeatherSDK("pool-taken")
+        with self.assertRaises(ValueError):  # The key with another cache unregisters the keys created before it
+            OpenWeatherSDKPool(["pool-1", "pool-taken"])
+        pool = OpenWeatherSDKPool(["pool-1"])
+        self.assertIs(pool.get_cache(), pool.get_member("pool-1").get_cache())
+        self.assertIsNot(pool.get_cache(), taken.get_cache())  # The existing instance is left alone
+        pool.close()
+        taken.close()
+        taken.unregister()
+
+    @patch('open_weather_sdk.sdk.requests.Session.get')
+    def test_failover(self, mock_get: mock.Mock):
+        """
+        Test that keys answered with 401 or 429 are taken out of the rotation and their locations fail over.
+        """
+        mock_get.side_effect = self.fake_get
+        pool = OpenWeatherSDKPool(["pool-unauthorized", "pool-limited", "pool-ok"], max_429_retries=0,
+                                  cooldown=60)
+        results = pool.get_weatherdata_many([(float(i), 2.35) for i in range(10)])
+        self.assertEqual(10, len(set(results)))
+        for i in range(10, 20):
+            self.assertEqual("Clouds", json.loads(pool.get_weatherdata(f"City {i}"))["weather"]["main"])
+        stats = pool.get_key_stats()
+        self.assertEqual("disabled", stats["pool-unauthorized"]["state"])
+        self.assertEqual("cooling", stats["pool-limited"]["state"])
+        self.assertGreater(stats["pool-unauthorized"]["unauthorized"] + stats["pool-limited"]["rate_limited"], 1)
+        self.assertEqual(0, stats["pool-ok"]["failovers"])
+        self.assertEqual(30, stats["pool-ok"]["requests"])  # 20 weather and 10 geocoding requests
+
+        pool.enable("pool-limited")
+        self.assertEqual("active", pool.get_key_stats()["pool-limited"]["state"])
+        pool.close()
+        with self.assertRaises(ValueError):
+            OpenWeatherSDKPool(["pool-ok"], polling=True)
+
+
+class TestSession(unittest.TestCase):
+    """
+    A set of unit tests for the pooled HTTP session.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = b"[]"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/geo/1.0/direct"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reuse(self):
+        """
+        Test that consecutive requests go through a single keep-alive connection.
+        """
+        config = SessionConfig()
+        session = create_session(config)
+        for _ in range(5):
+            session.get(self.url, timeout=config.get_timeout())
+        stats = get_pool_stats(session)
+        session.close()
+        self.assertEqual(1, stats["pools"])
+        self.assertEqual(1, stats["connections"])
+        self.assertEqual(5, stats["requests"])
+        self.assertEqual(4, stats["reused"])
+
+
+class TestMockServer(unittest.TestCase):
+    """
+    A set of tests running the SDK against the local stand-in server.
+    """
+
+    def test_sdk_against_mock_server(self):
+        """
+        Test real requests over pooled connections, including an unknown city.
+        """
+        with MockServer(latency=0.01) as server:
+            sdk = OpenWeatherSDK("mock-server-key", base_url=server.url)
+            weather = json.loads(sdk.get_weatherdata("Lisbon"))
+            self.assertEqual("Lisbon", weather["name"])
+            self.assertEqual("Clouds", weather["weather"]["main"])
+            self.assertEqual(sdk.get_weatherdata("Lisbon"), sdk.get_weatherdata("Lisbon"))
+            with self.assertRaises(InvalidCity):
+                sdk.get_weatherdata("Atlantis")
+            results = sdk.get_weatherdata_many([(10.5, 20.5), (11.5, 21.5), "Lisbon"])
+            self.assertEqual("10.5,20.5", json.loads(results[0])["name"])
+            self.assertEqual(sdk.get_weatherdata("Lisbon"), results[2])
+            self.assertEqual({"requests": 5, "weather": 3, "geocoding": 2, "find": 0, "box": 0, "errors": 0,
+                              "rate_limited": 0},
+                             server.get_stats())
+            self.assertGreater(sdk.get_pool_stats()["reused"], 0)
+            sdk.close()
+
+    def test_injected_failures(self):
+        """
+        Test that injected 429 and 500 responses surface as RateLimitError and RequestError.
+        """
+        with MockServer(rate_limit_rate=1, retry_after=0) as server:
+            sdk = OpenWeatherSDK("mock-server-key-2", base_url=server.url, max_429_retries=2)
+            with self.assertRaises(RateLimitError):
+                sdk.get_weatherdata("Lisbon")
+            self.assertEqual(3, server.get_stats()["rate_limited"])
+            self.assertEqual(3, sdk.get_rate_limit_stats()["responses_429"])
+            sdk.close()
+
+        with MockServer(error_rate=1) as server:
+            sdk = OpenWeatherSDK("mock-server-key-3", base_url=server.url, session_config=SessionConfig(retries=1))
+            with self.assertRaises(RequestError):
+                sdk.get_weatherdata("Lisbon")
+            self.assertEqual(2, server.get_stats()["errors"])
+            sdk.close()
+
+    def test_negative_cache_and_circuit_breaker(self):
+        """
+        Test that invalid cities are answered from the negative cache and that an outage opens the breaker,
+        which serves stale data until a trial request succeeds.
+        """
+        with MockServer() as server:
+            sdk = OpenWeatherSDK("mock-server-key-4", base_url=server.url, session_config=SessionConfig(retries=0),
+                                 breaker_threshold=2, breaker_reset_timeout=0.2, serve_stale=True)
+            for _ in range(3):
+                with self.assertRaises(InvalidCity):
+                    sdk.get_weatherdata("Atlantis")
+            self.assertEqual(1, server.get_stats()["geocoding"])
+            self.assertEqual(2, sdk.get_failure_stats()["negative_cache"]["hits"])
+
+            lisbon = sdk.get_weatherdata("Lisbon")
+            sdk.set_update_time(0)
+            server.error_rate = 1
+            for _ in range(4):
+                self.assertEqual(lisbon, sdk.get_weatherdata("Lisbon"))
+            with self.assertRaises(CircuitOpenError):
+                sdk.get_weatherdata("Porto", 41.15, -8.61)
+            self.assertEqual(2, server.get_stats()["errors"])
+            stats = sdk.get_failure_stats()
+            self.assertEqual({"state": "open", "failures": 2, "opened": 1, "rejected": 3}, stats["breakers"]["weather"])
+            self.assertEqual(4, stats["stale_served"])
+
+            server.error_rate = 0
+            time.sleep(0.25)
+            sdk.set_update_time(60)
+            self.assertEqual("Porto", json.loads(sdk.get_weatherdata("Porto", 41.15, -8.61))["name"])
+            self.assertEqual("closed", sdk.get_failure_stats()["breakers"]["weather"]["state"])
+            sdk.close()
+
+
+class TestAreaBatching(unittest.TestCase):
+    """
+    A set of tests for fetching groups of nearby locations through the area endpoints.
+    """
+    lisbon = [(round(38.72 + i * 0.01, 2), round(-9.14 + j * 0.01, 2)) for i in range(5) for j in range(4)]
+    porto = [(round(41.15 + i * 0.01, 2), round(-8.61 + j * 0.01, 2)) for i in range(5) for j in range(4)]
+
+    def test_clusters_and_stations(self):
+        """
+        Test grouping locations by radius and assigning the nearest station within the maximum distance.
+        """
+        locations = {f"{lat},{lon}": (lat, lon) for lat, lon in self.lisbon + self.porto + [(0, 0)]}
+        clusters = cluster_locations(locations, 25_000)
+        self.assertEqual([20, 20, 1], [len(members) for _, members in clusters])
+        self.assertEqual((38.72, -9.14), clusters[0][0])
+
+        stations = [{"coord": {"lat": 38.7, "lon": -9.15}}, {"coord": {"Lat": 38.75, "Lon": -9.1}}]
+        matches = match_stations(stations, {"a": (38.71, -9.14), "b": (38.76, -9.11), "c": (0, 0)}, 5000)
+        self.assertEqual({"a": stations[0], "b": stations[1]}, matches)
+        self.assertEqual((-9.22, 38.66, -9.03, 38.82), tuple(round(value, 2) for value in bounding_box(
+            (38.72, -9.14), {"a": (38.72, -9.14), "b": (38.76, -9.11)}, 7000)))
+
+    def test_sdk_area_requests(self):
+        """
+        Test that each group is fetched with one area request and isolated locations one by one.
+        """
+        locations = self.lisbon + self.porto + [(0.5, 0.5), "Lisbon", self.lisbon[0]]
+        for method in ("circle", "box"):
+            with self.subTest(method=method), MockServer() as server:
+                sdk = OpenWeatherSDK(f"area-key-{method}", base_url=server.url, cache_capacity=100)
+                results = sdk.get_weatherdata_area(locations, method=method)
+                self.assertEqual(len(locations), len(results))
+                self.assertEqual(results[0], results[-1])
+                first = json.loads(results[0])
+                self.assertEqual("38.72,-9.14", first["name"])
+                self.assertEqual("Lisbon", json.loads(results[-2])["name"])
+                self.assertEqual(10000, first["visibility"])  # Partial station data is fetched per location
+                stats = server.get_stats()
+                self.assertEqual(2, stats["find" if method == "circle" else "box"])
+                self.assertEqual(42, stats["weather"])
+                self.assertIsNotNone(sdk.get_cache().peek("38.72,-9.14"))
+
+                server.reset_stats()
+                self.assertEqual(results, sdk.get_weatherdata_area(locations, method=method))
+                self.assertEqual(0, server.get_stats()["requests"])
+
+                full = sdk.get_cache().peek("38.73,-9.14")
+                sdk.set_update_time(0)  # Stale complete data fills in the fields missing from the stations
+                sdk.get_weatherdata_area(locations, method=method)
+                refreshed = sdk.get_cache().peek("38.73,-9.14")
+                self.assertIsNot(full, refreshed)
+                self.assertEqual((10000, full.sunrise), (refreshed.visibility, refreshed.sunrise))
+                stats = server.get_stats()
+                self.assertEqual(2, stats["find" if method == "circle" else "box"])
+                self.assertEqual(2, stats["weather"])  # (0.5, 0.5) and the geocoded city
+                sdk.close()
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    A set of unit tests for the observer events and the Prometheus export.
+    """
+
+    def test_prometheus_format(self):
+        """
+        Test the text rendering of counters and cumulative histogram buckets.
+        """
+        counter = Counter("requests_total", "Requests.", ("endpoint",))
+        counter.inc("weather")
+        counter.inc("weather", amount=2)
+        histogram = Histogram("duration_seconds", "Duration.", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value)
+        self.assertEqual(3, counter.get("weather"))
+        self.assertEqual(["# HELP requests_total Requests.", "# TYPE requests_total counter",
+                          'requests_total{endpoint="weather"} 3'], counter.expose())
+        self.assertEqual(["# HELP duration_seconds Duration.", "# TYPE duration_seconds histogram",
+                          'duration_seconds_bucket{le="0.1"} 1', 'duration_seconds_bucket{le="1"} 3',
+                          'duration_seconds_bucket{le="+Inf"} 4', "duration_seconds_sum 4.25",
+                          "duration_seconds_count 4"], histogram.expose())
+
+    def test_sdk_events(self):
+        """
+        Test that the SDK reports requests, cache hits, misses, evictions, errors and refresh lag.
+        """
+        metrics = MetricsCollector()
+        with MockServer() as server:
+            sdk = OpenWeatherSDK("metrics-key", base_url=server.url, cache_capacity=1, observer=metrics)
+            sdk.get_weatherdata("Lisbon")
+            sdk.get_weatherdata("Lisbon")
+            sdk.get_weatherdata("Porto")
+            with self.assertRaises(InvalidCity):
+                sdk.get_weatherdata("Atlantis")
+            sdk.set_update_time(0.05)
+            sdk.start_polling()
+            time.sleep(0.2)
+            sdk.close()
+
+        self.assertEqual(1, metrics.cache_hits.get())
+        self.assertEqual(3, metrics.cache_misses.get())
+        self.assertEqual(1, metrics.cache_evictions.get())
+        self.assertEqual(1, metrics.errors.get("InvalidCity"))
+        self.assertEqual(3, metrics.requests.get("geocoding", "200"))
+        self.assertGreater(metrics.requests.get("weather", "200"), 2)
+        self.assertEqual(metrics.requests.get("weather", "200"), metrics.request_duration.get_count("weather"))
+        self.assertGreater(metrics.refresh_lag.get_count(), 0)
+        self.assertIn('open_weather_sdk_requests_total{endpoint="geocoding",status="200"} 3',
+                      metrics.to_prometheus())
+
+
+class TestAsyncOpenWeatherSDK(unittest.IsolatedAsyncioTestCase):
+    """
+    A set of unit tests for the AsyncOpenWeatherSDK class.
+    """
+
+    class FakeResponse:
+        """
+        Mimics an aiohttp response context manager and tracks the number of requests in flight.
+        """
+        in_flight = 0
+        max_in_flight = 0
+        calls = 0
+
+        def __init__(self, url, params):
+            self.url = url
+            self.params = params
+            self.status = 200
+
+        async def __aenter__(self):
+            cls = type(self)
+            cls.calls += 1
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            await asyncio.sleep(0.01)
+            cls.in_flight -= 1
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def read(self):
+            return json.dumps(await self.json()).encode()
+
+        async def json(self):
+            if "geo" in self.url:
+                if self.params["q"] == "Atlantis":
+                    return []
+                return [{"lat": 51.5073219, "lon": -0.1276474}]
+            data = dict(TestOpenWeatherSDK.city_mocks["London"])
+            data["dt"] = datetime.now(timezone.utc).timestamp()
+            return data
+
+    def setUp(self):
+        self.FakeResponse.in_flight = self.FakeResponse.max_in_flight = self.FakeResponse.calls = 0
+        self.patcher = patch('open_weather_sdk.async_sdk.aiohttp.ClientSession.get',
+                             side_effect=lambda url, params=None: self.FakeResponse(url, params))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    async def test_get_weatherdata(self):
+        """
+        Test that weather data is fetched once and then served from the cache.
+        """
+        async with AsyncOpenWeatherSDK("key") as sdk:
+            first = json.loads(await sdk.get_weatherdata("London"))
+            second = json.loads(await sdk.get_weatherdata("London"))
+        self.assertEqual(first, second)
+        self.assertEqual("Clouds", first["weather"]["main"])
+        self.assertEqual(2, self.FakeResponse.calls)
+
+    async def test_invalid_city(self):
+        """
+        Test that the async client raises the same exceptions as the sync one.
+        """
+        async with AsyncOpenWeatherSDK("key") as sdk:
+            with self.assertRaises(InvalidCity):
+                await sdk.get_city_coordinates("Atlantis")
+
+    async def test_concurrency_limit(self):
+        """
+        Test that the semaphore caps the number of requests in flight.
+        """
+        async with AsyncOpenWeatherSDK("key", max_concurrency=3) as sdk:
+            await asyncio.gather(*(sdk.get_weatherdata(f"City {i}", 1.0, 1.0) for i in range(20)))
+        self.assertEqual(20, self.FakeResponse.calls)
+        self.assertEqual(3, self.FakeResponse.max_in_flight)
+
+    async def test_coalescing(self):
+        """
+        Test that concurrent misses on the same city share one geocoding and one weather request.
+        """
+        async with AsyncOpenWeatherSDK("key") as sdk:
+            results = await asyncio.gather(*(sdk.get_weatherdata("London") for _ in range(20)))
+        self.assertEqual(1, len(set(results)))
+        self.assertEqual(2, self.FakeResponse.calls)
+
+
 if __name__ == '__main__':
     unittest.main()